@@ -0,0 +1,137 @@
+"""
+Protocol precompilation for SecureGenomics CLI.
+
+Runs once when a protocol commit is fetched: compiles every protocol module to
+bytecode and converts heavy static assets declared in protocol.yaml (SNP weight
+tables, reference panels) into NumPy files that load through mmap.
+
+Protocols declare assets like this:
+
+    assets:
+      - name: snp_weights
+        source: data/weights.tsv
+        delimiter: "\t"
+        skip_header: 1
+        columns: [2]
+        dtype: float64
+
+and read them with ``load_asset(__file__, "snp_weights")``.
+"""
+
+import compileall
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+from rich.console import Console
+
+console = Console()
+
+# Converted assets live next to the protocol sources
+ASSETS_DIRNAME = ".assets"
+
+
+def _load_protocol_config(protocol_dir: Path) -> Dict[str, Any]:
+    with open(protocol_dir / "protocol.yaml", 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _asset_path(protocol_dir: Path, name: str) -> Path:
+    return protocol_dir / ASSETS_DIRNAME / f"{name}.npy"
+
+
+def compile_protocol_bytecode(protocol_dir: Path) -> bool:
+    """Compile all protocol modules to .pyc so the first import skips compilation."""
+    return bool(compileall.compile_dir(str(protocol_dir), quiet=1))
+
+
+def build_asset(protocol_dir: Path, spec: Dict[str, Any]) -> Path:
+    """Convert one declared asset to a .npy file and return its path."""
+    import numpy as np
+
+    name = spec["name"]
+    source = protocol_dir / spec["source"]
+    if not source.exists():
+        raise FileNotFoundError(f"Asset source not found: {spec['source']}")
+
+    dtype = spec.get("dtype", "float64")
+    suffix = source.suffix.lower()
+
+    if suffix == ".npy":
+        array = np.load(source, allow_pickle=False)
+    elif suffix in (".yaml", ".yml"):
+        with open(source, 'r') as f:
+            array = np.asarray(yaml.safe_load(f), dtype=dtype)
+    else:
+        # Delimited text (CSV/TSV); whitespace-delimited when no delimiter is given
+        default_delimiter = "," if suffix == ".csv" else ("\t" if suffix == ".tsv" else None)
+        array = np.loadtxt(
+            source,
+            dtype=dtype,
+            delimiter=spec.get("delimiter", default_delimiter),
+            skiprows=spec.get("skip_header", 0),
+            usecols=spec.get("columns"),
+            ndmin=1,
+        )
+
+    output_path = _asset_path(protocol_dir, name)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(output_path, np.ascontiguousarray(array), allow_pickle=False)
+    return output_path
+
+
+def build_protocol_assets(protocol_dir: Path) -> List[Path]:
+    """Convert every asset declared in protocol.yaml; returns the files written."""
+    specs = _load_protocol_config(protocol_dir).get("assets") or []
+    if not specs:
+        return []
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        console.print("[yellow]Warning: NumPy not installed, protocol assets will not be precompiled[/yellow]")
+        return []
+
+    return [build_asset(protocol_dir, spec) for spec in specs]
+
+
+def precompile_protocol(protocol_dir: Path) -> None:
+    """Compile bytecode and assets for a freshly fetched protocol.
+
+    Failures only cost the speed-up: modules compile on import and assets are
+    rebuilt on first ``load_asset``.
+    """
+    try:
+        compile_protocol_bytecode(protocol_dir)
+    except Exception as e:
+        console.print(f"[yellow]Warning: Could not precompile protocol modules: {e}[/yellow]")
+
+    try:
+        build_protocol_assets(protocol_dir)
+    except Exception as e:
+        console.print(f"[yellow]Warning: Could not precompile protocol assets: {e}[/yellow]")
+
+
+def load_asset(protocol_path: Union[str, Path], name: str, mmap_mode: Optional[str] = "r") -> Any:
+    """Load a precompiled protocol asset as a memory-mapped NumPy array.
+
+    Args:
+        protocol_path: The protocol directory, or any file in it (pass ``__file__``)
+        name: Asset name as declared in protocol.yaml
+        mmap_mode: Passed to ``numpy.load``; None reads the array into memory
+    """
+    import numpy as np
+
+    protocol_dir = Path(protocol_path)
+    if protocol_dir.is_file():
+        protocol_dir = protocol_dir.parent
+
+    asset_path = _asset_path(protocol_dir, name)
+    if not asset_path.exists():
+        specs = _load_protocol_config(protocol_dir).get("assets") or []
+        spec = next((s for s in specs if s.get("name") == name), None)
+        if spec is None:
+            raise KeyError(f"Asset '{name}' is not declared in protocol.yaml")
+        asset_path = build_asset(protocol_dir, spec)
+
+    return np.load(asset_path, mmap_mode=mmap_mode, allow_pickle=False)
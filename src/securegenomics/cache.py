@@ -0,0 +1,225 @@
+"""
+Content-addressed caches for SecureGenomics CLI.
+
+Derived data (indexed VCF copies, encoded results) is keyed by the content of
+the input file rather than its path, so renamed or copied inputs still hit.
+Digests are memoized by size and mtime so unchanged files are hashed once.
+Deserialized crypto contexts are kept in memory, keyed by their file's digest.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Block size for streaming files through the hash
+HASH_BLOCK_SIZE = 1024 * 1024  # 1MB
+
+
+def hash_file(path: Path) -> str:
+    """Compute the SHA-256 hex digest of a file."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class FileDigestCache:
+    """Remembers file digests so unchanged files are not hashed again.
+
+    Entries are keyed by resolved path and trusted while the file's size and
+    mtime are unchanged. The least recently hashed entries are dropped beyond
+    ``max_entries``.
+    """
+
+    def __init__(self, cache_file: Path, max_entries: int = 1000) -> None:
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_file, 'w') as f:
+            json.dump(entries, f)
+        os.replace(temp_file, self.cache_file)
+
+    def digest(self, path: Path) -> str:
+        """Return the SHA-256 digest of a file, hashing it only if it changed."""
+        path = Path(path).resolve()
+        stat = path.stat()
+
+        entries = self._load()
+        entry = entries.get(str(path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        digest = hash_file(path)
+        entries[str(path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "hashed_at": time.time(),
+        }
+        if len(entries) > self.max_entries:
+            oldest = sorted(entries, key=lambda key: entries[key]["hashed_at"])
+            for key in oldest[:len(entries) - self.max_entries]:
+                del entries[key]
+
+        try:
+            self._save(entries)
+        except OSError:
+            pass  # Caching the digest is an optimization only
+        return digest
+
+
+class EncodeCache:
+    """Content-addressed store of encoded VCF results with LRU eviction.
+
+    Entries are keyed by the VCF's digest, the protocol name and commit, and
+    the encoder parameters, so a VCF encoded once is reused by every project
+    running the same protocol commit. A hit refreshes the entry's mtime; the
+    least recently used entries are evicted to stay within ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(vcf_digest: str, protocol_name: str, commit_hash: str, params: Dict[str, Any]) -> str:
+        """Build the cache key for one encode."""
+        identity = json.dumps({
+            "vcf": vcf_digest,
+            "protocol": protocol_name,
+            "commit": commit_hash,
+            "params": params,
+        }, sort_keys=True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.encoded"
+
+    def get(self, key: str, destination: Path) -> bool:
+        """Copy a cached result to ``destination``; returns False on a miss."""
+        entry = self._entry_path(key)
+        if not entry.exists():
+            return False
+
+        temp_file = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+        shutil.copyfile(entry, temp_file)
+        os.replace(temp_file, destination)
+        os.utime(entry)
+        return True
+
+    def put(self, key: str, source: Path) -> None:
+        """Store an encoded file, then evict old entries beyond the size budget."""
+        if source.stat().st_size > self.max_bytes:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_path(key)
+        temp_file = entry.with_name(f".{entry.name}.{os.getpid()}.tmp")
+        shutil.copyfile(source, temp_file)
+        os.replace(temp_file, entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        evict_least_recently_used(self.cache_dir, "*.encoded", self.max_bytes)
+
+
+def evict_least_recently_used(cache_dir: Path, pattern: str, max_bytes: int,
+                              keep: Optional[Path] = None) -> None:
+    """Delete the oldest entries matching ``pattern`` until they fit ``max_bytes``.
+
+    An entry's mtime is its last use. Files named after an entry plus a
+    suffix (such as ``x.vcf.gz.csi`` for ``x.vcf.gz``) count towards and are
+    deleted with it. Entries being written (dot-prefixed) and ``keep`` are
+    never deleted.
+    """
+    entries = []
+    for path in cache_dir.glob(pattern):
+        if path.name.startswith(".") or path == keep:
+            continue
+        files = [path, *cache_dir.glob(f"{path.name}.*")]
+        try:
+            entries.append((path.stat().st_mtime, sum(f.stat().st_size for f in files), files))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    if keep is not None:
+        total += sum(f.stat().st_size for f in [keep, *cache_dir.glob(f"{keep.name}.*")] if f.exists())
+    for _, size, files in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        try:
+            for path in files:
+                path.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+class ContextCache:
+    """In-process LRU of deserialized crypto contexts.
+
+    Keys combine the context file's content digest with the protocol loader
+    that deserialized it, so a changed context file or loader never returns
+    a stale object. Deserializing large contexts (Galois keys) takes
+    seconds; repeated operations in one process pay it once.
+    """
+
+    def __init__(self, max_entries: int = 2) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get_or_load(self, key: Any, loader: Callable[[], Any]) -> Any:
+        """Return the cached context for ``key``, calling ``loader`` on a miss."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        context = loader()
+        if self.max_entries > 0:
+            self._entries[key] = context
+            self._evict()
+        return context
+
+    def resize(self, max_entries: int) -> None:
+        """Change the number of entries kept, dropping the least recently used."""
+        self.max_entries = max_entries
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self.max_entries, 0):
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Global instance for easy access
+_context_cache: Optional[ContextCache] = None
+
+
+def get_context_cache(max_entries: int = 2) -> ContextCache:
+    """Get the process-wide context cache, sized to ``max_entries``."""
+    global _context_cache
+    if _context_cache is None:
+        _context_cache = ContextCache(max_entries)
+    elif _context_cache.max_entries != max_entries:
+        _context_cache.resize(max_entries)
+    return _context_cache
@@ -0,0 +1,272 @@
+"""
+Framed ciphertext container for SecureGenomics CLI.
+
+Encryption produces many ciphertexts per file. They are stored as a
+sequence of length-prefixed records after a small JSON header (format
+version, protocol, commit, batch layout), so they can be written as they
+are produced, with only one ciphertext in memory at a time. A trailing
+index of record offsets gives random access to any ciphertext without
+reading the ones before it. Records may be compressed with a general
+purpose codec (zlib, lzma, or zstd when ``zstandard`` is installed), named
+in the header; the index always points at the stored records.
+
+Layout::
+
+    b"SGCIPHER" | header size (uint32 LE) | header JSON
+    | record length (uint64 LE) | record bytes | ...
+    | record offsets (uint64 LE each)
+    | index offset (uint64 LE) | record count (uint64 LE) | b"SGCIPIDX"
+
+Files that do not start with the magic string hold a single ciphertext as
+returned by the protocol's ``encrypt_data``.
+"""
+
+import json
+import os
+import struct
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+MAGIC = b"SGCIPHER"
+
+INDEX_MAGIC = b"SGCIPIDX"
+
+FORMAT_VERSION = 1
+
+# Record compression codecs; "none" stores records as the protocol serialized them
+COMPRESSION_CODECS = ("none", "zlib", "lzma", "zstd")
+
+_PREFIX = struct.Struct("<8sI")
+_RECORD_LENGTH = struct.Struct("<Q")
+_FOOTER = struct.Struct("<QQ8s")
+
+
+def zstd_available() -> bool:
+    """Check whether the optional ``zstandard`` package is installed."""
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _compressor(codec: str, level: Optional[int]) -> Optional[Callable[[bytes], bytes]]:
+    """Return a function compressing one record with ``codec``, or None for "none"."""
+    if codec == "none":
+        return None
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, 6 if level is None else level)
+    if codec == "lzma":
+        import lzma
+        return lambda data: lzma.compress(data, preset=6 if level is None else level)
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd ciphertext compression requires the zstandard package")
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress
+    raise ValueError(f"Unknown ciphertext compression codec '{codec}' (expected one of {', '.join(COMPRESSION_CODECS)})")
+
+
+def _decompressor(codec: str) -> Optional[Callable[[bytes], bytes]]:
+    """Return a function decompressing one record stored with ``codec``, or None for "none"."""
+    if codec == "none":
+        return None
+    if codec == "zlib":
+        return zlib.decompress
+    if codec == "lzma":
+        import lzma
+        return lzma.decompress
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Reading zstd-compressed ciphertexts requires the zstandard package")
+        # Frames written by ZstdCompressor.compress carry their content size
+        return zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"Unknown ciphertext compression codec '{codec}'")
+
+
+def is_ciphertext_stream(value: Any) -> bool:
+    """Check whether encryption returned a sequence of ciphertexts rather than one."""
+    return isinstance(value, (Iterator, list, tuple))
+
+
+def is_framed_ciphertext(path: Path) -> bool:
+    """Check whether an ``.encrypted`` file uses the framed layout."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class FramedCiphertextWriter:
+    """Writes ciphertext records to a framed ``.encrypted`` file.
+
+    Output goes to a temporary file that replaces ``path`` on ``close``, so
+    an interrupted encryption never leaves a truncated file behind. Only the
+    record offsets are kept in memory; they are written as the index on
+    ``close``. With a ``compression`` codec each record is compressed on
+    ``write``; ``record_bytes`` (as given), ``stored_record_bytes`` (as
+    written) and ``compress_seconds`` measure what that saved and cost.
+    """
+
+    def __init__(self, path: Path, metadata: Optional[Dict[str, Any]] = None,
+                 compression: str = "none", level: Optional[int] = None) -> None:
+        self.path = Path(path)
+        self.compression = compression
+        self.records_written = 0
+        self.bytes_written = 0
+        self.record_bytes = 0
+        self.stored_record_bytes = 0
+        self.compress_seconds = 0.0
+        self._compress = _compressor(compression, level)
+        self._offsets: List[int] = []
+        self._temp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        self._file = open(self._temp_path, 'wb')
+
+        header = json.dumps({
+            "format_version": FORMAT_VERSION,
+            "compression": compression,
+            "metadata": metadata or {},
+        }).encode("utf-8")
+        self._emit(_PREFIX.pack(MAGIC, len(header)) + header)
+
+    def __enter__(self) -> "FramedCiphertextWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _emit(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def write(self, record: bytes) -> None:
+        """Append one ciphertext record."""
+        self.record_bytes += len(record)
+        if self._compress is not None:
+            started = time.perf_counter()
+            record = self._compress(record)
+            self.compress_seconds += time.perf_counter() - started
+        self.stored_record_bytes += len(record)
+
+        self._offsets.append(self.bytes_written)
+        self._emit(_RECORD_LENGTH.pack(len(record)))
+        self._emit(record)
+        self.records_written += 1
+
+    def close(self) -> None:
+        """Write the index and move the finished file into place."""
+        index_offset = self.bytes_written
+        self._emit(struct.pack(f"<{len(self._offsets)}Q", *self._offsets))
+        self._emit(_FOOTER.pack(index_offset, len(self._offsets), INDEX_MAGIC))
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self) -> None:
+        """Discard everything written so far."""
+        self._file.close()
+        try:
+            os.unlink(self._temp_path)
+        except OSError:
+            pass
+
+
+class FramedCiphertextReader:
+    """Random access to the records of a framed ``.encrypted`` file.
+
+    The index is read on open; ``reader[i]`` then costs one seek and one
+    read, and returns the record decompressed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self.header = _read_header(self._file)
+            self._decompress = _decompressor(self.header.get("compression", "none"))
+            self._offsets = self._read_offsets()
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self) -> "FramedCiphertextReader":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> bytes:
+        if index < 0:
+            index += len(self._offsets)
+        if not 0 <= index < len(self._offsets):
+            raise IndexError(f"Ciphertext record {index} out of range ({len(self._offsets)} records)")
+        self._file.seek(self._offsets[index])
+        record = _read_record(self._file)
+        return self._decompress(record) if self._decompress is not None else record
+
+    def __iter__(self) -> Iterator[bytes]:
+        for index in range(len(self._offsets)):
+            yield self[index]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.header.get("metadata", {})
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _read_offsets(self) -> List[int]:
+        file_size = os.fstat(self._file.fileno()).st_size
+        if file_size < _FOOTER.size:
+            raise ValueError("Truncated encrypted file index")
+        self._file.seek(file_size - _FOOTER.size)
+        index_offset, count, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != INDEX_MAGIC or index_offset + count * _RECORD_LENGTH.size != file_size - _FOOTER.size:
+            raise ValueError("Corrupt encrypted file index")
+        self._file.seek(index_offset)
+        return list(struct.unpack(f"<{count}Q", self._file.read(count * _RECORD_LENGTH.size)))
+
+
+def read_ciphertext_header(path: Path) -> Dict[str, Any]:
+    """Return the JSON header of a framed ``.encrypted`` file."""
+    with open(path, 'rb') as f:
+        return _read_header(f)
+
+
+def _read_header(f: Any) -> Dict[str, Any]:
+    prefix = f.read(_PREFIX.size)
+    if len(prefix) < _PREFIX.size:
+        raise ValueError("Truncated encrypted file header")
+    magic, header_size = _PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError("Not a framed encrypted file")
+    header = json.loads(f.read(header_size))
+    if header.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Encrypted file format {header['format_version']} is newer than this CLI supports")
+    return header
+
+
+def _read_record(f: Any) -> bytes:
+    length = f.read(_RECORD_LENGTH.size)
+    if len(length) < _RECORD_LENGTH.size:
+        raise ValueError("Truncated encrypted file record")
+    (size,) = _RECORD_LENGTH.unpack(length)
+    record = f.read(size)
+    if len(record) < size:
+        raise ValueError("Truncated encrypted file record")
+    return record
+
+
+def iter_ciphertext_records(path: Path) -> Iterator[bytes]:
+    """Yield the ciphertext records of a framed ``.encrypted`` file in order."""
+    with FramedCiphertextReader(path) as reader:
+        yield from reader
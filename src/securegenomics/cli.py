@@ -8,7 +8,7 @@ It organizes all operations into logical command groups.
 import os
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import typer
 from rich.console import Console
@@ -70,6 +70,9 @@ def main(
     verbose: bool = typer.Option(
         False, "--verbose", help="Verbose output"
     ),
+    reverify: bool = typer.Option(
+        False, "--reverify", help="Ignore cached protocol verifications and re-check against GitHub"
+    ),
 ) -> None:
     """
     SecureGenomics CLI - The single source of truth for secure genomic computation.
@@ -89,6 +92,8 @@ def main(
         os.environ["SECUREGENOMICS_QUIET"] = "1"
     if verbose:
         os.environ["SECUREGENOMICS_VERBOSE"] = "1"
+    if reverify:
+        os.environ["SECUREGENOMICS_REVERIFY"] = "1"
 
 
 def big_announcement(text) -> None:
@@ -305,12 +310,13 @@ def auth_delete_profile() -> None:
 
 @protocol_app.command("list")
 def protocol_list(
-    json_output: bool = typer.Option(False, "--json", help="Output protocols as JSON")
+    json_output: bool = typer.Option(False, "--json", help="Output protocols as JSON"),
+    refresh: bool = typer.Option(False, "--refresh", help="Re-query GitHub instead of using the local protocol index"),
 ) -> None:
-    """List available protocols from GitHub."""
+    """List available protocols (from the local index, refreshed from GitHub when stale)."""
     try:
         protocol_manager = ProtocolManager()
-        protocols = protocol_manager.list_protocols()
+        protocols = protocol_manager.list_protocols(refresh=refresh)
         
         if json_output:
             import json
@@ -389,7 +395,7 @@ def protocol_verify(
     """Verify protocol integrity."""
     try:
         protocol_manager = ProtocolManager()
-        is_valid = protocol_manager.verify(protocol_name)
+        is_valid = protocol_manager.verify(protocol_name, use_cache=False)
         if is_valid:
             console.print(f"✅ Protocol {protocol_name} is valid", style="green")
         else:
@@ -1154,6 +1160,23 @@ def data_encrypt(
         raise typer.Exit(1)
 
 
+@data_app.command("aggregate")
+def data_aggregate(
+    project_id: str = typer.Argument(..., help="Project ID"),
+    encoded_files: List[Path] = typer.Argument(..., help="Encoded files to sum", exists=True),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Output file (default: cohort.aggregate.encoded in the project data cache)"),
+) -> None:
+    """Sum encoded files of an additive protocol into one before encrypting."""
+    try:
+        data_manager = DataManager()
+        aggregated_path = data_manager.aggregate_encoded(project_id, encoded_files, output)
+        console.print(f"✅ Aggregated {len(encoded_files)} encoded files for project {project_id}")
+        console.print(f"📁 Output: {aggregated_path}")
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="red")
+        raise typer.Exit(1)
+
+
 @data_app.command("upload")
 def data_upload(
     project_id: str = typer.Argument(..., help="Project ID"),
@@ -1185,6 +1208,28 @@ def data_encode_encrypt_upload(
         raise typer.Exit(1)
 
 
+@data_app.command("encode_encrypt_cohort")
+def data_encode_encrypt_cohort(
+    project_id: str = typer.Argument(..., help="Project ID"),
+    vcf_file: Path = typer.Argument(..., help="Multi-sample VCF file to process", exists=True),
+    output_dir: Optional[Path] = typer.Option(None, "--output-dir", "-o", help="Output directory for encrypted blocks (default: project data cache)"),
+    block_size: Optional[int] = typer.Option(None, "--block-size", "-b", min=1, help="Samples per encrypted block (default: cohort_block_size config)"),
+    aggregate: bool = typer.Option(False, "--aggregate", help="Sum the cohort's encodings and encrypt one total (additive protocols only)"),
+    upload: bool = typer.Option(False, "--upload", help="Upload every encrypted block when done"),
+) -> None:
+    """Encode and encrypt a multi-sample VCF in parallel blocks of samples (cohort mode)."""
+    try:
+        data_manager = DataManager()
+        encrypted_paths, stats = data_manager.encode_encrypt_cohort(project_id, vcf_file, output_dir, block_size, aggregate)
+        if upload:
+            for encrypted_path in encrypted_paths:
+                data_manager.upload_data(project_id, encrypted_path, stats)
+        console.print(f"✅ Processed cohort {vcf_file.name} into {len(encrypted_paths)} blocks for project {project_id}")
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="red")
+        raise typer.Exit(1)
+
+
 # ============================================================================
 # LOCAL COMMANDS
 # ============================================================================
@@ -1200,8 +1245,8 @@ def local_analyze(
 
         # Get protocol name interactively if not provided
         if protocol_name is None:
-            local_protocols = analyzer.list_local_protocols()
-            if not local_protocols:
+            supported_protocols = analyzer.list_local_protocols()
+            if not supported_protocols:
                 console.print("❌ No protocols available for local analysis", style="red")
                 raise typer.Exit(1)
             
@@ -1638,6 +1683,21 @@ def crypto_context_generate_upload(
         raise typer.Exit(1)
 
 
+@crypto_context_app.command("precompute")
+def crypto_context_precompute(
+    project_id: str = typer.Argument(..., help="Project ID"),
+    count: int = typer.Option(..., "--count", "-n", min=1, help="Number of zero ciphertexts to add to the pool"),
+) -> None:
+    """Precompute encryptions of zero so later encryption is fast."""
+    try:
+        data_manager = DataManager()
+        data_manager.precompute_zero_pool(project_id, count)
+        console.print(f"💡 'securegenomics data encrypt {project_id} <encoded-file>' will use the pool", style="blue")
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="red")
+        raise typer.Exit(1)
+
+
 @crypto_context_app.command("delete")
 def crypto_context_delete(
     project_id: str = typer.Argument(..., help="Project ID"),
@@ -0,0 +1,197 @@
+"""
+Cohort (multi-sample VCF) processing for SecureGenomics CLI.
+
+Decodes the genotypes of a multi-sample VCF once into a NumPy matrix
+(samples × sites) and encodes and encrypts it in blocks of samples across a
+process pool, one encrypted file per block. Workers read the matrix through
+a shared memory map instead of receiving a pickled copy.
+
+Protocols opt in by defining ``encode_genotypes`` in encode.py:
+
+    def encode_genotypes(genotypes, samples):
+        # genotypes: int8 array (block samples × sites) of alt allele counts,
+        # -1 where the genotype is missing; samples: the block's sample IDs
+        return genotypes.sum(axis=0)
+
+Each block's encoding is passed to the protocol's ``encrypt_data``. When the
+protocol declares its circuit additive (``circuit: {additive: true}`` in
+protocol.yaml), a contributor may instead sum the block encodings in
+plaintext and encrypt the cohort total once.
+"""
+
+import functools
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from securegenomics.encoding import map_in_pool
+from securegenomics.encryption import ContextSource, FunctionRef, _protocol_context, encrypted_to_bytes
+from securegenomics.workers import export_payload, import_payload, release_payload
+
+# Genotype value of a sample with no called alleles at a site
+MISSING_GENOTYPE = -1
+
+# Sites the genotype matrix starts with (and grows by at least) when the count is unknown
+GENOTYPE_CHUNK_SITES = 4096
+
+
+@dataclass
+class GenotypeMatrix:
+    """Genotypes of a cohort with the samples and sites they belong to."""
+    genotypes: Any  # int8 ndarray, samples × sites
+    samples: List[str]
+    sites: List[Tuple[str, int, str, str]]  # (chrom, pos, ref, alts)
+
+
+def genotype_dosage(gt: Optional[Sequence[Optional[int]]]) -> int:
+    """Count the alt alleles in a GT tuple; MISSING_GENOTYPE when none are called."""
+    called = [allele for allele in gt or () if allele is not None]
+    if not called:
+        return MISSING_GENOTYPE
+    return sum(1 for allele in called if allele > 0)
+
+
+def read_genotype_matrix(records: Iterable[Any], samples: Sequence[str],
+                         site_count: Optional[int] = None) -> GenotypeMatrix:
+    """Decode VCF records into a samples × sites matrix of alt allele counts.
+
+    Records are read once and written straight into an int8 matrix, so each
+    sample's genotypes end up contiguous and blocks of samples are cheap row
+    slices. With ``site_count`` (e.g. the records extracted for a target
+    panel) the matrix is allocated once at its final size; otherwise it
+    grows by half its width whenever it fills. Records without GT count as
+    missing for every sample.
+    """
+    import numpy as np
+
+    sample_count = len(samples)
+    genotypes = np.empty((sample_count, site_count or GENOTYPE_CHUNK_SITES), dtype=np.int8)
+    sites = []
+    for record in records:
+        column = len(sites)
+        if column == genotypes.shape[1]:
+            grown = np.empty((sample_count, column + max(column // 2, GENOTYPE_CHUNK_SITES)), dtype=np.int8)
+            grown[:, :column] = genotypes
+            genotypes = grown
+        if "GT" in record.format:
+            dosages = (genotype_dosage(sample["GT"]) for sample in record.samples.values())
+            genotypes[:, column] = np.fromiter(dosages, dtype=np.int8, count=sample_count)
+        else:
+            genotypes[:, column] = MISSING_GENOTYPE
+        sites.append((record.chrom, record.pos, record.ref, ",".join(record.alts or ())))
+
+    # Unused columns stay allocated behind the view rather than being copied away
+    return GenotypeMatrix(genotypes=genotypes[:, :len(sites)], samples=list(samples), sites=sites)
+
+
+def plan_sample_blocks(sample_count: int, block_size: int) -> List[Tuple[int, int]]:
+    """Split ``sample_count`` samples into ``[start, stop)`` blocks of ``block_size``."""
+    return [(start, min(start + block_size, sample_count)) for start in range(0, sample_count, block_size)]
+
+
+def sum_encodings(encodings: Iterable[Any]) -> Any:
+    """Add up encodings of the same shape for an additive circuit.
+
+    Integer encodings are summed as int64 and the rest as float64, so counts
+    from many samples cannot overflow a narrow encoder dtype. Sparse
+    encodings are expanded first.
+    """
+    import numpy as np
+    from securegenomics.container import SparseEncoded
+
+    total = None
+    for encoding in encodings:
+        if isinstance(encoding, SparseEncoded):
+            encoding = encoding.to_dense()
+        values = np.asarray(encoding)
+        if values.dtype.kind not in "biuf":
+            raise ValueError(f"Cannot sum non-numeric encodings (dtype {values.dtype})")
+
+        if total is None:
+            total = np.zeros(values.shape, dtype=np.float64 if values.dtype.kind == "f" else np.int64)
+        elif values.shape != total.shape:
+            raise ValueError(f"Cannot sum encodings of shapes {total.shape} and {values.shape}")
+        elif values.dtype.kind == "f" and total.dtype.kind != "f":
+            total = total.astype(np.float64)
+        np.add(total, values, out=total, casting="unsafe")
+
+    if total is None:
+        raise ValueError("No encodings to sum")
+    return total
+
+
+def _encode_encrypt_block(encode_ref: FunctionRef, encrypt_ref: FunctionRef, context: ContextSource,
+                          as_ndarray: bool, load_context_ref: Optional[FunctionRef], genotypes: Any,
+                          block: Tuple[Tuple[int, int], List[str]]) -> bytes:
+    """Encode and encrypt one block of samples; runs in a worker process."""
+    import numpy as np
+    from securegenomics.protocol import import_function_from_file
+
+    encode = import_function_from_file(*encode_ref)
+    encrypt = import_function_from_file(*encrypt_ref)
+
+    (start, stop), samples = block
+    rows = np.array(import_payload(genotypes)[start:stop])
+    encoded_data = encode(genotypes=rows, samples=samples)
+    if isinstance(encoded_data, np.ndarray) and not as_ndarray:
+        encoded_data = encoded_data.tolist()
+
+    public_crypto_context = _protocol_context(load_context_ref, context)
+    encrypted_data = encrypt(encoded_data=encoded_data, public_crypto_context=public_crypto_context)
+    return encrypted_to_bytes(encrypted_data)
+
+
+def _encode_block(encode_ref: FunctionRef, genotypes: Any, block: Tuple[Tuple[int, int], List[str]]) -> Any:
+    """Encode one block of samples; runs in a worker process."""
+    import numpy as np
+    from securegenomics.protocol import import_function_from_file
+
+    encode = import_function_from_file(*encode_ref)
+    (start, stop), samples = block
+    return encode(genotypes=np.array(import_payload(genotypes)[start:stop]), samples=samples)
+
+
+def _map_blocks(task: Any, matrix: GenotypeMatrix, blocks: Sequence[Tuple[int, int]],
+                workers: int) -> Iterator[Any]:
+    """Run ``task(genotypes, block)`` for each sample block, in block order.
+
+    With more than one worker the genotype matrix is exported once to a
+    memory-mapped file that every worker maps; each task only carries its
+    block bounds and sample IDs.
+    """
+    workers = min(workers, len(blocks))
+    shared = export_payload(matrix.genotypes, 0) if workers > 1 else matrix.genotypes
+    items = [((start, stop), matrix.samples[start:stop]) for start, stop in blocks]
+    task = functools.partial(task, shared)
+
+    try:
+        if workers > 1:
+            yield from map_in_pool(task, items, workers)
+        else:
+            yield from map(task, items)
+    finally:
+        release_payload(shared)
+
+
+def aggregate_cohort_blocks(matrix: GenotypeMatrix, blocks: Sequence[Tuple[int, int]],
+                            encode_ref: FunctionRef, workers: int) -> Any:
+    """Encode each sample block and return the sum of the block encodings.
+
+    Only valid for additive circuits: the total encrypts to the same result
+    the server would get by adding every block's ciphertexts.
+    """
+    return sum_encodings(_map_blocks(functools.partial(_encode_block, encode_ref), matrix, blocks, workers))
+
+
+def encrypt_cohort_blocks(matrix: GenotypeMatrix, blocks: Sequence[Tuple[int, int]],
+                          encode_ref: FunctionRef, encrypt_ref: FunctionRef, context: ContextSource,
+                          workers: int, as_ndarray: bool = False,
+                          load_context_ref: Optional[FunctionRef] = None) -> Iterator[bytes]:
+    """Yield the encrypted bytes of each sample block, in block order.
+
+    With ``load_context_ref`` (protocols that preload contexts) each worker
+    deserializes the public context once and ``encrypt_data`` receives it.
+    """
+    task = functools.partial(
+        _encode_encrypt_block, encode_ref, encrypt_ref, context, as_ndarray, load_context_ref
+    )
+    yield from _map_blocks(task, matrix, blocks, workers)
@@ -23,6 +23,9 @@ class ConfigManager:
         # Base config directory - always exists
         self.base_config_dir = Path.home() / ".securegenomics"
         
+        # Content-addressed protocol store shared by every user directory
+        self.protocol_store_dir = self.base_config_dir / ".store" / "protocols"
+        
         # Initially use unauthenticated paths
         self._current_user = None
         self._setup_paths()
@@ -43,6 +46,21 @@ class ConfigManager:
             "auto_verify_protocols": True,
             "max_parallel_uploads": 3,
             "crypto_context_upload_timeout": 300,  # 5 minutes for large crypto context uploads
+            "protocol_verify_ttl": 3600,  # 1 hour before a cached verification is re-checked
+            "execution_mode": "inprocess",  # inprocess, pool
+            "worker_pool_size": 2,
+            "shared_payload_threshold": 1024 * 1024,  # 1MB; larger payloads bypass pickling
+            "protocol_index_ttl": 86400,  # 1 day before 'protocol list' re-queries GitHub
+            "encode_workers": 0,  # 0 = one per CPU core
+            "encode_shard_size_bp": 10_000_000,  # 10Mb regions; 0 = one shard per contig
+            "vcf_full_validation": False,  # per-genotype checks during single-pass encodes; order is always checked
+            "auto_index_vcf": True,  # build a cached bgzip+CSI copy of unindexed VCF inputs
+            "vcf_index_cache_max_bytes": 20 * 1024 * 1024 * 1024,  # 20GB of indexed VCF copies
+            "encode_cache_max_bytes": 5 * 1024 * 1024 * 1024,  # 5GB of reusable encodes; 0 disables
+            "sparse_encode_threshold": 0.1,  # store encodings sparse at <=10% non-zeros; 0 disables
+            "cohort_block_size": 64,  # samples encoded and encrypted per task in cohort mode
+            "encrypt_workers": 0,  # 0 = one per CPU core; for protocols with batched encryption
+            "context_cache_size": 2,  # deserialized crypto contexts kept in memory; 0 disables
         }
     
     def _setup_paths(self) -> None:
@@ -61,6 +79,11 @@ class ConfigManager:
         self.protocols_dir = self.config_dir / "protocols"
         self.crypto_context_dir = self.config_dir / "crypto_context"
         self.projects_dir = self.config_dir / "projects"
+        self.verification_cache_file = self.config_dir / "verification_cache.json"
+        self.protocol_index_file = self.config_dir / "protocol_index.json"
+        self.vcf_index_cache_dir = self.config_dir / "vcf_index_cache"
+        self.file_digest_cache_file = self.config_dir / "file_digests.json"
+        self.encode_cache_dir = self.config_dir / "encode_cache"
     
     def _sanitize_username(self, email: str) -> str:
         """Convert email to safe directory name."""
@@ -192,6 +215,83 @@ class ConfigManager:
         config = self.get_config()
         return config.get("protocol_timeout", 300)
     
+    def get_protocol_verify_ttl(self) -> int:
+        """Get how long (in seconds) a successful protocol verification is trusted."""
+        config = self.get_config()
+        return config.get("protocol_verify_ttl", 3600)
+    
+    def get_protocol_index_ttl(self) -> int:
+        """Get how long (in seconds) the local protocol index is served without refreshing."""
+        config = self.get_config()
+        return config.get("protocol_index_ttl", 86400)
+    
+    def get_execution_mode(self) -> str:
+        """Get how protocol operations are executed (inprocess or pool)."""
+        config = self.get_config()
+        return config.get("execution_mode", "inprocess")
+    
+    def get_worker_pool_size(self) -> int:
+        """Get the number of persistent protocol worker processes."""
+        config = self.get_config()
+        return config.get("worker_pool_size", 2)
+    
+    def get_shared_payload_threshold(self) -> int:
+        """Get the size above which worker arguments are passed as memory-mapped files."""
+        config = self.get_config()
+        return config.get("shared_payload_threshold", 1024 * 1024)
+    
+    def get_encode_workers(self) -> int:
+        """Get the number of processes used for region-sharded VCF encoding."""
+        config = self.get_config()
+        workers = config.get("encode_workers", 0)
+        return workers if workers > 0 else (os.cpu_count() or 1)
+    
+    def get_encode_shard_size(self) -> int:
+        """Get the genomic region size (bp) of each VCF encoding shard."""
+        config = self.get_config()
+        return config.get("encode_shard_size_bp", 10_000_000)
+    
+    def get_vcf_full_validation(self) -> bool:
+        """Get whether VCF records are validated while they are encoded."""
+        config = self.get_config()
+        return config.get("vcf_full_validation", False)
+    
+    def get_auto_index_vcf(self) -> bool:
+        """Get whether unindexed VCF inputs are indexed (and cached) automatically."""
+        config = self.get_config()
+        return config.get("auto_index_vcf", True)
+    
+    def get_vcf_index_cache_max_bytes(self) -> int:
+        """Get the size budget of the indexed VCF copy cache."""
+        config = self.get_config()
+        return config.get("vcf_index_cache_max_bytes", 20 * 1024 * 1024 * 1024)
+    
+    def get_encode_cache_max_bytes(self) -> int:
+        """Get the size budget of the encode result cache (0 disables it)."""
+        config = self.get_config()
+        return config.get("encode_cache_max_bytes", 5 * 1024 * 1024 * 1024)
+    
+    def get_sparse_encode_threshold(self) -> float:
+        """Get the largest fraction of non-zero entries stored in sparse form."""
+        config = self.get_config()
+        return config.get("sparse_encode_threshold", 0.1)
+    
+    def get_encrypt_workers(self) -> int:
+        """Get the number of processes used for batched encryption."""
+        config = self.get_config()
+        workers = config.get("encrypt_workers", 0)
+        return workers if workers > 0 else (os.cpu_count() or 1)
+    
+    def get_context_cache_size(self) -> int:
+        """Get the number of deserialized crypto contexts kept in memory."""
+        config = self.get_config()
+        return config.get("context_cache_size", 2)
+    
+    def get_cohort_block_size(self) -> int:
+        """Get the number of samples per block in cohort encode and encrypt."""
+        config = self.get_config()
+        return max(1, config.get("cohort_block_size", 64))
+    
     def get_system_status(self) -> Dict[str, Any]:
         """Get comprehensive system status."""
         config = self.get_config()
@@ -263,6 +363,10 @@ class ConfigManager:
         """Check if debug mode is enabled."""
         return bool(os.getenv("SECUREGENOMICS_DEBUG"))
     
+    def should_reverify(self) -> bool:
+        """Check if cached protocol verifications must be ignored."""
+        return bool(os.getenv("SECUREGENOMICS_REVERIFY"))
+    
     def clean_cache(self) -> None:
         """Clean cached protocols and contexts."""
         import shutil
@@ -272,6 +376,10 @@ class ConfigManager:
             shutil.rmtree(self.protocols_dir)
             self.protocols_dir.mkdir()
         
+        # Cached verifications refer to the protocols just removed
+        if self.verification_cache_file.exists():
+            self.verification_cache_file.unlink()
+        
         # Remove crypto contexts
         if self.crypto_context_dir.exists():
             shutil.rmtree(self.crypto_context_dir)
@@ -281,11 +389,25 @@ class ConfigManager:
         if self.projects_dir.exists():
             shutil.rmtree(self.projects_dir)
             self.projects_dir.mkdir()
+        
+        # Remove bgzipped/indexed copies of user VCFs
+        if self.vcf_index_cache_dir.exists():
+            shutil.rmtree(self.vcf_index_cache_dir)
+        if self.file_digest_cache_file.exists():
+            self.file_digest_cache_file.unlink()
+        
+        # Remove reusable encode results
+        if self.encode_cache_dir.exists():
+            shutil.rmtree(self.encode_cache_dir)
     
     def get_protocol_cache_dir(self, protocol_name: str) -> Path:
         """Get the cache directory for a specific protocol."""
         return self.protocols_dir / protocol_name
     
+    def get_protocol_store_dir(self, commit_hash: str) -> Path:
+        """Get the shared store directory holding a protocol at a specific commit."""
+        return self.protocol_store_dir / commit_hash
+    
     def get_crypto_context_dir(self, project_id: str) -> Path:
         """Get the crypto context directory for a specific project."""
         return self.crypto_context_dir / project_id
@@ -296,6 +418,11 @@ class ConfigManager:
         project_dir.mkdir(parents=True, exist_ok=True)
         return project_dir
     
+    def get_vcf_index_cache_dir(self) -> Path:
+        """Get the directory holding indexed copies of unindexed VCFs."""
+        self.vcf_index_cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.vcf_index_cache_dir
+    
     @classmethod
     def find_most_recent_authenticated_user(cls) -> Optional[str]:
         """
@@ -0,0 +1,458 @@
+"""
+Encoded data container for SecureGenomics CLI.
+
+``.encoded`` files are self-describing: a magic string, a JSON header (format
+version, protocol, commit and the dtype, shape and offset of each array) and
+raw little-endian arrays aligned to 64 bytes, so numeric encodings load with a
+single ``numpy.memmap`` and no parsing. Values that are not numeric arrays
+(dicts, strings, bytes) are stored as one byte payload under the same header.
+Mostly-zero genotype data can be stored sparse (``SparseEncoded``): index and
+value arrays, with CSR row pointers for one row per sample.
+
+Layout::
+
+    b"SGENCODE" | header size (uint32 LE) | header JSON, space padded | arrays
+
+The header area is reserved up front, so streamed encodes write array data
+as it arrives and fill in the final shape when the stream ends. Files written
+before this format (plain JSON, text or bytes) are still readable.
+"""
+
+import json
+import os
+import struct
+import sys
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+MAGIC = b"SGENCODE"
+
+# Version 1 was the headerless JSON/text/bytes layout; 3 added sparse data
+FORMAT_VERSION = 3
+
+# Arrays start on cache-line boundaries
+ALIGNMENT = 64
+
+# Bytes reserved ahead of the data for the prefix and header
+HEADER_RESERVED = 4096
+
+_PREFIX = struct.Struct("<8sI")
+
+# Kinds of value a container holds
+NDARRAY, SPARSE, JSON, TEXT, BYTES = "ndarray", "sparse", "json", "text", "bytes"
+
+
+def _numpy() -> Any:
+    """NumPy if it is installed; containers fall back to JSON payloads without it."""
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def is_ndarray(value: Any) -> bool:
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def _numeric_array(value: Any) -> Any:
+    """Return ``value`` as a little-endian NumPy array if it is numeric, else None."""
+    np = _numpy()
+    if np is None or isinstance(value, (str, bytes, bytearray, memoryview, dict)) or value is None:
+        return None
+
+    if not is_ndarray(value):
+        # Only lists of one numeric type: NumPy would widen [1, 0.5] to floats
+        # and [True, 2] to ints, which the JSON path keeps as they are
+        try:
+            leaf_types = set(map(type, np.asarray(value, dtype=object).ravel()))
+        except (ValueError, TypeError):
+            return None
+        if len(leaf_types) > 1 or any(not issubclass(t, (int, float, np.number, np.bool_)) for t in leaf_types):
+            return None
+        try:
+            value = np.asarray(value)
+        except (ValueError, TypeError):
+            # Ragged nested lists
+            return None
+
+    if value.dtype.kind not in "biuf":
+        return None
+
+    return np.ascontiguousarray(value, dtype=value.dtype.newbyteorder("<"))
+
+
+def _json_items(chunk: Any) -> Tuple[str, int]:
+    """Serialize a chunk as the comma-separated body of a JSON array."""
+    if hasattr(chunk, "tolist"):
+        # NumPy arrays and scalars
+        chunk = chunk.tolist()
+
+    if isinstance(chunk, (list, tuple)):
+        return json.dumps(list(chunk))[1:-1], len(chunk)
+
+    return json.dumps(chunk), 1
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _write_header(f: Any, header: Dict[str, Any]) -> None:
+    """Write the prefix and header into the space reserved at the start of ``f``."""
+    encoded = json.dumps(header).encode("utf-8")
+    header_size = HEADER_RESERVED - _PREFIX.size
+    if len(encoded) > header_size:
+        raise Exception("Encoded file header exceeds the reserved space")
+
+    f.seek(0)
+    f.write(_PREFIX.pack(MAGIC, header_size))
+    f.write(encoded.ljust(header_size, b" "))
+
+
+@dataclass
+class SparseEncoded:
+    """Encoded data that keeps only its non-zero entries.
+
+    A 1-D vector stores the positions and values of its non-zero entries; a
+    2-D matrix (one row per sample) is stored as CSR, where row ``i`` owns
+    ``indices``/``values`` from ``indptr[i]`` to ``indptr[i + 1]``.
+    """
+    shape: Tuple[int, ...]
+    indices: Any
+    values: Any
+    indptr: Optional[Any] = None
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored (non-zero) entries."""
+        return len(self.values)
+
+    @property
+    def dtype(self) -> Any:
+        return self.values.dtype
+
+    @classmethod
+    def from_dense(cls, array: Any) -> "SparseEncoded":
+        """Build a sparse copy of a 1-D or 2-D NumPy array."""
+        np = _numpy()
+        index_dtype = np.int32 if max(array.shape, default=0) < 2 ** 31 else np.int64
+
+        if array.ndim == 1:
+            indices = np.flatnonzero(array)
+            return cls(tuple(array.shape), indices.astype(index_dtype), array[indices])
+
+        if array.ndim == 2:
+            rows, columns = np.nonzero(array)
+            indptr = np.zeros(array.shape[0] + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=array.shape[0]), out=indptr[1:])
+            return cls(tuple(array.shape), columns.astype(index_dtype), array[rows, columns], indptr)
+
+        raise ValueError(f"Sparse encoding supports 1-D and 2-D data, got {array.ndim}-D")
+
+    def to_dense(self) -> Any:
+        """Expand back to a dense NumPy array."""
+        np = _numpy()
+        dense = np.zeros(self.shape, dtype=self.values.dtype)
+        if self.indptr is None:
+            dense[self.indices] = self.values
+        else:
+            rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+            dense[rows, self.indices] = self.values
+        return dense
+
+
+class EncodedWriter:
+    """Writes an ``.encoded`` container, either in one go or chunk by chunk.
+
+    Streamed chunks are combined by kind: numeric chunks (NumPy arrays, lists
+    of numbers, numbers) are appended as rows of one array whose dtype is
+    fixed by the first chunk (or ``dtype``); bytes are concatenated; strings
+    are joined; any other JSON values extend one JSON list. Mixing kinds is
+    an error.
+
+    Output goes to a temporary file that replaces ``path`` on ``close``; an
+    interrupted encode never leaves a truncated ``.encoded`` file behind.
+    """
+
+    def __init__(self, path: Path, metadata: Optional[Dict[str, Any]] = None,
+                 dtype: Optional[str] = None) -> None:
+        self.path = Path(path)
+        self.metadata = metadata or {}
+        self.chunks_written = 0
+        self._temp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        self._file: Optional[Any] = None
+        self._kind: Optional[str] = None
+        self._dtype: Optional[Any] = _numpy().dtype(dtype).newbyteorder("<") if dtype else None
+        self._row_shape: Optional[Tuple[int, ...]] = None
+        self._rows = 0
+        self._items_written = 0
+        self._json_list = False
+        self._nbytes = 0
+
+    def __enter__(self) -> "EncodedWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open(self, kind: str) -> None:
+        if self._kind is None:
+            self._kind = kind
+            self._file = open(self._temp_path, 'wb')
+            self._file.seek(HEADER_RESERVED)
+            if kind == JSON:
+                # Streamed JSON values extend one list
+                self._json_list = True
+                self._emit(b"[")
+        elif self._kind != kind:
+            raise Exception(f"Streaming encoder mixed {self._kind} and {kind} chunks")
+
+    def _emit(self, data: Any) -> None:
+        self._file.write(data)
+        self._nbytes += memoryview(data).nbytes
+
+    def _write_rows(self, array: Any) -> None:
+        if array.ndim == 0:
+            array = array.reshape(1)
+
+        if array.size == 0:
+            # Empty chunks add no rows (and an empty list would read as float64)
+            return
+
+        self._open(NDARRAY)
+        if self._dtype is None:
+            self._dtype = array.dtype
+        if self._row_shape is None:
+            self._row_shape = tuple(array.shape[1:])
+        elif tuple(array.shape[1:]) != self._row_shape:
+            raise Exception(
+                f"Streaming encoder chunk has rows of shape {tuple(array.shape[1:])}, expected {self._row_shape}"
+            )
+
+        try:
+            array = array.astype(self._dtype, casting="same_kind", copy=False)
+        except TypeError:
+            raise Exception(f"Streaming encoder mixed {self._dtype} and {array.dtype} chunks")
+
+        self._emit(array)
+        self._rows += array.shape[0]
+
+    def write(self, chunk: Any) -> None:
+        """Append one chunk of encoded output."""
+        if isinstance(chunk, SparseEncoded):
+            raise Exception("Sparse encoder results must be returned whole, not streamed")
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            self._open(BYTES)
+            self._emit(chunk)
+        elif isinstance(chunk, str):
+            self._open(TEXT)
+            self._emit(chunk.encode("utf-8"))
+        else:
+            array = _numeric_array(chunk) if self._kind in (None, NDARRAY) else None
+            if array is not None:
+                self._write_rows(array)
+            else:
+                self._open(JSON)
+                body, count = _json_items(chunk)
+                if count:
+                    if self._items_written:
+                        self._emit(b", ")
+                    self._emit(body.encode("utf-8"))
+                    self._items_written += count
+
+        self.chunks_written += 1
+
+    def write_value(self, value: Any) -> None:
+        """Store one complete encoder result (not a stream of chunks)."""
+        array = _numeric_array(value)
+        if (array is not None and array.ndim > 0) or isinstance(value, (str, bytes, bytearray, memoryview)):
+            self.write(value)
+            return
+
+        self._kind = JSON
+        self._file = open(self._temp_path, 'wb')
+        self._file.seek(HEADER_RESERVED)
+        self._emit(json.dumps(value).encode("utf-8"))
+        self.chunks_written += 1
+
+    def _header(self) -> Dict[str, Any]:
+        if self._kind == NDARRAY:
+            data = {
+                "dtype": self._dtype.str,
+                "shape": [self._rows, *self._row_shape],
+                "offset": HEADER_RESERVED,
+            }
+        else:
+            data = {"dtype": "|u1", "shape": [self._nbytes], "offset": HEADER_RESERVED}
+
+        return {
+            "format_version": FORMAT_VERSION,
+            "kind": self._kind,
+            "arrays": {"data": data},
+            "metadata": self.metadata,
+        }
+
+    def close(self) -> None:
+        """Write the header and move the file into place."""
+        if self._kind is None:
+            # Nothing was written; store an empty list
+            self._open(JSON)
+        if self._json_list:
+            self._emit(b"]")
+
+        try:
+            _write_header(self._file, self._header())
+        except Exception:
+            self.abort()
+            raise
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self) -> None:
+        """Discard everything written so far."""
+        if self._file is not None:
+            self._file.close()
+        try:
+            os.unlink(self._temp_path)
+        except OSError:
+            pass
+
+
+def _save_sparse(path: Path, value: SparseEncoded, metadata: Optional[Dict[str, Any]]) -> None:
+    np = _numpy()
+    arrays = {"indices": value.indices, "values": value.values}
+    if value.indptr is not None:
+        arrays["indptr"] = value.indptr
+
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            entries = {}
+            offset = HEADER_RESERVED
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+                f.seek(offset)
+                f.write(array)
+                entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+                offset = _align(offset + array.nbytes)
+
+            _write_header(f, {
+                "format_version": FORMAT_VERSION,
+                "kind": SPARSE,
+                "shape": list(value.shape),
+                "arrays": entries,
+                "metadata": metadata or {},
+            })
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def save_encoded(path: Path, value: Any, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """Write one encoder result to an ``.encoded`` container."""
+    if isinstance(value, SparseEncoded):
+        _save_sparse(Path(path), value, metadata)
+        return
+
+    with EncodedWriter(path, metadata) as writer:
+        writer.write_value(value)
+
+
+def sparsify_encoded(path: Path, threshold: float) -> bool:
+    """Rewrite a dense 1-D/2-D array container as sparse when it is mostly zeros.
+
+    ``threshold`` is the largest fraction of non-zero entries for which the
+    sparse form is used. Returns True if the file was rewritten.
+    """
+    header = read_encoded_header(path)
+    if header is None or header["kind"] != NDARRAY or len(header["arrays"]["data"]["shape"]) not in (1, 2):
+        return False
+
+    np = _numpy()
+    dense = load_encoded(path, mmap_mode="r")
+    if dense.size == 0 or np.count_nonzero(dense) > threshold * dense.size:
+        return False
+
+    sparse = SparseEncoded.from_dense(dense)
+    del dense
+    save_encoded(path, sparse, header.get("metadata"))
+    return True
+
+
+def read_encoded_header(path: Path) -> Optional[Dict[str, Any]]:
+    """Read a container's header; None for files in the legacy headerless layout."""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            return None
+        magic, header_size = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            return None
+        return json.loads(f.read(header_size))
+
+
+def _load_legacy_encoded(path: Path) -> Any:
+    """Load a headerless .encoded file (JSON, text or raw bytes) with a single read."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _map_array(path: Path, entry: Dict[str, Any], mmap_mode: str) -> Any:
+    np = _numpy()
+    if np is None:
+        raise Exception("NumPy is required to load array-encoded data")
+
+    shape = tuple(entry["shape"])
+    if 0 in shape:
+        return np.empty(shape, dtype=entry["dtype"])
+    return np.memmap(path, dtype=entry["dtype"], mode=mmap_mode, offset=entry["offset"], shape=shape)
+
+
+def load_encoded(path: Path, mmap_mode: str = "c") -> Any:
+    """Load the value stored in an ``.encoded`` file.
+
+    Numeric arrays come back as ``numpy.memmap`` views of the file (copy-on-
+    write by default), without parsing or copying, and sparse data as a
+    ``SparseEncoded`` over such views. JSON payloads are parsed, text is
+    decoded and bytes are returned as they are.
+    """
+    header = read_encoded_header(path)
+    if header is None:
+        return _load_legacy_encoded(path)
+
+    if header.get("format_version", 0) > FORMAT_VERSION:
+        raise Exception(f"Encoded file format {header['format_version']} is newer than this CLI supports")
+
+    if header["kind"] in (NDARRAY, SPARSE):
+        arrays = {name: _map_array(path, entry, mmap_mode) for name, entry in header["arrays"].items()}
+        if header["kind"] == NDARRAY:
+            return arrays["data"]
+        return SparseEncoded(tuple(header["shape"]), arrays["indices"], arrays["values"], arrays.get("indptr"))
+
+    data = header["arrays"]["data"]
+
+    with open(path, 'rb') as f:
+        f.seek(data["offset"])
+        payload = f.read(data["shape"][0])
+
+    if header["kind"] == JSON:
+        return json.loads(payload)
+    if header["kind"] == TEXT:
+        return payload.decode("utf-8")
+    return payload
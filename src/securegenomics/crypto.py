@@ -13,7 +13,9 @@ import base64
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-from securegenomics.protocol import ProtocolManager
+from securegenomics.cache import FileDigestCache, get_context_cache
+from securegenomics.encryption import ContextSource
+from securegenomics.protocol import ProtocolManager, import_function_from_file
 
 from pydantic import BaseModel
 from rich.console import Console
@@ -198,6 +200,47 @@ class FHEManager:
         except Exception as e:
             raise Exception(f"Failed to load crypto context: {e}")
     
+    def context_digest(self, context_path: Path) -> str:
+        """SHA-256 of a context file, re-hashed only when the file changes."""
+        return FileDigestCache(self.config_manager.file_digest_cache_file).digest(context_path)
+    
+    def public_context_source(self, context_dir: Path) -> ContextSource:
+        """The public context file as encryption workers load and cache it."""
+        context_path = context_dir / "public_crypto_context.bin"
+        if not context_path.exists():
+            raise Exception("Public context file not found")
+        return ContextSource(
+            path=str(context_path),
+            digest=self.context_digest(context_path),
+            cache_size=self.config_manager.get_context_cache_size()
+        )
+    
+    def protocol_context(self, protocol_name: str, context_dir: Path, private: bool = False) -> Any:
+        """Load the crypto context a protocol operation receives.
+        
+        Protocols that preload contexts (see ``ProtocolManager.uses_loaded_context``)
+        get the object their ``load_context`` returns, kept in an in-process
+        LRU keyed by the context file's digest so later operations skip
+        deserialization; others get the raw bytes as from ``load_context``.
+        """
+        if not self.protocol_manager.uses_loaded_context(protocol_name):
+            public_context_bytes, private_context_bytes = self.load_context(context_dir)
+            return private_context_bytes if private else public_context_bytes
+        
+        context_path = context_dir / ("private_crypto_context.bin" if private else "public_crypto_context.bin")
+        if not context_path.exists():
+            raise Exception(f"{'Private' if private else 'Public'} context file not found")
+        
+        load_context_ref = self.protocol_manager.function_ref(protocol_name, "load_context")
+        
+        def deserialize() -> Any:
+            load_context = import_function_from_file(*load_context_ref)
+            with open(context_path, 'rb') as f:
+                return load_context(f.read())
+        
+        cache = get_context_cache(self.config_manager.get_context_cache_size())
+        return cache.get_or_load((self.context_digest(context_path), load_context_ref), deserialize)
+    
     def download_public_context(self, project_id: str) -> bytes:
         """Download public context from server and save locally.
         
@@ -6,22 +6,40 @@ genomic data processing.
 """
 
 import json
+import tempfile
 import time
 import psutil
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
-from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, asdict, replace
 
 import requests
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 
 from securegenomics.auth import AuthManager
+from securegenomics.cache import EncodeCache, FileDigestCache
+from securegenomics.ciphertext import COMPRESSION_CODECS, FramedCiphertextWriter, is_ciphertext_stream, zstd_available
+from securegenomics.cohort import (
+    aggregate_cohort_blocks, encrypt_cohort_blocks, plan_sample_blocks, read_genotype_matrix, sum_encodings
+)
 from securegenomics.config import ConfigManager
 from securegenomics.crypto import FHEManager
-from securegenomics.protocol import ProtocolManager
-from securegenomics.validation import validate_vcf_format
+from securegenomics.container import (
+    FORMAT_VERSION, SparseEncoded, is_ndarray, load_encoded, save_encoded, sparsify_encoded
+)
+from securegenomics.encoding import is_encoded_stream, write_encoded_regions, write_encoded_stream
+from securegenomics.encryption import (
+    ZeroCiphertextPool, encrypt_batches, encrypted_to_bytes, plan_batches, precompute_zero_ciphertexts,
+    summarize_workers
+)
+from securegenomics.protocol import ProtocolManager, read_local_commit_hash
+from securegenomics.validation import iter_validated_records, open_validated_vcf, validate_vcf_format
+from securegenomics.vcf import (
+    extract_target_records, is_indexed_vcf, load_target_regions, plan_vcf_regions, prepare_indexed_vcf
+)
 
 console = Console()
 
@@ -49,6 +67,15 @@ class EncryptionStats:
     timestamp: str
     python_version: str
     
+    # Batched encryption: per-worker batches, bytes, busy time and MB/s
+    num_workers: int = 1
+    worker_stats: Optional[List[Dict[str, Any]]] = None
+    
+    # Ciphertext compression: codec, time spent and stored / serialized ciphertext bytes
+    compression_codec: str = "none"
+    compress_duration_seconds: float = 0.0
+    ciphertext_compression_ratio: float = 1.0
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
         return asdict(self)
@@ -105,35 +132,6 @@ class DataManager:
         """Log audit event with consistent structure."""
         self.config_manager.log_audit_event(event_type, kwargs)
     
-    def _load_file_smart(self, file_path: Path) -> Any:
-        """Smart file loading that handles JSON, text, and binary formats."""
-        try:
-            # Try to load as JSON first
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            try:
-                # Try as text
-                with open(file_path, 'r') as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                # Load as binary
-                with open(file_path, 'rb') as f:
-                    return f.read()
-    
-    def _save_file_smart(self, file_path: Path, data: Any) -> None:
-        """Smart file saving that handles different data types."""
-        if isinstance(data, str):
-            with open(file_path, 'w') as f:
-                f.write(data)
-        elif isinstance(data, (bytes, bytearray)):
-            with open(file_path, 'wb') as f:
-                f.write(data)
-        else:
-            # Assume it's a serializable object (dict, list, etc.)
-            with open(file_path, 'w') as f:
-                json.dump(data, f)
-    
     def _get_project_info(self, project_id: str) -> Dict[str, Any]:
         """Get project information from server."""
         try:
@@ -192,6 +190,286 @@ class DataManager:
             except Exception as e:
                 raise Exception(f"Cannot access project protocol information: {e}")
     
+    def _get_encryption_protocol_name(self, project_id: str) -> str:
+        """Get a project's protocol name, checking that it has a crypto context to encrypt with."""
+        try:
+            # Try to get full project info first (for owners)
+            project_info = self._get_project_info(project_id)
+            protocol_name = project_info["protocol_name"]
+            has_context = project_info.get("has_context") or bool(project_info.get("public_context"))
+        except Exception:
+            # Fall back to minimal protocol info (for contributors)
+            protocol_info = self._get_project_protocol_info(project_id)
+            protocol_name = protocol_info["protocol_name"]
+            has_context = protocol_info.get("has_context", False)
+        
+        # Check if project has public context
+        if not has_context:
+            raise Exception("Project has no crypto context. The project owner needs to generate and upload context first with 'securegenomics crypto_context generate_upload'.")
+        return protocol_name
+    
+    def _require_additive_circuit(self, protocol_name: str) -> None:
+        """Refuse plaintext aggregation unless the protocol declares ``circuit: {additive: true}``."""
+        circuit = self.protocol_manager.get_protocol_config(protocol_name).get("circuit") or {}
+        if not (isinstance(circuit, dict) and circuit.get("additive")):
+            raise Exception(
+                f"Protocol {protocol_name} does not declare an additive circuit (circuit: {{additive: true}} in protocol.yaml); "
+                "its encodings cannot be summed before encryption"
+            )
+    
+    def _get_batch_slots(self, protocol_name: str) -> Optional[int]:
+        """Plaintext values per ciphertext when the protocol opts into batched encryption."""
+        encryption = self.protocol_manager.get_protocol_config(protocol_name).get("encryption") or {}
+        if not encryption.get("batched"):
+            return None
+        return int(encryption.get("slots") or self.fhe_manager.default_parameters["poly_modulus_degree"])
+    
+    def _get_ciphertext_compression(self, protocol_name: str) -> Tuple[str, Optional[int]]:
+        """Codec and level the protocol declares for its ciphertext records.
+        
+        Compression is part of the protocol's wire format
+        (``encryption: {compression: zlib}`` in protocol.yaml), so the server
+        reading the protocol expects the same codec; without it records are
+        stored raw.
+        """
+        encryption = self.protocol_manager.get_protocol_config(protocol_name).get("encryption") or {}
+        codec = encryption.get("compression") or "none"
+        if codec not in COMPRESSION_CODECS:
+            raise Exception(
+                f"Protocol {protocol_name} declares unknown ciphertext compression '{codec}' "
+                f"(expected one of {', '.join(COMPRESSION_CODECS)})"
+            )
+        if codec == "zstd" and not zstd_available():
+            raise Exception(
+                f"Protocol {protocol_name} compresses ciphertexts with zstd; install it with 'pip install zstandard'"
+            )
+        return codec, encryption.get("compression_level")
+    
+    def _encrypt_batched(self, protocol_name: str, encoded_data: Any, slots: int, context_dir: Path,
+                         encrypted_path: Path, progress: Progress,
+                         task: Any) -> Tuple[int, List[Dict[str, Any]], float, FramedCiphertextWriter]:
+        """Encrypt an encoded array in slot-sized batches across worker processes.
+        
+        Ciphertexts are written to a framed ``.encrypted`` file in batch order
+        as they arrive. Batches are encrypted from the project's zero
+        ciphertext pool while it has entries. Returns the worker count,
+        per-worker stats, the time spent writing and the finished writer.
+        """
+        batches = plan_batches(len(encoded_data), slots)
+        workers = max(1, min(self.config_manager.get_encrypt_workers(), len(batches)))
+        
+        # Protocols with load_context deserialize the context once per worker
+        encrypt_ref = self.protocol_manager.function_ref(protocol_name, "encrypt_data")
+        load_context_ref = self.protocol_manager.optional_function_ref(protocol_name, "load_context")
+        batch_ref = self.protocol_manager.optional_function_ref(protocol_name, "encrypt_batch")
+        encoding = self.protocol_manager.get_protocol_config(protocol_name).get("encoding") or {}
+        context = self.fhe_manager.public_context_source(context_dir)
+        
+        # Precomputed encryptions of zero make the remaining work plaintext additions
+        zero_ref = self.protocol_manager.optional_function_ref(protocol_name, "encrypt_with_zero")
+        zero_paths: List[Path] = []
+        if zero_ref is not None:
+            zero_paths = ZeroCiphertextPool.for_context(context_dir, context.digest).claim(len(batches))
+            if len(zero_paths) < len(batches):
+                console.print(
+                    f"[yellow]Warning: Zero ciphertext pool covers {len(zero_paths):,} of {len(batches):,} batches; "
+                    f"run 'securegenomics crypto_context precompute' to refill it[/yellow]"
+                )
+        
+        metadata = {
+            "protocol": protocol_name,
+            "commit": encrypt_ref[2],
+            "slots": slots,
+            "length": len(encoded_data),
+            "dtype": str(encoded_data.dtype),
+        }
+        results = []
+        save_duration = 0.0
+        compression, level = self._get_ciphertext_compression(protocol_name)
+        with FramedCiphertextWriter(encrypted_path, metadata, compression, level) as writer:
+            for result in encrypt_batches(
+                encoded_data,
+                batches,
+                encrypt_ref,
+                context,
+                workers,
+                as_ndarray=bool(encoding.get("ndarray")),
+                load_context_ref=load_context_ref,
+                batch_ref=batch_ref,
+                zero_ref=zero_ref,
+                zero_paths=zero_paths,
+                preload=self.protocol_manager.uses_loaded_context(protocol_name)
+            ):
+                save_start = time.time()
+                writer.write(result.ciphertext)
+                save_duration += time.time() - save_start
+                
+                results.append(replace(result, ciphertext=b""))
+                progress.update(task, description=f"Encrypting data... ({len(results):,}/{len(batches):,} batches on {workers} workers)")
+        
+        return workers, summarize_workers(results), save_duration - writer.compress_seconds, writer
+    
+    def _write_ciphertext_stream(self, encrypted_path: Path, ciphertexts: Iterable[Any], metadata: Dict[str, Any],
+                                 compression: Tuple[str, Optional[int]], progress: Progress,
+                                 task: Any) -> Tuple[float, FramedCiphertextWriter]:
+        """Write ciphertexts to a framed ``.encrypted`` file one record at a time.
+        
+        Returns the time spent writing (without compression) and the finished writer.
+        """
+        save_duration = 0.0
+        codec, level = compression
+        with FramedCiphertextWriter(encrypted_path, metadata, codec, level) as writer:
+            for ciphertext in ciphertexts:
+                save_start = time.time()
+                writer.write(encrypted_to_bytes(ciphertext))
+                save_duration += time.time() - save_start
+                progress.update(task, description=f"Encrypting data... ({writer.records_written:,} ciphertexts written)")
+        return save_duration - writer.compress_seconds, writer
+    
+    def _get_protocol_commit(self, protocol_name: str) -> str:
+        """Fetch and verify a protocol, returning the commit that will run."""
+        module_path, _ = self.protocol_manager.resolve_operation(protocol_name, "encode_vcf")
+        return self.protocol_manager._get_local_commit_hash(module_path.parent)
+    
+    def _encode_cache_key(self, protocol_name: str, commit_hash: str, vcf_path: Path) -> Optional[str]:
+        """Key of an encode in the encode cache, or None when the cache is disabled."""
+        if self.config_manager.get_encode_cache_max_bytes() <= 0:
+            return None
+        
+        vcf_digest = FileDigestCache(self.config_manager.file_digest_cache_file).digest(vcf_path)
+        params = {
+            "format": FORMAT_VERSION,
+            "sparse_threshold": self.config_manager.get_sparse_encode_threshold(),
+        }
+        return EncodeCache.make_key(vcf_digest, protocol_name, commit_hash, params)
+    
+    @contextmanager
+    def _prefilter_to_targets(self, protocol_name: str, vcf_path: Path,
+                              progress: Progress, task: Any) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+        """Narrow a VCF to the target regions its protocol declares, if any.
+        
+        Yields the VCF to encode and details for the audit log. Target regions
+        are read through the VCF's index (an indexed copy is built and cached
+        when it has none); the filtered VCF is removed afterwards.
+        """
+        targets_spec = self.protocol_manager.get_protocol_config(protocol_name).get("targets")
+        if not targets_spec:
+            yield vcf_path, {}
+            return
+        
+        progress.update(task, description="Indexing VCF file...")
+        indexed_path = prepare_indexed_vcf(vcf_path, self.config_manager, required=True)
+        
+        targets = load_target_regions(self.config_manager.get_protocol_cache_dir(protocol_name), targets_spec)
+        progress.update(task, description=f"Extracting {len(targets):,} target regions...")
+        
+        with tempfile.TemporaryDirectory(prefix="securegenomics-targets-") as temp_dir:
+            filtered_path = Path(temp_dir) / "targets.vcf.gz"
+            record_count = extract_target_records(indexed_path, targets, filtered_path)
+            yield filtered_path, {"targets": len(targets), "target_records": record_count}
+    
+    def _prepare_encoded_data(self, protocol_name: str, encoded_data: Any) -> Any:
+        """Convert loaded encoded data to the form the protocol's encrypt_data takes.
+        
+        Sparse data reaches protocols that declare ``encoding: {sparse: true}``
+        as a ``SparseEncoded`` and is expanded for the rest. Array data reaches
+        protocols that declare ``encoding: {ndarray: true}`` as the array
+        itself; others receive a list as before.
+        """
+        if not isinstance(encoded_data, SparseEncoded) and not is_ndarray(encoded_data):
+            return encoded_data
+        
+        encoding = self.protocol_manager.get_protocol_config(protocol_name).get("encoding") or {}
+        if isinstance(encoded_data, SparseEncoded):
+            if encoding.get("sparse"):
+                return encoded_data
+            encoded_data = encoded_data.to_dense()
+        
+        return encoded_data if encoding.get("ndarray") else encoded_data.tolist()
+    
+    def _run_encoder(self, protocol_name: str, vcf_path: Path, encoded_path: Path,
+                     metadata: Dict[str, Any], progress: Progress, task: Any) -> Dict[str, Any]:
+        """Validate and encode a VCF with the fastest encoder the protocol provides.
+        
+        Returns details of how the file was encoded for the audit log.
+        """
+        # Indexed VCFs are split into regions and encoded in parallel
+        regions = []
+        if is_indexed_vcf(vcf_path) and self.protocol_manager.has_operation(protocol_name, "encode_vcf_region"):
+            regions = plan_vcf_regions(vcf_path, self.config_manager.get_encode_shard_size())
+        
+        if regions:
+            validate_vcf_format(str(vcf_path))
+            
+            progress.update(task, description="Encoding VCF regions...")
+            
+            module_path, function_name = self.protocol_manager.resolve_operation(protocol_name, "encode_vcf_region")
+            write_encoded_regions(
+                encoded_path,
+                module_path,
+                function_name,
+                read_local_commit_hash(module_path.parent),
+                vcf_path,
+                regions,
+                self.config_manager.get_encode_workers(),
+                metadata=metadata,
+                on_chunk=lambda count: progress.update(
+                    task, description=f"Encoding VCF regions... ({count:,} chunks written)"
+                )
+            )
+            return {"encoder": "encode_vcf_region", "streaming": True, "shards": len(regions)}
+        
+        if self.protocol_manager.has_operation(protocol_name, "encode_vcf_records"):
+            # Single pass: records are validated on their way into the encoder
+            full_validation = self.config_manager.get_vcf_full_validation()
+            progress.update(task, description="Validating and encoding VCF data...")
+            
+            with open_validated_vcf(str(vcf_path)) as vcf:
+                encoded_data = self.protocol_manager.execute(
+                    protocol_name=protocol_name,
+                    operation="encode_vcf_records",
+                    records=iter_validated_records(vcf, full_validation),
+                    header=vcf.header
+                )
+                streaming = self._write_encoded(encoded_path, encoded_data, metadata, progress, task)
+            return {"encoder": "encode_vcf_records", "streaming": streaming, "full_validation": full_validation}
+        
+        validate_vcf_format(str(vcf_path))
+        
+        # Prefer the streaming encoder so memory stays bounded on large VCFs
+        operation = "encode_vcf_stream" if self.protocol_manager.has_operation(protocol_name, "encode_vcf_stream") else "encode_vcf"
+        
+        progress.update(task, description="Encoding VCF data...")
+        
+        # Encode VCF file using protocol
+        encoded_data = self.protocol_manager.execute(
+            protocol_name=protocol_name,
+            operation=operation,
+            vcf_path=str(vcf_path)
+        )
+        streaming = self._write_encoded(encoded_path, encoded_data, metadata, progress, task)
+        return {"encoder": operation, "streaming": streaming}
+    
+    def _write_encoded(self, encoded_path: Path, encoded_data: Any, metadata: Dict[str, Any],
+                       progress: Progress, task: Any) -> bool:
+        """Save encoder output, draining it chunk by chunk when it is a stream."""
+        if is_encoded_stream(encoded_data):
+            # Write chunks to disk as the protocol yields them
+            write_encoded_stream(
+                encoded_path,
+                encoded_data,
+                metadata=metadata,
+                on_chunk=lambda count: progress.update(
+                    task, description=f"Encoding VCF data... ({count:,} chunks written)"
+                )
+            )
+            return True
+        
+        progress.update(task, description="Saving encoded data...")
+        
+        save_encoded(encoded_path, encoded_data, metadata)
+        return False
+    
     # ============================================================================
     # VCF DATA PROCESSING OPERATIONS
     # ============================================================================
@@ -226,28 +504,55 @@ class DataManager:
                 TextColumn("[progress.description]{task.description}"),
                 console=console
             ) as progress:
-                task = progress.add_task("Validating VCF file...", total=None)
-                
-                # Validate VCF file format
-                validate_vcf_format(str(vcf_path))
+                task = progress.add_task("Checking encode cache...", total=None)
                 
-                progress.update(task, description="Encoding VCF data...")
-                
-                # Encode VCF file using protocol
-                encoded_data = self.protocol_manager.execute(
-                    protocol_name=protocol_name,
-                    operation="encode_vcf",
-                    vcf_path=str(vcf_path)
+                # Reuse an earlier encode of the same VCF by the same protocol commit
+                encode_cache = EncodeCache(
+                    self.config_manager.encode_cache_dir,
+                    self.config_manager.get_encode_cache_max_bytes()
                 )
+                commit_hash = self._get_protocol_commit(protocol_name)
+                cache_key = self._encode_cache_key(protocol_name, commit_hash, vcf_path)
                 
-                progress.update(task, description="Saving encoded data...")
-                
-                # Save encoded data using smart file saving
-                self._save_file_smart(encoded_path, encoded_data)
+                if cache_key and encode_cache.get(cache_key, encoded_path):
+                    encode_details = {"cache_hit": True}
+                else:
+                    # Unindexed inputs are swapped for a cached indexed copy only when the encoder seeks
+                    indexed_path = vcf_path
+                    if self.protocol_manager.has_operation(protocol_name, "encode_vcf_region") or \
+                            self.protocol_manager.uses_vcf_index(protocol_name):
+                        progress.update(task, description="Indexing VCF file...")
+                        indexed_path = prepare_indexed_vcf(vcf_path, self.config_manager)
+                    
+                    progress.update(task, description="Validating VCF file...")
+                    
+                    with self._prefilter_to_targets(protocol_name, indexed_path, progress, task) as (encode_input, prefilter_details):
+                        encode_details = self._run_encoder(
+                            protocol_name, encode_input, encoded_path,
+                            {"protocol": protocol_name, "commit": commit_hash}, progress, task
+                        )
+                    encode_details.update(prefilter_details, cache_hit=False)
+                    
+                    # Mostly hom-ref genotype data is far smaller stored sparse
+                    sparse_threshold = self.config_manager.get_sparse_encode_threshold()
+                    if sparse_threshold > 0:
+                        progress.update(task, description="Compacting encoded data...")
+                        encode_details["sparse"] = sparsify_encoded(encoded_path, sparse_threshold)
+                    if indexed_path != vcf_path:
+                        encode_details["indexed_copy"] = str(indexed_path)
+                    
+                    if cache_key:
+                        try:
+                            encode_cache.put(cache_key, encoded_path)
+                        except OSError as e:
+                            console.print(f"[yellow]Warning: Could not cache encoded data: {e}[/yellow]")
                 
                 progress.update(task, completed=True)
             
-            console.print(f"✅ VCF encoded using protocol: [green]{protocol_name}[/green]")
+            if encode_details["cache_hit"]:
+                console.print(f"✅ VCF encoding reused from cache for protocol: [green]{protocol_name}[/green]")
+            else:
+                console.print(f"✅ VCF encoded using protocol: [green]{protocol_name}[/green]")
             console.print(f"Encoded file saved to: [cyan]{encoded_path}[/cyan]")
             
             # Log audit event
@@ -256,7 +561,8 @@ class DataManager:
                 protocol_name=protocol_name,
                 vcf_file=str(vcf_path),
                 encoded_file=str(encoded_path),
-                file_size=vcf_path.stat().st_size
+                file_size=vcf_path.stat().st_size,
+                **encode_details
             )
             
             return encoded_path
@@ -264,6 +570,57 @@ class DataManager:
         except Exception as e:
             raise Exception(f"Failed to encode VCF file: {e}")
     
+    def aggregate_encoded(self, project_id: str, encoded_paths: List[Path], output_path: Optional[Path] = None) -> Path:
+        """Sum encoded files of an additive protocol into one before encryption.
+        
+        A contributor with N samples then encrypts and uploads one total
+        instead of N vectors for the server to add homomorphically.
+        """
+        try:
+            if not encoded_paths:
+                raise Exception("No encoded files given")
+            for encoded_path in encoded_paths:
+                if not encoded_path.exists():
+                    raise Exception(f"Encoded file not found: {encoded_path}")
+            
+            protocol_name = self._get_protocol_name_for_project(project_id)
+            self._require_additive_circuit(protocol_name)
+            
+            if output_path is None:
+                output_path = self.config_manager.get_project_data_dir(project_id) / "cohort.aggregate.encoded"
+            output_path = Path(output_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console
+            ) as progress:
+                task = progress.add_task(f"Summing {len(encoded_paths):,} encoded files...", total=None)
+                
+                try:
+                    total = sum_encodings(load_encoded(encoded_path) for encoded_path in encoded_paths)
+                except ValueError as e:
+                    raise Exception(f"Encoded files cannot be aggregated: {e}")
+                save_encoded(output_path, total, {"protocol": protocol_name, "aggregated": len(encoded_paths)})
+                
+                progress.update(task, completed=True)
+            
+            console.print(f"✅ Aggregated {len(encoded_paths):,} encoded files for protocol: [green]{protocol_name}[/green]")
+            console.print(f"Aggregated file saved to: [cyan]{output_path}[/cyan]")
+            
+            self._log_audit_event("data_aggregate_encoded",
+                project_id=project_id,
+                protocol_name=protocol_name,
+                encoded_files=[str(path) for path in encoded_paths],
+                aggregated_file=str(output_path)
+            )
+            
+            return output_path
+            
+        except Exception as e:
+            raise Exception(f"Failed to aggregate encoded data: {e}")
+    
     def encrypt_vcf(self, project_id: str, encoded_path: Path, output_dir: Optional[Path] = None) -> tuple[Path, EncryptionStats]:
         """Encrypt encoded VCF data using project's crypto context (step 2 of 3)."""
         import sys
@@ -281,20 +638,7 @@ class DataManager:
             input_size = encoded_path.stat().st_size
             
             # Get protocol name and check if project has context (works for both owners and contributors)
-            try:
-                # Try to get full project info first (for owners)
-                project_info = self._get_project_info(project_id)
-                protocol_name = project_info["protocol_name"]
-                has_context = project_info.get("has_context") or bool(project_info.get("public_context"))
-            except Exception:
-                # Fall back to minimal protocol info (for contributors)
-                protocol_info = self._get_project_protocol_info(project_id)
-                protocol_name = protocol_info["protocol_name"]
-                has_context = protocol_info.get("has_context", False)
-            
-            # Check if project has public context
-            if not has_context:
-                raise Exception("Project has no crypto context. The project owner needs to generate and upload context first with 'securegenomics crypto_context generate_upload'.")
+            protocol_name = self._get_encryption_protocol_name(project_id)
             
             # Determine output path
             if output_dir:
@@ -325,8 +669,15 @@ class DataManager:
                     # Download public context from server
                     self.fhe_manager.download_public_context(project_id)
                 
-                # Load crypto context - returns tuple (public_context_bytes, private_context_bytes)
-                public_context_bytes, private_context_bytes = self.fhe_manager.load_context(context_dir)
+                slots = self._get_batch_slots(protocol_name)
+                if slots is None:
+                    # Deserialized and cached in-process for protocols that preload contexts
+                    public_crypto_context = self.fhe_manager.protocol_context(protocol_name, context_dir)
+                else:
+                    # Batched encryption workers load the context themselves
+                    public_crypto_context = None
+                    if not (context_dir / "public_crypto_context.bin").exists():
+                        raise Exception("Public context file not found")
                 context_duration = time.time() - context_start
                 peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
                 
@@ -334,7 +685,14 @@ class DataManager:
                 
                 # 🎯 Phase 2: Load encoded data
                 data_load_start = time.time()
-                encoded_data = self._load_file_smart(encoded_path)
+                encoded_data = load_encoded(encoded_path)
+                batched = slots is not None and (is_ndarray(encoded_data) or isinstance(encoded_data, SparseEncoded))
+                if batched:
+                    if isinstance(encoded_data, SparseEncoded):
+                        encoded_data = encoded_data.to_dense()
+                    encoded_data = encoded_data.reshape(-1)
+                else:
+                    encoded_data = self._prepare_encoded_data(protocol_name, encoded_data)
                 data_load_duration = time.time() - data_load_start
                 peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
                 
@@ -342,37 +700,76 @@ class DataManager:
                 
                 # 🎯 Phase 3: Core encryption operation
                 encryption_start = time.time()
-                encrypted_data = self.protocol_manager.execute(
-                    protocol_name=protocol_name,
-                    operation="encrypt_data",
-                    encoded_data=encoded_data,
-                    public_crypto_context=public_context_bytes
-                )
-                encryption_duration = time.time() - encryption_start
-                peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
-                
-                progress.update(task, description="Saving encrypted data...")
-                
-                # 🎯 Phase 4: Save encrypted data
-                save_start = time.time()
-                # Convert encrypted data to bytes for storage
-                if isinstance(encrypted_data, str):
-                    encrypted_bytes = encrypted_data.encode('utf-8')
-                elif isinstance(encrypted_data, dict):
-                    encrypted_bytes = json.dumps(encrypted_data).encode('utf-8')
+                num_workers = 1
+                worker_stats = None
+                writer = None
+                if batched:
+                    # Slot-sized batches across worker processes, streamed to a framed file
+                    num_workers, worker_stats, save_duration, writer = self._encrypt_batched(
+                        protocol_name, encoded_data, slots, context_dir, encrypted_path, progress, task
+                    )
+                    encryption_duration = time.time() - encryption_start - save_duration - writer.compress_seconds
                 else:
-                    encrypted_bytes = encrypted_data
+                    if public_crypto_context is None:
+                        public_crypto_context = self.fhe_manager.protocol_context(protocol_name, context_dir)
+                    
+                    # Prefer the streaming encryptor so only a few ciphertexts are in memory at once
+                    operation = "encrypt_data_stream" if self.protocol_manager.has_operation(protocol_name, "encrypt_data_stream") else "encrypt_data"
+                    encrypted_data = self.protocol_manager.execute(
+                        protocol_name=protocol_name,
+                        operation=operation,
+                        encoded_data=encoded_data,
+                        public_crypto_context=public_crypto_context
+                    )
+                    
+                    metadata = {
+                        "protocol": protocol_name,
+                        "commit": read_local_commit_hash(self.config_manager.get_protocol_cache_dir(protocol_name)),
+                    }
+                    compression = self._get_ciphertext_compression(protocol_name)
+                    if is_ciphertext_stream(encrypted_data):
+                        # Records are encrypted lazily while they are written
+                        save_duration, writer = self._write_ciphertext_stream(
+                            encrypted_path, encrypted_data, metadata, compression, progress, task
+                        )
+                        encryption_duration = time.time() - encryption_start - save_duration - writer.compress_seconds
+                    elif compression[0] != "none":
+                        # Protocols declaring compression get single ciphertexts as a one-record framed file
+                        encryption_duration = time.time() - encryption_start
+                        save_duration, writer = self._write_ciphertext_stream(
+                            encrypted_path, [encrypted_data], metadata, compression, progress, task
+                        )
+                    else:
+                        encryption_duration = time.time() - encryption_start
+                        peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
+                        
+                        progress.update(task, description="Saving encrypted data...")
+                        
+                        # 🎯 Phase 4: Save encrypted data
+                        save_start = time.time()
+                        # Convert encrypted data to bytes for storage
+                        encrypted_bytes = encrypted_to_bytes(encrypted_data)
+                        
+                        with open(encrypted_path, 'wb') as f:
+                            f.write(encrypted_bytes)
+                        save_duration = time.time() - save_start
+                        output_size = len(encrypted_bytes)
                 
-                with open(encrypted_path, 'wb') as f:
-                    f.write(encrypted_bytes)
-                save_duration = time.time() - save_start
+                compression_codec = "none"
+                compress_duration = 0.0
+                ciphertext_compression_ratio = 1.0
+                if writer is not None:
+                    output_size = writer.bytes_written
+                    compression_codec = writer.compression
+                    compress_duration = writer.compress_seconds
+                    if writer.record_bytes > 0:
+                        ciphertext_compression_ratio = writer.stored_record_bytes / writer.record_bytes
                 peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
                 
                 progress.update(task, completed=True)
             
             # Calculate final metrics
             total_duration = time.time() - operation_start
-            output_size = len(encrypted_bytes)
             compression_ratio = output_size / input_size if input_size > 0 else 1.0
             cpu_percent = process.cpu_percent()
             
@@ -390,12 +787,25 @@ class DataManager:
                 cpu_percent=cpu_percent,
                 protocol_name=protocol_name,
                 timestamp=datetime.now().isoformat(),
-                python_version=f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
+                python_version=f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
+                num_workers=num_workers,
+                worker_stats=worker_stats,
+                compression_codec=compression_codec,
+                compress_duration_seconds=compress_duration,
+                ciphertext_compression_ratio=ciphertext_compression_ratio
             )
             
             console.print(f"✅ Data encrypted using protocol: [green]{protocol_name}[/green]")
             console.print(f"Encrypted file saved to: [cyan]{encrypted_path}[/cyan]")
             console.print(f"⚡ Encryption completed in [blue]{total_duration:.2f}s[/blue] ({stats.throughput_mbps:.1f} MB/s)")
+            if worker_stats:
+                per_worker = ", ".join(f"{worker['throughput_mbps']:.1f}" for worker in worker_stats)
+                console.print(f"🧵 {num_workers} workers: {per_worker} MB/s each")
+            if compression_codec != "none":
+                console.print(
+                    f"🗜️  {compression_codec} compressed ciphertexts to {ciphertext_compression_ratio:.0%} "
+                    f"of their size in [blue]{compress_duration:.2f}s[/blue]"
+                )
             
             # Log audit event with enhanced metrics
             self._log_audit_event("data_encrypt_vcf",
@@ -403,10 +813,13 @@ class DataManager:
                 protocol_name=protocol_name,
                 encoded_file=str(encoded_path),
                 encrypted_file=str(encrypted_path),
-                encrypted_size=len(encrypted_bytes),
+                encrypted_size=output_size,
                 duration_seconds=total_duration,
                 throughput_mbps=stats.throughput_mbps,
-                compression_ratio=compression_ratio
+                compression_ratio=compression_ratio,
+                num_workers=num_workers,
+                compression_codec=compression_codec,
+                ciphertext_compression_ratio=ciphertext_compression_ratio
             )
             
             return encrypted_path, stats
@@ -414,6 +827,273 @@ class DataManager:
         except Exception as e:
             raise Exception(f"Failed to encrypt VCF data: {e}")
     
+    def encode_encrypt_cohort(self, project_id: str, vcf_path: Path, output_dir: Optional[Path] = None,
+                              block_size: Optional[int] = None, aggregate: bool = False) -> tuple[List[Path], EncryptionStats]:
+        """Encode and encrypt a multi-sample VCF in blocks of samples, in parallel.
+        
+        The genotype matrix is decoded once; each block of ``block_size``
+        samples is encoded with the protocol's ``encode_genotypes`` and
+        encrypted into its own file. Returns the block files in sample order.
+        
+        With ``aggregate`` (additive circuits only) the block encodings are
+        summed in plaintext instead and the total is encrypted into one file.
+        """
+        import sys
+        
+        operation_start = time.time()
+        process = psutil.Process()
+        peak_memory = process.memory_info().rss / 1024 / 1024  # MB
+        
+        try:
+            if not vcf_path.exists():
+                raise Exception(f"VCF file not found: {vcf_path}")
+            
+            protocol_name = self._get_encryption_protocol_name(project_id)
+            if not self.protocol_manager.has_operation(protocol_name, "encode_genotypes"):
+                raise Exception(f"Protocol {protocol_name} does not support cohort mode (no encode_genotypes in encode.py)")
+            if aggregate:
+                self._require_additive_circuit(protocol_name)
+            
+            block_size = block_size or self.config_manager.get_cohort_block_size()
+            base_name = vcf_path.name
+            for suffix in ('.vcf.gz', '.vcf'):
+                if base_name.endswith(suffix):
+                    base_name = base_name[:-len(suffix)]
+                    break
+            if output_dir:
+                output_dir = Path(output_dir)
+                output_dir.mkdir(parents=True, exist_ok=True)
+            else:
+                output_dir = self.config_manager.get_project_data_dir(project_id)
+            
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console
+            ) as progress:
+                task = progress.add_task("Loading crypto context...", total=None)
+                
+                context_start = time.time()
+                context_dir = self.config_manager.get_crypto_context_dir(project_id)
+                if not context_dir.exists():
+                    self.fhe_manager.download_public_context(project_id)
+                context = self.fhe_manager.public_context_source(context_dir)
+                context_duration = time.time() - context_start
+                
+                # Decode every sample's genotypes in one validated pass
+                data_load_start = time.time()
+                with self._prefilter_to_targets(protocol_name, vcf_path, progress, task) as (cohort_input, prefilter_details):
+                    progress.update(task, description="Decoding genotype matrix...")
+                    with open_validated_vcf(str(cohort_input)) as vcf:
+                        matrix = read_genotype_matrix(
+                            iter_validated_records(vcf, self.config_manager.get_vcf_full_validation()),
+                            list(vcf.header.samples),
+                            prefilter_details.get("target_records")
+                        )
+                sample_count, site_count = matrix.genotypes.shape
+                if not sample_count or not site_count:
+                    raise Exception(f"No genotypes to encode ({sample_count} samples, {site_count} sites)")
+                data_load_duration = time.time() - data_load_start
+                peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
+                
+                blocks = plan_sample_blocks(sample_count, block_size)
+                workers = min(self.config_manager.get_encode_workers(), len(blocks))
+                encode_path, encode_fn = self.protocol_manager.resolve_operation(protocol_name, "encode_genotypes")
+                encrypt_path, encrypt_fn = self.protocol_manager.resolve_operation(protocol_name, "encrypt_data")
+                commit_hash = read_local_commit_hash(encode_path.parent)
+                encoding = self.protocol_manager.get_protocol_config(protocol_name).get("encoding") or {}
+                load_context_ref = None
+                if self.protocol_manager.uses_loaded_context(protocol_name):
+                    load_context_ref = self.protocol_manager.function_ref(protocol_name, "load_context")
+                
+                # Each output is a one-record framed file when the protocol declares compression
+                compression = self._get_ciphertext_compression(protocol_name)
+                metadata = {"protocol": protocol_name, "commit": commit_hash}
+                
+                encryption_start = time.time()
+                save_duration = 0.0
+                compress_duration = 0.0
+                record_bytes = 0
+                stored_record_bytes = 0
+                encrypted_paths: List[Path] = []
+                output_size = 0
+                if aggregate:
+                    progress.update(task, description=f"Summing {len(blocks):,} sample block encodings on {workers} workers...")
+                    
+                    # One ciphertext set for the whole cohort instead of one per block
+                    total = aggregate_cohort_blocks(matrix, blocks, (str(encode_path), encode_fn, commit_hash), workers)
+                    
+                    progress.update(task, description="Encrypting cohort total...")
+                    encrypted_data = self.protocol_manager.execute(
+                        protocol_name=protocol_name,
+                        operation="encrypt_data",
+                        encoded_data=self._prepare_encoded_data(protocol_name, total),
+                        public_crypto_context=self.fhe_manager.protocol_context(protocol_name, context_dir)
+                    )
+                    results: Iterable[bytes] = [encrypted_to_bytes(encrypted_data)]
+                    file_names = [f"{base_name}.aggregate.encrypted"]
+                else:
+                    progress.update(task, description=f"Encrypting {len(blocks):,} sample blocks on {workers} workers...")
+                    
+                    results = encrypt_cohort_blocks(
+                        matrix,
+                        blocks,
+                        (str(encode_path), encode_fn, commit_hash),
+                        (str(encrypt_path), encrypt_fn, commit_hash),
+                        context,
+                        workers,
+                        as_ndarray=bool(encoding.get("ndarray")),
+                        load_context_ref=load_context_ref
+                    )
+                    file_names = [f"{base_name}.block{index:04d}.encrypted" for index in range(len(blocks))]
+                
+                for file_name, encrypted_bytes in zip(file_names, results):
+                    encrypted_path = output_dir / file_name
+                    if compression[0] != "none":
+                        block_save_duration, writer = self._write_ciphertext_stream(
+                            encrypted_path, [encrypted_bytes], metadata, compression, progress, task
+                        )
+                        save_duration += block_save_duration
+                        compress_duration += writer.compress_seconds
+                        record_bytes += writer.record_bytes
+                        stored_record_bytes += writer.stored_record_bytes
+                        output_size += writer.bytes_written
+                    else:
+                        save_start = time.time()
+                        with open(encrypted_path, 'wb') as f:
+                            f.write(encrypted_bytes)
+                        save_duration += time.time() - save_start
+                        output_size += len(encrypted_bytes)
+                    
+                    encrypted_paths.append(encrypted_path)
+                    progress.update(task, description=f"Encrypting sample blocks... ({len(encrypted_paths):,}/{len(file_names):,})")
+                encryption_duration = time.time() - encryption_start - save_duration - compress_duration
+                ciphertext_compression_ratio = stored_record_bytes / record_bytes if record_bytes > 0 else 1.0
+                peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024)
+                
+                progress.update(task, completed=True)
+            
+            total_duration = time.time() - operation_start
+            input_size = matrix.genotypes.nbytes
+            stats = EncryptionStats(
+                total_duration_seconds=total_duration,
+                context_load_duration_seconds=context_duration,
+                data_load_duration_seconds=data_load_duration,
+                encryption_duration_seconds=encryption_duration,
+                save_duration_seconds=save_duration,
+                input_size_bytes=input_size,
+                output_size_bytes=output_size,
+                compression_ratio=output_size / input_size if input_size > 0 else 1.0,
+                peak_memory_mb=peak_memory,
+                cpu_percent=process.cpu_percent(),
+                protocol_name=protocol_name,
+                timestamp=datetime.now().isoformat(),
+                python_version=f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
+                num_workers=workers,
+                compression_codec=compression[0],
+                compress_duration_seconds=compress_duration,
+                ciphertext_compression_ratio=ciphertext_compression_ratio
+            )
+            
+            console.print(f"✅ Encrypted {sample_count:,} samples × {site_count:,} sites using protocol: [green]{protocol_name}[/green]")
+            if aggregate:
+                console.print(f"Encrypted cohort total to: [cyan]{encrypted_paths[0]}[/cyan]")
+            else:
+                console.print(f"Encrypted {len(encrypted_paths):,} block files to: [cyan]{output_dir}[/cyan]")
+            console.print(f"⚡ Cohort completed in [blue]{total_duration:.2f}s[/blue] ({stats.throughput_mbps:.1f} MB/s)")
+            if compression[0] != "none":
+                console.print(
+                    f"🗜️  {compression[0]} compressed ciphertexts to {ciphertext_compression_ratio:.0%} "
+                    f"of their size in [blue]{compress_duration:.2f}s[/blue]"
+                )
+            
+            self._log_audit_event("data_encode_encrypt_cohort",
+                project_id=project_id,
+                protocol_name=protocol_name,
+                vcf_file=str(vcf_path),
+                encrypted_files=[str(path) for path in encrypted_paths],
+                samples=sample_count,
+                sites=site_count,
+                block_size=block_size,
+                workers=workers,
+                aggregated=aggregate,
+                duration_seconds=total_duration,
+                throughput_mbps=stats.throughput_mbps,
+                compression_codec=compression[0],
+                ciphertext_compression_ratio=ciphertext_compression_ratio,
+                **prefilter_details
+            )
+            
+            return encrypted_paths, stats
+            
+        except Exception as e:
+            raise Exception(f"Failed to encode and encrypt cohort: {e}")
+    
+    def precompute_zero_pool(self, project_id: str, count: int) -> int:
+        """Add ``count`` encryptions of zero to the project's zero ciphertext pool.
+        
+        Zero ciphertexts hold all the key-dependent randomness of an
+        encryption, so computing them ahead (e.g. overnight) leaves
+        ``encrypt_vcf`` only plaintext additions. Returns the pool size.
+        """
+        try:
+            if count <= 0:
+                raise Exception("Count must be positive")
+            
+            protocol_name = self._get_encryption_protocol_name(project_id)
+            if not self._get_batch_slots(protocol_name) or \
+                    not self.protocol_manager.has_operation(protocol_name, "encrypt_with_zero"):
+                raise Exception(f"Protocol {protocol_name} does not support precomputed encryption (needs batched encryption and encrypt_with_zero)")
+            encrypt_zero_ref = self.protocol_manager.optional_function_ref(protocol_name, "encrypt_zero")
+            if encrypt_zero_ref is None:
+                raise Exception(f"Protocol {protocol_name} does not define encrypt_zero in encrypt.py")
+            
+            context_dir = self.config_manager.get_crypto_context_dir(project_id)
+            if not context_dir.exists():
+                self.fhe_manager.download_public_context(project_id)
+            context = self.fhe_manager.public_context_source(context_dir)
+            pool = ZeroCiphertextPool.for_context(context_dir, context.digest)
+            workers = max(1, min(self.config_manager.get_encrypt_workers(), count))
+            
+            start = time.time()
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                TimeElapsedColumn(),
+                console=console
+            ) as progress:
+                task = progress.add_task(f"Encrypting zeros on {workers} workers...", total=count)
+                precompute_zero_ciphertexts(
+                    pool,
+                    encrypt_zero_ref,
+                    self.protocol_manager.optional_function_ref(protocol_name, "load_context"),
+                    context,
+                    count,
+                    workers,
+                    on_entry=lambda added: progress.update(task, completed=added)
+                )
+            duration = time.time() - start
+            
+            pool_size = pool.size()
+            console.print(f"✅ Precomputed {count:,} zero ciphertexts in [blue]{duration:.2f}s[/blue]")
+            console.print(f"Zero ciphertext pool now holds [cyan]{pool_size:,}[/cyan] entries")
+            
+            self._log_audit_event("data_precompute_zero_pool",
+                project_id=project_id,
+                protocol_name=protocol_name,
+                count=count,
+                pool_size=pool_size,
+                workers=workers,
+                duration_seconds=duration
+            )
+            
+            return pool_size
+            
+        except Exception as e:
+            raise Exception(f"Failed to precompute zero ciphertexts: {e}")
+    
     def upload_data(self, project_id: str, encrypted_path: Path, encryption_stats: Optional[EncryptionStats] = None) -> None:
         """Upload encrypted data file to server (step 3 of 3)."""
         try:
@@ -0,0 +1,305 @@
+"""
+Batched encryption for SecureGenomics CLI.
+
+Splits an encoded vector into plaintext batches of the protocol's slot count
+and encrypts them across a process pool. Each worker deserializes the public
+context once and keeps it for every batch it encrypts; the encoded vector is
+shared through a memory-mapped file, so tasks only carry batch bounds.
+
+Protocols opt in in protocol.yaml:
+
+    encryption:
+      batched: true
+      slots: 4096          # plaintext values per ciphertext
+
+Each batch is passed to ``encrypt_data``. Protocols may also define in
+encrypt.py an ``encrypt_batch(batch, context)`` and a
+``load_context(public_crypto_context)`` that deserializes the context it
+receives (without one it receives the public context bytes):
+
+    def load_context(public_crypto_context):
+        return ts.context_from(public_crypto_context)
+
+    def encrypt_batch(batch, context):
+        return ts.bfv_vector(context, batch).serialize()
+
+Encryption of zero does not depend on the data, so it can be done ahead of
+time: with ``encrypt_zero(context)`` and ``encrypt_with_zero(batch,
+zero_ciphertext, context)`` defined, ``crypto_context precompute`` fills a
+``ZeroCiphertextPool`` and batches are later encrypted by adding the
+plaintext to a pooled zero. Every pool entry is used for one batch at most.
+"""
+
+import functools
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from securegenomics.encoding import map_in_pool
+from securegenomics.workers import export_payload, import_payload, release_payload
+
+# (protocol module path, function name, commit hash)
+FunctionRef = Tuple[str, str, Optional[str]]
+
+# Precomputed zero ciphertexts live under the project's crypto context directory
+ZERO_POOL_DIRNAME = "zero_pool"
+
+
+@dataclass(frozen=True)
+class ContextSource:
+    """A public context file with the digest it is cached under in each process.
+
+    The digest is computed once by the CLI process, so workers never hash
+    the context and a regenerated file never hits a stale cache entry.
+    """
+    path: str
+    digest: str
+    cache_size: int = 2
+
+
+@dataclass
+class BatchResult:
+    """One encrypted batch and what it cost the worker that encrypted it."""
+    ciphertext: bytes
+    worker_pid: int
+    input_bytes: int
+    seconds: float
+
+
+def encrypted_to_bytes(encrypted_data: Any) -> bytes:
+    """Convert protocol encrypt_data output to the bytes stored on disk."""
+    if isinstance(encrypted_data, str):
+        return encrypted_data.encode('utf-8')
+    if isinstance(encrypted_data, dict):
+        return json.dumps(encrypted_data).encode('utf-8')
+    return encrypted_data
+
+
+def load_public_context(context: ContextSource) -> bytes:
+    """Read a public context, kept in the process's ``ContextCache``."""
+    from securegenomics.cache import get_context_cache
+
+    def read() -> bytes:
+        with open(context.path, 'rb') as f:
+            return f.read()
+
+    return get_context_cache(context.cache_size).get_or_load((context.digest, None), read)
+
+
+def _loaded_context(load_context_ref: FunctionRef, context: ContextSource) -> Any:
+    """Deserialize a public context with the protocol's load_context, once per process.
+
+    Uses the same digest-keyed ``ContextCache`` as the CLI process.
+    """
+    from securegenomics.cache import get_context_cache
+    from securegenomics.protocol import import_function_from_file
+
+    def deserialize() -> Any:
+        load_context = import_function_from_file(*load_context_ref)
+        with open(context.path, 'rb') as f:
+            return load_context(f.read())
+
+    return get_context_cache(context.cache_size).get_or_load((context.digest, tuple(load_context_ref)), deserialize)
+
+
+def _protocol_context(load_context_ref: Optional[FunctionRef], context: ContextSource) -> Any:
+    """The context a protocol hook receives: deserialized if it can load one, bytes otherwise."""
+    if load_context_ref is not None:
+        return _loaded_context(load_context_ref, context)
+    return load_public_context(context)
+
+
+class ZeroCiphertextPool:
+    """Precomputed encryptions of zero for one public context.
+
+    Entries are files in ``pool_dir``. ``claim`` moves entries into a
+    private directory with an atomic rename, so concurrent encryptions can
+    never be handed the same entry, and a claimed entry is deleted once it
+    is read or the encryption that claimed it ends. No entry is used twice.
+    """
+
+    def __init__(self, pool_dir: Path) -> None:
+        self.pool_dir = pool_dir
+
+    @classmethod
+    def for_context(cls, context_dir: Path, context_digest: str) -> "ZeroCiphertextPool":
+        """The pool for a public context by its SHA-256; a new context never sees old entries."""
+        return cls(context_dir / ZERO_POOL_DIRNAME / context_digest[:16])
+
+    def size(self) -> int:
+        """Number of unclaimed entries."""
+        if not self.pool_dir.exists():
+            return 0
+        return sum(1 for _ in self.pool_dir.glob("*.zero"))
+
+    def add(self, ciphertext: bytes) -> None:
+        """Store one encryption of zero."""
+        self.pool_dir.mkdir(parents=True, exist_ok=True)
+        name = uuid.uuid4().hex
+        temp_path = self.pool_dir / f".{name}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(ciphertext)
+        os.replace(temp_path, self.pool_dir / f"{name}.zero")
+
+    def claim(self, count: int) -> List[Path]:
+        """Take up to ``count`` entries out of the pool for this process."""
+        if count <= 0 or not self.pool_dir.exists():
+            return []
+
+        claimed_dir = self.pool_dir / f".claimed-{uuid.uuid4().hex[:8]}"
+        claimed_dir.mkdir()
+        claimed = []
+        for entry in self.pool_dir.glob("*.zero"):
+            if len(claimed) >= count:
+                break
+            target = claimed_dir / entry.name
+            try:
+                os.rename(entry, target)
+            except FileNotFoundError:
+                continue  # Claimed by another process first
+            claimed.append(target)
+        if not claimed:
+            claimed_dir.rmdir()
+        return claimed
+
+    @staticmethod
+    def consume(path: Path) -> bytes:
+        """Read a claimed entry and delete it."""
+        with open(path, 'rb') as f:
+            ciphertext = f.read()
+        os.unlink(path)
+        return ciphertext
+
+    @staticmethod
+    def discard(paths: Iterable[Path]) -> None:
+        """Delete claimed entries that were not used, and their claim directories."""
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            try:
+                os.rmdir(Path(path).parent)
+            except OSError:
+                pass
+
+
+def _encrypt_zero(encrypt_zero_ref: FunctionRef, load_context_ref: Optional[FunctionRef],
+                  context: ContextSource, index: int) -> bytes:
+    """Compute one encryption of zero; runs in a worker process."""
+    from securegenomics.protocol import import_function_from_file
+
+    encrypt_zero = import_function_from_file(*encrypt_zero_ref)
+    return encrypted_to_bytes(encrypt_zero(_protocol_context(load_context_ref, context)))
+
+
+def precompute_zero_ciphertexts(pool: ZeroCiphertextPool, encrypt_zero_ref: FunctionRef,
+                                load_context_ref: Optional[FunctionRef], context: ContextSource, count: int,
+                                workers: int, on_entry: Optional[Callable[[int], None]] = None) -> int:
+    """Add ``count`` fresh encryptions of zero to ``pool``; returns the number added."""
+    task = functools.partial(_encrypt_zero, encrypt_zero_ref, load_context_ref, context)
+    workers = min(workers, count)
+    results = map_in_pool(task, range(count), workers) if workers > 1 else map(task, range(count))
+
+    added = 0
+    for ciphertext in results:
+        pool.add(ciphertext)
+        added += 1
+        if on_entry:
+            on_entry(added)
+    return added
+
+
+def plan_batches(length: int, slots: int) -> List[Tuple[int, int]]:
+    """Split ``length`` values into ``[start, stop)`` batches of ``slots``."""
+    return [(start, min(start + slots, length)) for start in range(0, length, slots)]
+
+
+def _encrypt_batch(encrypt_ref: FunctionRef, context: ContextSource, as_ndarray: bool,
+                   load_context_ref: Optional[FunctionRef], batch_ref: Optional[FunctionRef],
+                   zero_ref: Optional[FunctionRef], preload: bool, encoded: Any,
+                   item: Tuple[Tuple[int, int], Optional[Path]]) -> BatchResult:
+    """Encrypt one batch of an encoded vector; runs in a worker process."""
+    import numpy as np
+    from securegenomics.protocol import import_function_from_file
+
+    (start, stop), zero_path = item
+    batch = np.array(import_payload(encoded)[start:stop])
+
+    started = time.perf_counter()
+    values = batch if as_ndarray else batch.tolist()
+    if zero_path is not None:
+        # Online encryption: add the plaintext to a precomputed zero
+        encrypt_with_zero = import_function_from_file(*zero_ref)
+        zero_ciphertext = ZeroCiphertextPool.consume(zero_path)
+        encrypted_data = encrypt_with_zero(values, zero_ciphertext, _protocol_context(load_context_ref, context))
+    elif batch_ref is not None:
+        encrypt_batch = import_function_from_file(*batch_ref)
+        encrypted_data = encrypt_batch(values, _protocol_context(load_context_ref, context))
+    else:
+        encrypt = import_function_from_file(*encrypt_ref)
+        public_crypto_context = _protocol_context(load_context_ref if preload else None, context)
+        encrypted_data = encrypt(encoded_data=values, public_crypto_context=public_crypto_context)
+    ciphertext = encrypted_to_bytes(encrypted_data)
+
+    return BatchResult(
+        ciphertext=ciphertext,
+        worker_pid=os.getpid(),
+        input_bytes=batch.nbytes,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def encrypt_batches(encoded: Any, batches: List[Tuple[int, int]], encrypt_ref: FunctionRef, context: ContextSource,
+                    workers: int, as_ndarray: bool = False, load_context_ref: Optional[FunctionRef] = None,
+                    batch_ref: Optional[FunctionRef] = None, zero_ref: Optional[FunctionRef] = None,
+                    zero_paths: Optional[List[Path]] = None, preload: bool = False) -> Iterator[BatchResult]:
+    """Yield the encrypted batches of an encoded array, in batch order.
+
+    Batches go to the protocol's ``encrypt_data`` (``encrypt_ref``), or to
+    ``encrypt_batch`` (``batch_ref``) with the context from ``load_context``
+    when the protocol defines them. The first batches are encrypted with
+    ``encrypt_with_zero`` (``zero_ref``) instead, one claimed ``zero_paths``
+    entry each. ``encrypt_data`` gets the loaded context too when the
+    protocol preloads contexts (``preload``). With more than one worker the array is exported once to a
+    memory-mapped file that every worker maps.
+    """
+    zero_paths = zero_paths or []
+    workers = min(workers, len(batches))
+    shared = export_payload(encoded, 0) if workers > 1 else encoded
+    task = functools.partial(
+        _encrypt_batch, encrypt_ref, context, as_ndarray, load_context_ref, batch_ref, zero_ref, preload,
+        shared
+    )
+    items = [(bounds, zero_paths[index] if index < len(zero_paths) else None) for index, bounds in enumerate(batches)]
+
+    try:
+        if workers > 1:
+            yield from map_in_pool(task, items, workers)
+        else:
+            yield from map(task, items)
+    finally:
+        release_payload(shared)
+        # Entries of batches that never ran are not returned to the pool
+        ZeroCiphertextPool.discard(zero_paths)
+
+
+def summarize_workers(results: Iterable[BatchResult]) -> List[Dict[str, Any]]:
+    """Per-worker batch counts, bytes, busy time and throughput (MB/s)."""
+    by_worker: Dict[int, Dict[str, Any]] = {}
+    for result in results:
+        stats = by_worker.setdefault(result.worker_pid, {"batches": 0, "input_bytes": 0, "encrypt_seconds": 0.0})
+        stats["batches"] += 1
+        stats["input_bytes"] += result.input_bytes
+        stats["encrypt_seconds"] += result.seconds
+
+    summary = []
+    for index, stats in enumerate(by_worker.values()):
+        seconds = stats["encrypt_seconds"]
+        throughput = (stats["input_bytes"] / 1024 / 1024) / seconds if seconds > 0 else 0.0
+        summary.append(dict(stats, worker=index, throughput_mbps=throughput))
+    return summary
@@ -7,7 +7,12 @@ with proper authentication, rate limiting, error handling, and retry logic.
 
 import time
 import base64
-from typing import Dict, List, Optional, Any, Union
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -17,6 +22,33 @@ from rich.console import Console
 
 console = Console()
 
+# One request returns every repo with its HEAD commit and protocol.yaml text
+PROTOCOL_CATALOG_QUERY = """
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    repositories(first: 100, after: $cursor, orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        description
+        url
+        isArchived
+        defaultBranchRef { name target { oid } }
+        protocolYaml: object(expression: "HEAD:protocol.yaml") { ... on Blob { text } }
+      }
+    }
+  }
+}
+"""
+
+
+# Requests per hour GitHub allows an authenticated token
+AUTHENTICATED_RATE_LIMIT = 5000
+
+
+class GitHubRateLimitError(Exception):
+    """Raised when a request would have to wait too long for the rate limit."""
+
 
 @dataclass
 class GitHubConfig:
@@ -27,6 +59,10 @@ class GitHubConfig:
     timeout: int = 30
     rate_limit_requests: int = 60
     rate_limit_period: int = 3600
+    max_rate_limit_wait: int = 60
+    max_workers: int = 8
+    cache_dir: Optional[Path] = None
+    catalog_ttl: int = 60
     debug: bool = False
     
     @classmethod
@@ -39,8 +75,20 @@ class GitHubConfig:
             timeout=config('GITHUB_TIMEOUT', default=30, cast=int),
             rate_limit_requests=config('GITHUB_RATE_LIMIT_REQUESTS', default=60, cast=int),
             rate_limit_period=config('GITHUB_RATE_LIMIT_PERIOD', default=3600, cast=int),
+            max_rate_limit_wait=config('GITHUB_MAX_RATE_LIMIT_WAIT', default=60, cast=int),
+            max_workers=config('GITHUB_MAX_WORKERS', default=8, cast=int),
+            cache_dir=cls._default_cache_dir(),
+            catalog_ttl=config('GITHUB_CATALOG_TTL', default=60, cast=int),
             debug=config('DEBUG', default=False, cast=bool),
         )
+    
+    @staticmethod
+    def _default_cache_dir() -> Optional[Path]:
+        """Shared response cache under the SecureGenomics config dir (GITHUB_CACHE=false disables it)."""
+        if not config('GITHUB_CACHE', default=True, cast=bool):
+            return None
+        default_dir = Path.home() / ".securegenomics" / ".github_cache"
+        return Path(config('GITHUB_CACHE_DIR', default=str(default_dir)))
 
 
 @dataclass
@@ -59,36 +107,175 @@ class GitHubResponse:
         return self.status_code == 403 and self.rate_limit_remaining == 0
 
 
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """Write JSON via a unique temp file so concurrent writers never interleave."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class GitHubResponseCache:
+    """
+    On-disk cache of GitHub GET responses with their validators.
+    
+    Stores the ETag/Last-Modified of every successful response so the next
+    run can send a conditional request; GitHub answers unchanged resources
+    with 304, which does not count against the rate limit.
+    """
+    
+    def __init__(self, cache_dir: Path, token: Optional[str] = None):
+        self.cache_dir = cache_dir
+        # Responses fetched with a token must not be served to other identities
+        self._identity = hashlib.sha256(token.encode()).hexdigest()[:16] if token else "anonymous"
+    
+    def _entry_path(self, url: str) -> Path:
+        key = hashlib.sha256(f"{self._identity} {url}".encode()).hexdigest()
+        return self.cache_dir / "responses" / f"{key}.json"
+    
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the cached entry for a fully-qualified URL."""
+        try:
+            with open(self._entry_path(url), 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    
+    def put(self, url: str, data: Any, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Store a response body together with its validators."""
+        if not etag and not last_modified:
+            return
+        try:
+            _write_json_atomic(self._entry_path(url), {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "data": data,
+                "stored_at": time.time(),
+            })
+        except OSError:
+            pass  # Caching is best-effort
+    
+    @property
+    def rate_limit_file(self) -> Path:
+        return self.cache_dir / f"rate_limit_{self._identity}.json"
+
+
 class GitHubRateLimiter:
-    """Simple rate limiter for GitHub API requests."""
+    """Simple thread-safe rate limiter for GitHub API requests.
     
-    def __init__(self, config: GitHubConfig):
+    The local request window lives in memory for one run. Only the limits
+    GitHub reports (X-RateLimit-Remaining/Reset) are saved, so a new run
+    knows an exhausted quota without counting requests it never made.
+    Waits happen outside the lock and are announced; waits longer than
+    ``max_rate_limit_wait`` raise instead.
+    """
+    
+    def __init__(self, config: GitHubConfig, state_file: Optional[Path] = None):
         self.config = config
         self.requests_made = 0
         self.window_start = time.time()
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[int] = None
+        self.state_file = state_file
+        # Authenticated clients get GitHub's much larger per-token quota
+        self.max_requests = config.rate_limit_requests if not config.token else \
+            max(config.rate_limit_requests, AUTHENTICATED_RATE_LIMIT)
+        self._lock = threading.RLock()
+        self._load_state()
     
-    def wait_if_needed(self) -> None:
-        """Wait if rate limit would be exceeded."""
+    def _load_state(self) -> None:
+        """Restore the last GitHub-reported limits from a previous run."""
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            if state.get("reset_at") and state["reset_at"] > time.time():
+                self.remaining = state.get("remaining")
+                self.reset_at = state.get("reset_at")
+        except (OSError, ValueError, TypeError, json.JSONDecodeError):
+            pass
+    
+    def _save_state(self) -> None:
+        if not self.state_file:
+            return
+        try:
+            _write_json_atomic(self.state_file, {
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+            })
+        except OSError:
+            pass
+    
+    def update_from_headers(self, remaining: Optional[int], reset_at: Optional[int]) -> None:
+        """Remember the limits GitHub reported in X-RateLimit-* headers."""
+        if remaining is None:
+            return
+        with self._lock:
+            self.remaining = remaining
+            self.reset_at = reset_at
+            self._save_state()
+    
+    def release(self) -> None:
+        """Give back a reserved slot for a request GitHub did not count (e.g. a 304)."""
+        with self._lock:
+            self.requests_made = max(0, self.requests_made - 1)
+    
+    def acquire(self) -> None:
+        """Wait if needed, then reserve a request slot in the current window."""
+        while True:
+            with self._lock:
+                wait_time, reason = self._required_wait()
+                if wait_time <= 0:
+                    self.record_request()
+                    return
+            self._sleep(wait_time, reason)
+    
+    def _required_wait(self) -> Tuple[float, str]:
+        """Seconds to wait before the next request, and why; resets expired windows."""
         current_time = time.time()
         
+        # GitHub said the quota is exhausted; wait for its reset
+        if self.remaining == 0 and self.reset_at:
+            if self.reset_at > current_time:
+                return self.reset_at - current_time, "GitHub rate limit exhausted"
+            self.remaining = None
+        
         # Reset window if period has passed
         if current_time - self.window_start > self.config.rate_limit_period:
             self.requests_made = 0
             self.window_start = current_time
         
-        # Check if we need to wait
-        if self.requests_made >= self.config.rate_limit_requests:
+        if self.requests_made >= self.max_requests:
             wait_time = self.config.rate_limit_period - (current_time - self.window_start)
             if wait_time > 0:
-                if self.config.debug:
-                    console.print(f"[yellow]Rate limit reached, waiting {wait_time:.1f} seconds...[/yellow]")
-                time.sleep(wait_time)
-                self.requests_made = 0
-                self.window_start = time.time()
+                return wait_time, "Rate limit reached"
+            self.requests_made = 0
+            self.window_start = current_time
+        return 0.0, ""
+    
+    def _sleep(self, wait_time: float, reason: str) -> None:
+        """Wait without holding the lock, or raise when the wait is too long."""
+        if wait_time > self.config.max_rate_limit_wait:
+            raise GitHubRateLimitError(f"{reason}; retry in {wait_time / 60:.0f} minutes or set GITHUB_TOKEN")
+        console.print(f"[yellow]{reason}, waiting {wait_time:.1f} seconds...[/yellow]")
+        time.sleep(wait_time)
+    
+    def wait_if_needed(self) -> None:
+        """Wait if rate limit would be exceeded."""
+        while True:
+            with self._lock:
+                wait_time, reason = self._required_wait()
+            if wait_time <= 0:
+                return
+            self._sleep(wait_time, reason)
     
     def record_request(self) -> None:
         """Record that a request was made."""
-        self.requests_made += 1
+        with self._lock:
+            self.requests_made += 1
 
 
 class GitHubApiClient:
@@ -101,8 +288,11 @@ class GitHubApiClient:
     
     def __init__(self, config: Optional[GitHubConfig] = None):
         self.config = config or GitHubConfig.from_env()
-        self.rate_limiter = GitHubRateLimiter(self.config)
+        self.cache = GitHubResponseCache(self.config.cache_dir, self.config.token) if self.config.cache_dir else None
+        self.rate_limiter = GitHubRateLimiter(self.config, self.cache.rate_limit_file if self.cache else None)
         self.session = requests.Session()
+        self._catalog: Optional[List[Dict[str, Any]]] = None
+        self._catalog_fetched_at = 0.0
         
         # Set up authentication if token is available
         if self.config.token:
@@ -122,25 +312,72 @@ class GitHubApiClient:
     
     def _make_request(self, method: str, url: str, **kwargs) -> GitHubResponse:
         """Make a request with rate limiting and error handling."""
-        self.rate_limiter.wait_if_needed()
+        # Reserve the slot before sending so concurrent callers cannot overshoot
+        try:
+            self.rate_limiter.acquire()
+        except GitHubRateLimitError as e:
+            return GitHubResponse(
+                success=False,
+                error=str(e),
+                status_code=403,
+                rate_limit_remaining=self.rate_limiter.remaining,
+                rate_limit_reset=self.rate_limiter.reset_at
+            )
         
         try:
             kwargs.setdefault('timeout', self.config.timeout)
             
+            # Revalidate cached GET responses instead of downloading them again
+            cache_key = None
+            cached = None
+            if self.cache and method.upper() == 'GET':
+                cache_key = requests.Request(method, url, params=kwargs.get('params')).prepare().url
+                cached = self.cache.get(cache_key)
+                if cached:
+                    headers = dict(kwargs.pop('headers', None) or {})
+                    if cached.get('etag'):
+                        headers['If-None-Match'] = cached['etag']
+                    if cached.get('last_modified'):
+                        headers['If-Modified-Since'] = cached['last_modified']
+                    kwargs['headers'] = headers
+            
             if self.config.debug:
                 console.print(f"[dim]Making {method} request to: {url}[/dim]")
             
             response = self.session.request(method, url, **kwargs)
-            self.rate_limiter.record_request()
             
             # Extract rate limit headers
             rate_limit_remaining = response.headers.get('X-RateLimit-Remaining')
             rate_limit_reset = response.headers.get('X-RateLimit-Reset')
+            self.rate_limiter.update_from_headers(
+                int(rate_limit_remaining) if rate_limit_remaining else None,
+                int(rate_limit_reset) if rate_limit_reset else None
+            )
+            
+            if response.status_code == 304 and cached:
+                # Not modified: GitHub does not count this against the rate limit
+                self.rate_limiter.release()
+                if self.config.debug:
+                    console.print(f"[dim]Served from cache (304): {url}[/dim]")
+                return GitHubResponse(
+                    success=True,
+                    data=cached['data'],
+                    status_code=response.status_code,
+                    rate_limit_remaining=int(rate_limit_remaining) if rate_limit_remaining else None,
+                    rate_limit_reset=int(rate_limit_reset) if rate_limit_reset else None
+                )
             
             if response.status_code == 200:
+                data = response.json()
+                if cache_key:
+                    self.cache.put(
+                        cache_key, data,
+                        response.headers.get('ETag'),
+                        response.headers.get('Last-Modified')
+                    )
                 return GitHubResponse(
                     success=True,
-                    data=response.json(),
+                    data=data,
                     status_code=response.status_code,
                     rate_limit_remaining=int(rate_limit_remaining) if rate_limit_remaining else None,
                     rate_limit_reset=int(rate_limit_reset) if rate_limit_reset else None
@@ -261,6 +498,112 @@ class GitHubApiClient:
         
         return None
     
+    def get_protocol_catalog(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get every non-archived protocol repo with its HEAD SHA and protocol.yaml in one GraphQL request.
+        
+        Entries look like REST repo dicts plus ``head_sha`` and ``metadata``
+        (parsed protocol.yaml, or None). The result is reused for
+        ``catalog_ttl`` seconds. Returns None when no token is configured
+        (GraphQL requires authentication) or the query fails, so callers fall
+        back to REST.
+        """
+        if not self.config.token:
+            return None
+        
+        if self._catalog is not None and time.time() - self._catalog_fetched_at < self.config.catalog_ttl:
+            return self._catalog
+        
+        import yaml
+        
+        url = f"{self.config.api_base}/graphql"
+        catalog = []
+        cursor = None
+        while True:
+            response = self._make_request('POST', url, json={
+                "query": PROTOCOL_CATALOG_QUERY,
+                "variables": {"org": self.config.org, "cursor": cursor},
+            })
+            
+            data = response.data or {}
+            if not response.success or data.get("errors") or not (data.get("data") or {}).get("organization"):
+                if self.config.debug:
+                    console.print(f"[yellow]GraphQL catalog query failed, falling back to REST: {response.error or data.get('errors')}[/yellow]")
+                return None
+            
+            repositories = data["data"]["organization"]["repositories"]
+            for node in repositories["nodes"]:
+                if not node["name"].startswith("protocol-") or node["isArchived"]:
+                    continue
+                
+                branch_ref = node.get("defaultBranchRef") or {}
+                metadata = None
+                yaml_text = (node.get("protocolYaml") or {}).get("text")
+                if yaml_text:
+                    try:
+                        metadata = yaml.safe_load(yaml_text)
+                    except Exception as e:
+                        if self.config.debug:
+                            console.print(f"[yellow]Failed to parse protocol.yaml for {node['name']}: {e}[/yellow]")
+                
+                catalog.append({
+                    "name": node["name"],
+                    "description": node.get("description") or "",
+                    "clone_url": f"{node['url']}.git",
+                    "default_branch": branch_ref.get("name", "main"),
+                    "archived": False,
+                    "head_sha": (branch_ref.get("target") or {}).get("oid"),
+                    "metadata": metadata,
+                })
+            
+            if not repositories["pageInfo"]["hasNextPage"]:
+                break
+            cursor = repositories["pageInfo"]["endCursor"]
+        
+        self._catalog = catalog
+        self._catalog_fetched_at = time.time()
+        return catalog
+    
+    def get_remote_head(self, repo_name: str, branch: str = 'main') -> Optional[str]:
+        """Get the default-branch HEAD of a repo, from the catalog when available."""
+        catalog = self.get_protocol_catalog()
+        if catalog is not None:
+            for entry in catalog:
+                if entry["name"] == repo_name and entry["head_sha"]:
+                    return entry["head_sha"]
+        
+        return self.get_latest_commit_hash(repo_name, branch)
+    
+    def download_tarball(self, repo_name: str, ref: str, dest_path: Path) -> GitHubResponse:
+        """Stream the tarball of a repository at ``ref`` (a commit SHA) to ``dest_path``."""
+        url = f"{self.config.api_base}/repos/{self.config.org}/{repo_name}/tarball/{ref}"
+        try:
+            self.rate_limiter.acquire()
+            
+            if self.config.debug:
+                console.print(f"[dim]Downloading tarball: {url}[/dim]")
+            
+            with self.session.get(url, stream=True, timeout=self.config.timeout) as response:
+                if response.status_code != 200:
+                    return GitHubResponse(
+                        success=False,
+                        error=f"HTTP {response.status_code}",
+                        status_code=response.status_code
+                    )
+                
+                with open(dest_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+            
+            return GitHubResponse(success=True, status_code=200)
+        
+        except requests.exceptions.Timeout:
+            return GitHubResponse(success=False, error="Request timeout")
+        except requests.exceptions.ConnectionError:
+            return GitHubResponse(success=False, error="Connection error")
+        except Exception as e:
+            return GitHubResponse(success=False, error=str(e))
+    
     def check_api_status(self) -> GitHubResponse:
         """Check if GitHub API is accessible."""
         url = f"{self.config.api_base}/user" if self.config.token else f"{self.config.api_base}/repos/{self.config.org}"
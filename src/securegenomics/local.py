@@ -13,6 +13,7 @@ from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeEl
 
 from securegenomics.config import ConfigManager
 from securegenomics.protocol import ProtocolManager
+from securegenomics.vcf import prepare_indexed_vcf
 
 console = Console()
 
@@ -60,6 +61,12 @@ class LocalAnalyzer:
                 if not self.protocol_manager.verify(protocol_name):
                     raise Exception(f"Protocol {protocol_name} verification failed")
                 
+                # Give protocols that seek an indexed copy of unindexed inputs
+                analysis_input = vcf_path
+                if self.protocol_manager.uses_vcf_index(protocol_name):
+                    progress.update(task, description="Indexing VCF file...")
+                    analysis_input = prepare_indexed_vcf(vcf_path, self.config_manager)
+                
                 progress.update(task, advance=50, completed=True)
                 
                 # Execute protocol analysis
@@ -69,7 +76,7 @@ class LocalAnalyzer:
                 local_compute_result = self.protocol_manager.execute(
                     protocol_name=protocol_name,
                     operation="local_compute",
-                    vcf_path=str(vcf_path)
+                    vcf_path=str(analysis_input)
                 )
                 
                 # tell user that local compute is done, and now interpreting
@@ -111,7 +118,7 @@ class LocalAnalyzer:
         return datetime.datetime.utcnow().isoformat()
         
     def list_local_protocols(self) -> List[str]:
-        """List protocols that support local analysis."""
+        """List protocols that support local analysis (from the local protocol index)."""
         try:
             protocols = self.protocol_manager.list_protocols()
             return [p.name for p in protocols if p.local_supported]
@@ -119,19 +126,18 @@ class LocalAnalyzer:
             return []
     
     def get_protocol_info(self, protocol_name: str) -> Optional[Dict[str, Any]]:
-        """Get information about a specific protocol."""
+        """Get information about a specific protocol (from the local protocol index)."""
         try:
-            protocols = self.protocol_manager.list_protocols()
-            for protocol in protocols:
-                if protocol.name == protocol_name:
-                    return {
-                        "name": protocol.name,
-                        "description": protocol.description,
-                        "version": protocol.version,
-                        "analysis_type": protocol.analysis_type,
-                        "local_supported": protocol.local_supported,
-                        "github_url": protocol.github_url
-                    }
-            return None
+            protocol = self.protocol_manager.get_protocol_info(protocol_name)
+            if protocol is None:
+                return None
+            return {
+                "name": protocol.name,
+                "description": protocol.description,
+                "version": protocol.version,
+                "analysis_type": protocol.analysis_type,
+                "local_supported": protocol.local_supported,
+                "github_url": protocol.github_url
+            }
         except Exception:
             return None 
\ No newline at end of file
@@ -526,8 +526,8 @@ class ProjectManager:
                     if not context_dir.exists():
                         raise Exception("Local crypto context not found. Cannot decrypt results.")
                     
-                    # Load crypto context - returns tuple (public_context_bytes, private_context_bytes)
-                    public_context_bytes, private_context_bytes = self.fhe_manager.load_context(context_dir)
+                    # Load private crypto context (deserialized and cached for protocols that preload it)
+                    private_crypto_context = self.fhe_manager.protocol_context(protocol_name, context_dir, private=True)
                     
                     console.print(f"🔓 Decrypting results using protocol: {protocol_name}")
                     
@@ -537,7 +537,7 @@ class ProjectManager:
                             protocol_name=protocol_name,
                             operation="decrypt_result",
                             encrypted_result=encrypted_result_bytes,
-                            private_crypto_context=private_context_bytes
+                            private_crypto_context=private_crypto_context
                         )
                         console.print(f"✅ Decryption completed successfully")
                         console.print(f"🔍 Decrypted result type: {type(decrypted_result)}")
@@ -639,8 +639,8 @@ class ProjectManager:
                             if not context_dir.exists():
                                 raise Exception("Local crypto context not found. Cannot decrypt results.")
                             
-                            # Load crypto context - returns tuple (public_context_bytes, private_context_bytes)
-                            public_context_bytes, private_context_bytes = self.fhe_manager.load_context(context_dir)
+                            # Load private crypto context (deserialized and cached for protocols that preload it)
+                            private_crypto_context = self.fhe_manager.protocol_context(protocol_name, context_dir, private=True)
                             
                             # Prepare encrypted result for protocol decryption
                             if isinstance(result_data["data"], str):
@@ -661,7 +661,7 @@ class ProjectManager:
                                     protocol_name=protocol_name,
                                     operation="decrypt_result",
                                     encrypted_results=encrypted_result,
-                                    private_crypto_context=private_context_bytes
+                                    private_crypto_context=private_crypto_context
                                 )
                                 console.print(f"✅ Decryption completed successfully")
                                 console.print(f"🔍 Decrypted result type: {type(decrypted_result)}")
@@ -5,13 +5,19 @@ Handles GitHub protocol discovery, caching, verification, and execution.
 GitHub is the source of truth for all protocols.
 """
 
+import ast
 import hashlib
 import inspect
 import json
 import os
+import shutil
 import subprocess
+import tarfile
 import tempfile
+import time
+import uuid
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -19,6 +25,7 @@ from pydantic import BaseModel
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
+from securegenomics.assets import precompile_protocol
 from securegenomics.config import ConfigManager
 from securegenomics.github import get_github_client
 
@@ -27,18 +34,41 @@ console = Console()
 import importlib.util
 import os
 
-def import_function_from_file(file_path: str, function_name: str):
-    module_name = os.path.splitext(os.path.basename(file_path))[0]
+# Loaded protocol modules, keyed by absolute path. Each entry remembers the
+# (mtime, size, commit) it was loaded from so a re-fetched file is re-imported.
+_module_cache: Dict[str, Tuple[Tuple[int, int, Optional[str]], Any]] = {}
 
-    # Load the module from file
-    spec = importlib.util.spec_from_file_location(module_name, file_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+def import_function_from_file(file_path: str, function_name: str, commit_hash: Optional[str] = None):
+    abs_path = os.path.abspath(file_path)
+    stat = os.stat(abs_path)
+    cache_key = (stat.st_mtime_ns, stat.st_size, commit_hash)
+    
+    cached = _module_cache.get(abs_path)
+    if cached and cached[0] == cache_key:
+        module = cached[1]
+    else:
+        module_name = os.path.splitext(os.path.basename(abs_path))[0]
+
+        # Load the module from file
+        spec = importlib.util.spec_from_file_location(module_name, abs_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _module_cache[abs_path] = (cache_key, module)
 
     # Get the function
     func = getattr(module, function_name)
     return func
 
+def invalidate_module_cache(protocol_dir: Optional[Path] = None) -> None:
+    """Forget loaded protocol modules under ``protocol_dir`` (or all of them)."""
+    if protocol_dir is None:
+        _module_cache.clear()
+        return
+    
+    prefix = os.path.join(os.path.abspath(protocol_dir), "")
+    for path in [p for p in _module_cache if p.startswith(prefix)]:
+        del _module_cache[path]
+
 class ProtocolInfo(BaseModel):
     """Information about a protocol."""
     name: str
@@ -50,15 +80,267 @@ class ProtocolInfo(BaseModel):
     local_supported: bool = True
     aggregated_supported: bool = True
 
+# Map operations to their respective files and functions
+OPERATION_MAPPING = {
+    "generate_keys": ("generate_keys", "generate_keys"),
+    "encode_vcf": ("encode", "encode_vcf"),
+    "encode_vcf_stream": ("encode", "encode_vcf_stream"),
+    "encode_vcf_region": ("encode", "encode_vcf_region"),
+    "encode_vcf_records": ("encode", "encode_vcf_records"),
+    "encode_genotypes": ("encode", "encode_genotypes"),
+    "encrypt_data": ("encrypt", "encrypt_data"),
+    "encrypt_data_stream": ("encrypt", "encrypt_data_stream"),
+    "load_context": ("encrypt", "load_context"),
+    "encrypt_batch": ("encrypt", "encrypt_batch"),
+    "encrypt_zero": ("encrypt", "encrypt_zero"),
+    "encrypt_with_zero": ("encrypt", "encrypt_with_zero"),
+    "execute_computation_circuit": ("circuit", "compute"),
+    "decrypt_result": ("decrypt", "decrypt_result"),
+    "interpret_result": ("decrypt", "interpret_result"),
+    "analyze_local": ("local_analysis", "analyze_local"),
+    "compute_local": ("local_analysis", "compute_local"),
+    
+    "local_compute": ("local_compute", "local_compute"),
+    "local_interpret": ("local_interpret", "local_interpret"),
+}
+
+# Operations that take or return generators, which cannot cross a process boundary
+IN_PROCESS_OPERATIONS = {"encode_vcf_stream", "encode_vcf_records", "encrypt_data_stream"}
+
+# Operations that receive a deserialized crypto context when the protocol preloads it
+CONTEXT_OPERATIONS = {"encrypt_data", "encrypt_data_stream", "decrypt_result"}
+
+def protocol_defines_function(module_path: Path, function_name: str) -> bool:
+    """Check for a top-level function in a protocol module without importing it."""
+    if not module_path.exists():
+        return False
+    
+    tree = ast.parse(module_path.read_text(), filename=str(module_path))
+    return any(
+        isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == function_name
+        for node in tree.body
+    )
+
+# Written into every protocol store entry; records the commit it was unpacked from
+COMMIT_MARKER = ".commit"
+
+def read_local_commit_hash(protocol_dir: Path) -> Optional[str]:
+    """Read the commit of a cached protocol without spawning git.
+    
+    Uses the store's commit marker, or resolves ``.git/HEAD`` through loose
+    refs and ``packed-refs`` for legacy clones. Returns None when neither is
+    understood so callers can fall back to git itself.
+    """
+    marker = protocol_dir / COMMIT_MARKER
+    if marker.exists():
+        try:
+            return marker.read_text().strip() or None
+        except OSError:
+            pass
+    
+    git_dir = protocol_dir / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref:"):
+            return head or None
+        
+        ref = head[len("ref:"):].strip()
+        ref_path = git_dir / ref
+        if ref_path.exists():
+            return ref_path.read_text().strip() or None
+        
+        packed_refs = git_dir / "packed-refs"
+        if packed_refs.exists():
+            for line in packed_refs.read_text().splitlines():
+                if line.startswith(("#", "^")):
+                    continue
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    
+    return None
+
+class VerificationCache:
+    """On-disk cache of successful protocol verifications.
+    
+    Entries record (protocol name, local HEAD, remote HEAD) and are trusted
+    for ``ttl`` seconds, so repeated executions skip the git subprocess and the
+    GitHub commits request. A hit within the TTL therefore does not notice new
+    remote commits on its own; callers that already hold a fresh remote HEAD
+    (``fetch``, ``list --refresh``) pass it in so drifted entries are dropped.
+    """
+    
+    def __init__(self, cache_file: Path, ttl: int) -> None:
+        self.cache_file = cache_file
+        self.ttl = ttl
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+    
+    def _save(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            # The cache is an optimization; verification still works without it
+            pass
+    
+    def get(self, protocol_name: str, local_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry if it matches the local HEAD and is still fresh."""
+        entry = self._load().get(protocol_name)
+        if not entry or entry.get("local_hash") != local_hash:
+            return None
+        if time.time() - entry.get("verified_at", 0) > self.ttl:
+            return None
+        return entry
+    
+    def put(self, protocol_name: str, local_hash: str, remote_hash: str) -> None:
+        """Record a successful verification."""
+        entries = self._load()
+        entries[protocol_name] = {
+            "local_hash": local_hash,
+            "remote_hash": remote_hash,
+            "verified_at": time.time(),
+        }
+        self._save(entries)
+    
+    def invalidate(self, protocol_name: str) -> None:
+        """Drop any cached verification for a protocol."""
+        entries = self._load()
+        if entries.pop(protocol_name, None) is not None:
+            self._save(entries)
+    
+    def check_remote(self, remote_heads: Dict[str, str]) -> None:
+        """Drop cached verifications whose remote HEAD no longer matches GitHub."""
+        entries = self._load()
+        drifted = [
+            name for name, entry in entries.items()
+            if name in remote_heads and entry.get("remote_hash") != remote_heads[name]
+        ]
+        if drifted:
+            for name in drifted:
+                del entries[name]
+            self._save(entries)
+
+def _protocol_record(protocol_info: ProtocolInfo) -> Dict[str, Any]:
+    """Serialize ProtocolInfo on both pydantic 1.x and 2.x."""
+    if hasattr(protocol_info, "model_dump"):
+        return protocol_info.model_dump()
+    return protocol_info.dict()
+
+class ProtocolIndex:
+    """Local JSON index of the ProtocolInfo records last discovered on GitHub.
+    
+    Lets listing and per-protocol lookups work without a network scan, and
+    offline when GitHub is unreachable.
+    """
+    
+    def __init__(self, index_file: Path) -> None:
+        self.index_file = index_file
+    
+    def load(self, max_age: Optional[float] = None) -> Optional[List[ProtocolInfo]]:
+        """Load indexed protocols, or None if missing, unreadable or older than ``max_age`` seconds."""
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+            if max_age is not None and time.time() - index.get("updated_at", 0) > max_age:
+                return None
+            return [ProtocolInfo(**record) for record in index.get("protocols", [])]
+        except (OSError, ValueError, TypeError):
+            return None
+    
+    def save(self, protocols: List[ProtocolInfo]) -> None:
+        """Replace the index with a freshly discovered protocol list."""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_file.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    "updated_at": time.time(),
+                    "protocols": [_protocol_record(protocol) for protocol in protocols],
+                }, f, indent=2)
+            os.replace(tmp_path, self.index_file)
+        except OSError:
+            pass  # The index is an optimization; GitHub stays the source of truth
+    
+    def get(self, protocol_name: str) -> Optional[ProtocolInfo]:
+        """Look up one protocol by name (ignoring age)."""
+        for protocol in self.load() or []:
+            if protocol.name == protocol_name:
+                return protocol
+        return None
+    
+    def upsert(self, protocol_info: ProtocolInfo) -> None:
+        """Add or update one protocol record, keeping the index's age."""
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            # No usable index yet: start one that counts as stale for listing
+            index = {"updated_at": 0, "protocols": []}
+        
+        records = [r for r in index.get("protocols", []) if r.get("name") != protocol_info.name]
+        records.append(_protocol_record(protocol_info))
+        index["protocols"] = sorted(records, key=lambda r: r["name"])
+        
+        try:
+            tmp_path = self.index_file.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.index_file)
+        except OSError:
+            pass
+
 class ProtocolManager:
     """Manages protocol discovery, caching, and verification."""
     
     def __init__(self) -> None:
         self.config_manager = ConfigManager()
         self.protocols_dir = self.config_manager.protocols_dir
+        self.verification_cache = VerificationCache(
+            self.config_manager.verification_cache_file,
+            self.config_manager.get_protocol_verify_ttl(),
+        )
+        self.protocol_index = ProtocolIndex(self.config_manager.protocol_index_file)
     
-    def list_protocols(self) -> List[ProtocolInfo]:
-        """List all available protocols from GitHub."""
+    def list_protocols(self, refresh: bool = False) -> List[ProtocolInfo]:
+        """List all available protocols.
+        
+        Served from the local protocol index while it is younger than
+        ``protocol_index_ttl``; otherwise (or with ``refresh``) GitHub is
+        queried and the index rewritten. If GitHub is unreachable, a stale
+        index is used instead.
+        """
+        if not refresh:
+            indexed = self.protocol_index.load(max_age=self.config_manager.get_protocol_index_ttl())
+            if indexed is not None:
+                self.config_manager.log_audit_event("protocol_list", {
+                    "count": len(indexed),
+                    "protocols": [p.name for p in indexed],
+                    "source": "index"
+                })
+                return indexed
+        
+        try:
+            return self._discover_protocols()
+        except Exception:
+            stale = self.protocol_index.load()
+            if stale is None:
+                raise
+            console.print("[yellow]Warning: GitHub unreachable, using the local protocol index[/yellow]")
+            return stale
+    
+    def _discover_protocols(self) -> List[ProtocolInfo]:
+        """Discover all protocols on GitHub and refresh the local index."""
         try:
             github_client = get_github_client()
             
@@ -69,30 +351,30 @@ class ProtocolManager:
             ) as progress:
                 task = progress.add_task("Discovering protocols from GitHub...", total=None)
                 
-                # Get protocol repositories using the GitHub adapter
-                protocol_repos = github_client.list_protocol_repos()
-                
-                if not protocol_repos:
-                    # Check if this is due to an API error
-                    api_status = github_client.check_api_status()
-                    if not api_status.success:
-                        raise Exception(f"GitHub API error: {api_status.error}")
-                
-                protocols = []
-                for repo in protocol_repos:
-                    try:
-                        protocol_info = self._get_protocol_metadata(repo)
-                        if protocol_info:
-                            protocols.append(protocol_info)
-                    except Exception as e:
-                        console.print(f"Warning: Could not load protocol {repo['name']}: {e}")
+                # With a token, one GraphQL query returns repos, HEADs and protocol.yaml
+                catalog = github_client.get_protocol_catalog()
+                if catalog is not None:
+                    protocols = [
+                        self._build_protocol_info(entry, entry["metadata"] or {})
+                        for entry in catalog
+                    ]
+                    # The catalog already carries each HEAD; expire drifted verifications
+                    self.verification_cache.check_remote({
+                        entry["name"].replace("protocol-", ""): entry["head_sha"]
+                        for entry in catalog if entry.get("head_sha")
+                    })
+                else:
+                    protocols = self._list_protocols_rest(github_client)
                 
                 progress.update(task, completed=True)
+            
+            self.protocol_index.save(protocols)
                 
             # Log audit event
             self.config_manager.log_audit_event("protocol_list", {
                 "count": len(protocols),
-                "protocols": [p.name for p in protocols]
+                "protocols": [p.name for p in protocols],
+                "source": "github"
             })
             
             return protocols
@@ -100,8 +382,40 @@ class ProtocolManager:
         except Exception as e:
             raise Exception(f"Failed to list protocols: {e}")
     
+    def _list_protocols_rest(self, github_client: Any) -> List[ProtocolInfo]:
+        """Discover protocols through the REST API (used when GraphQL is unavailable)."""
+        # Get protocol repositories using the GitHub adapter
+        protocol_repos = github_client.list_protocol_repos()
+        
+        if not protocol_repos:
+            # Check if this is due to an API error
+            api_status = github_client.check_api_status()
+            if not api_status.success:
+                raise Exception(f"GitHub API error: {api_status.error}")
+        
+        # Fetch protocol.yaml for every repo concurrently; the shared
+        # rate limiter keeps the fan-out within GitHub's limits
+        protocols = []
+        max_workers = max(1, min(len(protocol_repos), github_client.config.max_workers))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._get_protocol_metadata, repo) for repo in protocol_repos]
+            for repo, future in zip(protocol_repos, futures):
+                try:
+                    protocol_info = future.result()
+                    if protocol_info:
+                        protocols.append(protocol_info)
+                except Exception as e:
+                    console.print(f"Warning: Could not load protocol {repo['name']}: {e}")
+        
+        return protocols
+    
     def fetch(self, protocol_name: str) -> ProtocolInfo:
-        """Fetch (clone) protocol from GitHub."""
+        """Fetch protocol from GitHub into the shared content-addressed store.
+        
+        The tarball of the current HEAD commit is unpacked once into
+        ``~/.securegenomics/.store/protocols/<sha>``; the per-user
+        ``protocols/<name>`` entry is then atomically re-pointed at it.
+        """
         github_client = get_github_client()
         
         # Get protocol repository info
@@ -117,6 +431,11 @@ class ProtocolManager:
         repo_info = response.data
         clone_url = repo_info["clone_url"]
         
+        commit_hash = github_client.get_remote_head(repo_name, repo_info.get("default_branch", "main"))
+        if not commit_hash:
+            raise Exception(f"Could not resolve the latest commit of {repo_name}")
+        self.verification_cache.check_remote({protocol_name: commit_hash})
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -124,21 +443,15 @@ class ProtocolManager:
         ) as progress:
             task = progress.add_task(f"Fetching protocol {protocol_name}...", total=None)
             
-            # Create cache directory
-            protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
-            
-            # Remove existing cache if it exists
-            if protocol_dir.exists():
-                import shutil
-                shutil.rmtree(protocol_dir)
-            
-            # Clone repository
-            result = subprocess.run([
-                "git", "clone", "--depth", "1", clone_url, str(protocol_dir)
-            ], capture_output=True, text=True, timeout=300)
+            store_dir = self.config_manager.get_protocol_store_dir(commit_hash)
+            store_hit = store_dir.exists()
+            if not store_hit:
+                self._download_to_store(github_client, repo_name, commit_hash, store_dir)
             
-            if result.returncode != 0:
-                raise Exception(f"Git clone failed: {result.stderr}")
+            # Point the per-user cache entry at the store
+            protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
+            invalidate_module_cache(protocol_dir)
+            self._link_protocol_dir(protocol_dir, store_dir)
             
             progress.update(task, completed=True)
         
@@ -146,51 +459,144 @@ class ProtocolManager:
         protocol_info = self._get_protocol_metadata(repo_info)
         if not protocol_info:
             raise Exception("Invalid protocol: missing metadata")
+        protocol_info.commit_hash = commit_hash
         
         # Verify protocol after fetching
-        if not self.verify(protocol_name):
+        if not self.verify(protocol_name, use_cache=False):
             raise Exception("Protocol verification failed after fetch")
         
+        self.protocol_index.upsert(protocol_info)
+        
         # Log audit event
         self.config_manager.log_audit_event("protocol_fetch", {
             "protocol": protocol_name,
             "github_url": clone_url,
-            "commit_hash": protocol_info.commit_hash
+            "commit_hash": commit_hash,
+            "store_path": str(store_dir),
+            "store_hit": store_hit
         })
         
         console.print(f"✅ Protocol {protocol_name} cached locally")
         return protocol_info
-            
-        # except subprocess.TimeoutExpired:
-        #     raise Exception("Protocol fetch timed out")
-        # except requests.RequestException as e:
-        #     raise Exception(f"Network error: {e}")
-        # except Exception as e:
-        #     raise Exception(f"Failed to fetch protocol: {e}")
     
-    def verify(self, protocol_name: str) -> bool:
-        """Verify protocol integrity."""
+    def _download_to_store(self, github_client: Any, repo_name: str, commit_hash: str, store_dir: Path) -> None:
+        """Download and unpack the tarball of one commit into the protocol store."""
+        store_root = store_dir.parent
+        store_root.mkdir(parents=True, exist_ok=True)
+        staging_dir = store_root / f".tmp-{uuid.uuid4().hex}"
+        tarball_path = staging_dir.with_suffix(".tar.gz")
+        
+        try:
+            response = github_client.download_tarball(repo_name, commit_hash, tarball_path)
+            if not response.success:
+                raise Exception(f"Tarball download failed: {response.error}")
+            
+            staging_dir.mkdir()
+            with tarfile.open(tarball_path, 'r:gz') as tar:
+                members = []
+                for member in tar.getmembers():
+                    # GitHub tarballs wrap everything in "<org>-<repo>-<sha>/"
+                    parts = Path(member.name).parts
+                    if len(parts) < 2:
+                        continue
+                    relative = Path(*parts[1:])
+                    if relative.is_absolute() or ".." in relative.parts:
+                        raise Exception(f"Unsafe path in protocol tarball: {member.name}")
+                    if member.issym() or member.islnk():
+                        continue  # Protocols are plain files; never follow links
+                    member.name = str(relative)
+                    members.append(member)
+                
+                if hasattr(tarfile, "data_filter"):
+                    tar.extractall(staging_dir, members=members, filter="data")
+                else:
+                    tar.extractall(staging_dir, members=members)
+            
+            # Compile bytecode and declared assets once per commit, before publishing
+            precompile_protocol(staging_dir)
+            
+            (staging_dir / COMMIT_MARKER).write_text(commit_hash + "\n")
+            
+            try:
+                os.rename(staging_dir, store_dir)
+            except OSError:
+                # Another process stored the same commit first; theirs is identical
+                if not store_dir.exists():
+                    raise
+        finally:
+            if tarball_path.exists():
+                tarball_path.unlink()
+            if staging_dir.exists():
+                shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    def _link_protocol_dir(self, protocol_dir: Path, store_dir: Path) -> None:
+        """Atomically point ``protocol_dir`` at a store entry."""
+        protocol_dir.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Legacy per-user git clones are replaced outright
+        if protocol_dir.exists() and not protocol_dir.is_symlink():
+            shutil.rmtree(protocol_dir)
+        
+        temp_link = protocol_dir.parent / f".{protocol_dir.name}.{uuid.uuid4().hex}"
+        try:
+            os.symlink(store_dir, temp_link, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            # No symlink support (e.g. unprivileged Windows): fall back to a private copy
+            shutil.copytree(store_dir, temp_link)
+            if protocol_dir.is_symlink():
+                protocol_dir.unlink()
+            elif protocol_dir.exists():
+                shutil.rmtree(protocol_dir)
+        
+        os.replace(temp_link, protocol_dir)
+    
+    def _get_local_commit_hash(self, protocol_dir: Path) -> str:
+        """Get the commit hash of a cached protocol, falling back to git rev-parse."""
+        local_hash = read_local_commit_hash(protocol_dir)
+        if local_hash:
+            return local_hash
+        
+        result = subprocess.run([
+            "git", "-C", str(protocol_dir), "rev-parse", "HEAD"
+        ], capture_output=True, text=True, timeout=10)
+        
+        if result.returncode != 0:
+            raise Exception("Could not get git commit hash")
+        
+        return result.stdout.strip()
+    
+    def verify(self, protocol_name: str, use_cache: bool = True) -> bool:
+        """Verify protocol integrity.
+        
+        A previous successful verification of the same local commit is reused
+        for ``protocol_verify_ttl`` seconds unless ``use_cache`` is False or
+        ``--reverify`` was given.
+        """
         try:
             protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
             
             if not protocol_dir.exists():
                 raise Exception(f"Protocol {protocol_name} not cached locally")
             
-            # Get current git commit hash
-            result = subprocess.run([
-                "git", "-C", str(protocol_dir), "rev-parse", "HEAD"
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode != 0:
-                raise Exception("Could not get git commit hash")
+            local_hash = self._get_local_commit_hash(protocol_dir)
             
-            local_hash = result.stdout.strip()
+            if use_cache and not self.config_manager.should_reverify():
+                cached = self.verification_cache.get(protocol_name, local_hash)
+                if cached:
+                    self.config_manager.log_audit_event("protocol_verify", {
+                        "protocol": protocol_name,
+                        "local_hash": local_hash,
+                        "remote_hash": cached["remote_hash"],
+                        "verified": True,
+                        "cached": True
+                    })
+                    return True
             
             # Get remote commit hash
             repo_name = f"protocol-{protocol_name}"
             github_client = get_github_client()
             
-            remote_hash = github_client.get_latest_commit_hash(repo_name)
+            remote_hash = github_client.get_remote_head(repo_name)
             if not remote_hash:
                 console.print(f"Warning: Could not verify remote hash for {protocol_name}")
                 # Still verify structure even if remote check fails
@@ -200,6 +606,7 @@ class ProtocolManager:
                 return True  # Allow offline verification
             
             if local_hash != remote_hash:
+                self.verification_cache.invalidate(protocol_name)
                 console.print(f"Warning: Protocol {protocol_name} is outdated")
                 console.print(f"Local: {local_hash[:8]}, Remote: {remote_hash[:8]}")
                 return False
@@ -209,12 +616,15 @@ class ProtocolManager:
             if not structure_valid:
                 raise Exception(f"Protocol structure validation failed:\n" + "\n".join(structure_errors))
             
+            self.verification_cache.put(protocol_name, local_hash, remote_hash)
+            
             # Log audit event
             self.config_manager.log_audit_event("protocol_verify", {
                 "protocol": protocol_name,
                 "local_hash": local_hash,
                 "remote_hash": remote_hash,
-                "verified": True
+                "verified": True,
+                "cached": False
             })
             
             return True
@@ -224,9 +634,8 @@ class ProtocolManager:
         except Exception as e:
             raise Exception(f"Protocol verification failed: {e}")
     
-    def execute(self, protocol_name: str, operation: str, **kwargs: Any) -> Any:
-        """Execute protocol operation in a sandboxed environment."""
-        # try:
+    def resolve_operation(self, protocol_name: str, operation: str) -> Tuple[Path, str]:
+        """Fetch and verify a protocol, then locate the module and function for an operation."""
         protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
         
         if not protocol_dir.exists():
@@ -238,33 +647,33 @@ class ProtocolManager:
         if not self.verify(protocol_name):
             raise Exception(f"Protocol {protocol_name} verification failed")
         
-        # Map operations to their respective files and functions
-        operation_mapping = {
-            "generate_keys": ("generate_keys", "generate_keys"),
-            "encode_vcf": ("encode", "encode_vcf"),
-            "encrypt_data": ("encrypt", "encrypt_data"),
-            "execute_computation_circuit": ("circuit", "compute"),
-            "decrypt_result": ("decrypt", "decrypt_result"),
-            "interpret_result": ("decrypt", "interpret_result"),
-            "analyze_local": ("local_analysis", "analyze_local"),
-            "compute_local": ("local_analysis", "compute_local"),
-            
-            "local_compute": ("local_compute", "local_compute"),
-            "local_interpret": ("local_interpret", "local_interpret"),
-        }
-        
-        if operation not in operation_mapping:
+        if operation not in OPERATION_MAPPING:
             raise Exception(f"Unknown operation: {operation}")
         
-        module_name, function_name = operation_mapping[operation]
-        
-        # Execute in restricted environment
-        # result = self._execute_in_sandbox(protocol_dir, module_name, function_name, **kwargs)
+        module_name, function_name = OPERATION_MAPPING[operation]
+        return Path(protocol_dir / module_name).with_suffix('.py'), function_name
+    
+    def execute(self, protocol_name: str, operation: str, **kwargs: Any) -> Any:
+        """Execute protocol operation in a sandboxed environment."""
+        # try:
+        module_path, function_name = self.resolve_operation(protocol_name, operation)
+        protocol_dir = module_path.parent
+        module_name = module_path.stem
         
-        module_path = Path(protocol_dir / module_name).with_suffix('.py')
-        fn = import_function_from_file(str(module_path), function_name)
+        execution_mode = self.config_manager.get_execution_mode()
+        if operation in IN_PROCESS_OPERATIONS:
+            execution_mode = "inprocess"
+        elif operation in CONTEXT_OPERATIONS and self.uses_loaded_context(protocol_name):
+            # Deserialized contexts cannot be pickled to a worker
+            execution_mode = "inprocess"
         
-        result = fn(**kwargs)
+        if execution_mode == "pool":
+            # Execute in a persistent worker process
+            result = self._execute_in_sandbox(protocol_dir, module_name, function_name, **kwargs)
+        else:
+            fn = import_function_from_file(str(module_path), function_name, read_local_commit_hash(protocol_dir))
+            
+            result = fn(**kwargs)
         
         # Log audit event
         self.config_manager.log_audit_event("protocol_execute", {
@@ -272,6 +681,7 @@ class ProtocolManager:
             "operation": operation,
             "module": module_name,
             "function": function_name,
+            "execution_mode": execution_mode,
             "success": True
         })
         
@@ -287,6 +697,77 @@ class ProtocolManager:
         #     })
         #     raise Exception(f"Protocol execution failed: {e}")
     
+    def function_ref(self, protocol_name: str, operation: str) -> Tuple[str, str, Optional[str]]:
+        """Resolve an operation to the (module path, function name, commit) a worker process imports."""
+        module_path, function_name = self.resolve_operation(protocol_name, operation)
+        return str(module_path), function_name, read_local_commit_hash(module_path.parent)
+    
+    def optional_function_ref(self, protocol_name: str, operation: str) -> Optional[Tuple[str, str, Optional[str]]]:
+        """``function_ref`` for an optional operation, or None when the protocol does not define it."""
+        if not self.has_operation(protocol_name, operation):
+            return None
+        return self.function_ref(protocol_name, operation)
+    
+    def has_operation(self, protocol_name: str, operation: str) -> bool:
+        """Check whether a protocol implements an optional operation."""
+        if operation not in OPERATION_MAPPING:
+            return False
+        
+        protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
+        if not protocol_dir.exists():
+            console.print(f"Protocol {protocol_name} not cached, fetching...")
+            self.fetch(protocol_name)
+        
+        module_name, function_name = OPERATION_MAPPING[operation]
+        return protocol_defines_function(Path(protocol_dir / module_name).with_suffix('.py'), function_name)
+    
+    def get_protocol_config(self, protocol_name: str) -> Dict[str, Any]:
+        """Read a protocol's protocol.yaml, fetching the protocol if needed."""
+        protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
+        if not protocol_dir.exists():
+            console.print(f"Protocol {protocol_name} not cached, fetching...")
+            self.fetch(protocol_name)
+        
+        with open(protocol_dir / "protocol.yaml", 'r') as f:
+            return yaml.safe_load(f) or {}
+    
+    def uses_loaded_context(self, protocol_name: str) -> bool:
+        """Check whether a protocol receives deserialized crypto contexts instead of bytes.
+        
+        Protocols opt in with ``context: {preload: true}`` in protocol.yaml and
+        a ``load_context`` in encrypt.py that deserializes context bytes.
+        """
+        context = self.get_protocol_config(protocol_name).get("context") or {}
+        return bool(isinstance(context, dict) and context.get("preload")) and \
+            self.has_operation(protocol_name, "load_context")
+    
+    def uses_vcf_index(self, protocol_name: str) -> bool:
+        """Check whether a protocol's VCF readers seek through a tabix/CSI index.
+        
+        Protocols opt in with ``vcf: {indexed: true}`` in protocol.yaml; the
+        CLI then hands ``encode_vcf`` and ``local_compute`` an indexed copy of
+        unindexed inputs. Region encoders need the index regardless.
+        """
+        vcf = self.get_protocol_config(protocol_name).get("vcf") or {}
+        return bool(isinstance(vcf, dict) and vcf.get("indexed"))
+    
+    def _execute_in_sandbox(self, protocol_dir: Path, module_name: str, function_name: str, **kwargs: Any) -> Any:
+        """Execute a protocol function in the warm worker pool."""
+        from securegenomics.workers import get_worker_pool
+        
+        pool = get_worker_pool(
+            self.config_manager.get_worker_pool_size(),
+            self.config_manager.get_shared_payload_threshold(),
+        )
+        module_path = Path(protocol_dir / module_name).with_suffix('.py')
+        return pool.run(
+            str(module_path),
+            function_name,
+            read_local_commit_hash(protocol_dir),
+            timeout=self.config_manager.get_protocol_timeout(),
+            **kwargs
+        )
+    
     def _get_protocol_metadata(self, repo_info: Dict[str, Any]) -> Optional[ProtocolInfo]:
         """Get protocol metadata from repository."""
         try:
@@ -302,26 +783,80 @@ class ProtocolManager:
             if not metadata:
                 metadata = {}
             
-            # Extract supported modes from the new protocol format
-            modes = metadata.get("modes", ["local", "aggregated"])
-            local_supported = "local" in modes
-            aggregated_supported = "aggregated" in modes
-            
-            return ProtocolInfo(
-                name=protocol_name,
-                description=metadata.get("description", repo_info.get("description", "")),
-                github_url=repo_info["clone_url"],
-                commit_hash=repo_info["default_branch"],  # This is actually branch name, will be updated later
-                version=metadata.get("version"),
-                analysis_type=metadata.get("analysis_type"),
-                local_supported=local_supported,
-                aggregated_supported=aggregated_supported,
-            )
+            return self._build_protocol_info(repo_info, metadata)
             
         except Exception:
             return None
     
-    def _verify_protocol_structure(self, protocol_dir: Path) -> Tuple[bool, List[str]]:
+    def _build_protocol_info(self, repo_info: Dict[str, Any], metadata: Dict[str, Any]) -> ProtocolInfo:
+        """Build ProtocolInfo from a repository record and its parsed protocol.yaml."""
+        protocol_name = repo_info["name"].replace("protocol-", "")
+        
+        # Extract supported modes from the new protocol format
+        modes = metadata.get("modes", ["local", "aggregated"])
+        local_supported = "local" in modes
+        aggregated_supported = "aggregated" in modes
+        
+        return ProtocolInfo(
+            name=protocol_name,
+            description=metadata.get("description", repo_info.get("description", "")),
+            github_url=repo_info["clone_url"],
+            # Catalog entries carry the HEAD SHA; REST repo records only the branch name
+            commit_hash=repo_info.get("head_sha") or repo_info["default_branch"],
+            version=metadata.get("version"),
+            analysis_type=metadata.get("analysis_type"),
+            local_supported=local_supported,
+            aggregated_supported=aggregated_supported,
+        )
+    
+    def get_protocol_info(self, protocol_name: str) -> Optional[ProtocolInfo]:
+        """Get one protocol's record from the local index, discovering protocols only if it is missing."""
+        protocol_info = self.protocol_index.get(protocol_name)
+        if protocol_info is None:
+            for protocol in self.list_protocols():
+                if protocol.name == protocol_name:
+                    return protocol
+        return protocol_info
+    
+    def list_local_protocols(self) -> List[Dict[str, Any]]:
+        """List locally cached protocols with their metadata and validation status."""
+        local_protocols = []
+        if not self.protocols_dir.exists():
+            return local_protocols
+        
+        for protocol_dir in sorted(self.protocols_dir.iterdir()):
+            if not protocol_dir.is_dir() or protocol_dir.name.startswith('.'):
+                continue
+            
+            config = {}
+            try:
+                with open(protocol_dir / "protocol.yaml", 'r') as f:
+                    config = yaml.safe_load(f) or {}
+            except Exception:
+                pass
+            
+            indexed = self.protocol_index.get(protocol_dir.name)
+            modes = config.get("modes", [])
+            is_valid, validation_errors = self._verify_protocol_structure(protocol_dir, show_errors=False)
+            
+            local_protocols.append({
+                "name": protocol_dir.name,
+                "description": config.get("description") or (indexed.description if indexed else "unknown"),
+                "version": config.get("version") or (indexed.version if indexed else None) or "unknown",
+                "analysis_type": config.get("analysis_type") or (indexed.analysis_type if indexed else None) or "unknown",
+                "modes": modes,
+                "local_supported": "local" in modes,
+                "aggregated_supported": "aggregated" in modes,
+                "commit_hash": read_local_commit_hash(protocol_dir) or "unknown",
+                "commit_date": "unknown",
+                "is_valid": is_valid,
+                "validation_errors": validation_errors,
+                "cache_path": str(protocol_dir),
+            })
+        
+        return local_protocols
+    
+    def _verify_protocol_structure(self, protocol_dir: Path, show_errors: bool = True) -> Tuple[bool, List[str]]:
         """Verify that protocol has required structure according to design spec."""
         errors = []
         
@@ -363,11 +898,26 @@ class ProtocolManager:
                 if missing_aggregated:
                     errors.append(f"Missing required files for aggregated mode: {', '.join(missing_aggregated)}")
             
+            targets = config.get("targets")
+            if targets is not None:
+                if not isinstance(targets, dict) or not (targets.get("sites") or targets.get("regions")):
+                    errors.append("protocol.yaml targets need 'sites' or 'regions'")
+                else:
+                    for key in ("sites", "regions"):
+                        if targets.get(key) and not (protocol_dir / targets[key]).exists():
+                            errors.append(f"Missing targets {key} file: {targets[key]}")
+            
+            for asset in config.get("assets") or []:
+                if not isinstance(asset, dict) or "name" not in asset or "source" not in asset:
+                    errors.append("protocol.yaml assets entries need 'name' and 'source'")
+                elif not (protocol_dir / asset["source"]).exists():
+                    errors.append(f"Missing asset source for '{asset['name']}': {asset['source']}")
+            
         except Exception as e:
             errors.append(f"Could not parse protocol.yaml: {e}")
         
         # Show detailed errors if any
-        if errors:
+        if errors and show_errors:
             console.print(f"[red]Protocol validation errors:[/red]")
             for error in errors:
                 console.print(f"  • {error}")
@@ -384,9 +934,13 @@ class ProtocolManager:
             
             console.print(f"🗑️  Removing local protocol: {protocol_name}")
             
-            # Remove the entire protocol directory
-            import shutil
-            shutil.rmtree(protocol_dir)
+            # Remove the pointer into the shared store (or a legacy directory)
+            if protocol_dir.is_symlink():
+                protocol_dir.unlink()
+            else:
+                shutil.rmtree(protocol_dir)
+            invalidate_module_cache(protocol_dir)
+            self.verification_cache.invalidate(protocol_name)
             
             # Log audit event
             self.config_manager.log_audit_event("protocol_remove_local", {
@@ -401,7 +955,11 @@ class ProtocolManager:
             raise Exception(f"Failed to remove local protocol: {e}")
     
     def refresh_protocol(self, protocol_name: str) -> ProtocolInfo:
-        """Refresh a local protocol by removing and re-fetching it."""
+        """Refresh a local protocol by re-fetching it.
+        
+        The existing copy stays usable until fetch swaps the pointer to the
+        new commit, so a failed refresh leaves the protocol intact.
+        """
         try:
             console.print(f"🔄 Refreshing protocol: {protocol_name}")
             
@@ -409,10 +967,6 @@ class ProtocolManager:
             protocol_dir = self.config_manager.get_protocol_cache_dir(protocol_name)
             was_cached = protocol_dir.exists()
             
-            if was_cached:
-                console.print(f"📦 Removing existing local copy...")
-                self.remove_local_protocol(protocol_name)
-            
             console.print(f"⬇️  Downloading fresh copy...")
             protocol_info = self.fetch(protocol_name)
             
@@ -7,16 +7,17 @@ handled at the CLI level rather than delegated to individual protocols.
 
 import gzip
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterator, Optional
 
 
-def validate_vcf_format(vcf_file_path: str) -> None:
-    """Validate VCF file format using pysam.
+def open_validated_vcf(vcf_file_path: str) -> Any:
+    """Open a VCF file with pysam, validating its header.
     
-    Uses pysam to validate VCF file format and structure.
+    Returns the open ``pysam.VariantFile`` so records can be read in the same
+    pass (see ``iter_validated_records``).
     
     Args:
-        vcf_file_path: Path to the VCF file to validate
+        vcf_file_path: Path to the VCF file to open
         
     Raises:
         FileNotFoundError: If the VCF file doesn't exist
@@ -34,7 +35,7 @@ def validate_vcf_format(vcf_file_path: str) -> None:
         vcf = pysam.VariantFile(vcf_file_path)
         # Access header to validate format
         _ = vcf.header
-        vcf.close()
+        return vcf
         
     except ValueError as e:
         raise ValueError(f"Invalid VCF format: {e}")
@@ -42,6 +43,80 @@ def validate_vcf_format(vcf_file_path: str) -> None:
         raise ValueError(f"Error validating VCF file: {e}")
 
 
+def validate_vcf_format(vcf_file_path: str) -> None:
+    """Validate VCF file format using pysam.
+    
+    Uses pysam to validate VCF file format and structure.
+    
+    Args:
+        vcf_file_path: Path to the VCF file to validate
+        
+    Raises:
+        FileNotFoundError: If the VCF file doesn't exist
+        ValueError: If the VCF file format is invalid
+    """
+    open_validated_vcf(vcf_file_path).close()
+
+
+def iter_validated_records(vcf: Any, full_checks: bool = False) -> Iterator[Any]:
+    """Yield the records of an open VCF, validating them as they are read.
+    
+    Lets a protocol encode from the same pass that validates the file. Record
+    order is always checked, which the header-only ``validate_vcf_format``
+    skips: positions sorted within each contig and each contig in one block.
+    These cost a comparison per record. With ``full_checks`` every sample is
+    checked too (a consistent sample count and GT alleles that exist), which
+    costs a Python-level visit per genotype.
+    
+    Args:
+        vcf: An open ``pysam.VariantFile``
+        full_checks: Whether to also run the per-genotype checks
+        
+    Raises:
+        ValueError: When a record fails a check
+    """
+    sample_count = len(vcf.header.samples)
+    seen_contigs = set()
+    last_contig = None
+    last_pos = 0
+    
+    for record in vcf:
+        if record.chrom != last_contig:
+            if record.chrom in seen_contigs:
+                raise ValueError(
+                    f"Invalid VCF format: records for {record.chrom} are not contiguous (at {record.chrom}:{record.pos})"
+                )
+            seen_contigs.add(record.chrom)
+            last_contig = record.chrom
+        elif record.pos < last_pos:
+            raise ValueError(f"Invalid VCF format: positions are not sorted (at {record.chrom}:{record.pos})")
+        last_pos = record.pos
+        
+        if full_checks:
+            _check_genotypes(record, sample_count)
+        
+        yield record
+
+
+def _check_genotypes(record: Any, sample_count: int) -> None:
+    """Check a record's sample count and that its GT alleles exist."""
+    location = f"{record.chrom}:{record.pos}"
+    if len(record.samples) != sample_count:
+        raise ValueError(
+            f"Invalid VCF format: expected {sample_count} samples, found {len(record.samples)} (at {location})"
+        )
+    
+    if "GT" in record.format:
+        allele_count = len(record.alleles or ())
+        for sample_name, sample in record.samples.items():
+            for allele in sample["GT"] or ():
+                if allele is not None and not 0 <= allele < allele_count:
+                    raise ValueError(
+                        f"Invalid VCF format: GT of sample {sample_name} refers to allele {allele} "
+                        f"of {allele_count} (at {location})"
+                    )
+
+
 def validate_vcf_accessibility(vcf_file_path: str) -> None:
     """Validate that VCF file is accessible and readable.
     
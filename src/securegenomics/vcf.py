@@ -0,0 +1,261 @@
+"""
+VCF region utilities for SecureGenomics CLI.
+
+Locates tabix/CSI indexes (building a cached, indexed copy of VCFs that lack
+one), splits indexed VCFs into genomic regions so encoding can be sharded
+across processes, and extracts the target regions a protocol declares.
+"""
+
+import gzip
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from rich.console import Console
+
+console = Console()
+
+# (contig, 0-based start, end); end is None when the contig length is unknown
+Region = Tuple[str, int, Optional[int]]
+
+INDEX_SUFFIXES = (".csi", ".tbi")
+
+
+def find_vcf_index(vcf_path: Path) -> Optional[Path]:
+    """Return the CSI or tabix index next to a VCF, if there is one."""
+    vcf_path = Path(vcf_path)
+    for suffix in INDEX_SUFFIXES:
+        index_path = vcf_path.with_name(vcf_path.name + suffix)
+        if index_path.exists():
+            return index_path
+    return None
+
+
+def is_indexed_vcf(vcf_path: Path) -> bool:
+    """Check whether a VCF is bgzipped with an index, i.e. supports region queries."""
+    return str(vcf_path).endswith(".gz") and find_vcf_index(vcf_path) is not None
+
+
+def is_bgzf(path: Path) -> bool:
+    """Check for BGZF (block gzip) compression, which tabix/CSI indexes require."""
+    with open(path, 'rb') as f:
+        header = f.read(16)
+    # gzip magic, FEXTRA flag and the 'BC' extra subfield
+    return header[:2] == b"\x1f\x8b" and bool(header[3] & 4) and header[12:14] == b"BC"
+
+
+def ensure_indexed_vcf(vcf_path: Path, cache_dir: Path, cache_key: str,
+                       max_bytes: Optional[int] = None) -> Path:
+    """Return an indexed, bgzipped VCF with the records of ``vcf_path``.
+
+    Indexed inputs are returned as they are. Otherwise a CSI-indexed copy is
+    built in ``cache_dir`` under ``cache_key`` (the input's content digest) on
+    first use and reused afterwards. Bgzipped inputs are hard-linked when
+    possible instead of copied; plain-text and plain-gzip inputs are
+    recompressed. With ``max_bytes``, the least recently used other copies
+    are evicted to keep the cache within it.
+    """
+    import pysam
+    from securegenomics.cache import evict_least_recently_used
+
+    vcf_path = Path(vcf_path)
+    if is_indexed_vcf(vcf_path):
+        return vcf_path
+
+    cached = cache_dir / f"{cache_key}.vcf.gz"
+    if cached.exists() and find_vcf_index(cached):
+        os.utime(cached)
+        return cached
+
+    staging = cache_dir / f".{cached.name}.{uuid.uuid4().hex[:8]}.vcf.gz"
+    try:
+        if is_bgzf(vcf_path):
+            # Already block-compressed; only the index is missing
+            try:
+                os.link(vcf_path, staging)
+            except OSError:
+                shutil.copyfile(vcf_path, staging)
+        else:
+            with open(vcf_path, 'rb') as f:
+                gzipped = f.read(2) == b"\x1f\x8b"
+            opener = gzip.open if gzipped else open
+            with opener(vcf_path, 'rb') as src, pysam.BGZFile(str(staging), 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        pysam.tabix_index(str(staging), preset="vcf", csi=True, force=True)
+
+        # Move the index first: the data file appearing marks the entry complete
+        os.replace(f"{staging}.csi", f"{cached}.csi")
+        os.replace(staging, cached)
+    finally:
+        for leftover in (staging, Path(f"{staging}.csi")):
+            if leftover.exists():
+                leftover.unlink()
+
+    if max_bytes is not None:
+        evict_least_recently_used(cache_dir, "*.vcf.gz", max_bytes, keep=cached)
+    return cached
+
+
+def prepare_indexed_vcf(vcf_path: Path, config_manager: Any, required: bool = False) -> Path:
+    """Swap an unindexed VCF for its cached indexed copy.
+
+    The copy lives in the user's ``vcf_index_cache`` directory, keyed by the
+    file's content digest, so re-runs (and copies of the same file) seek
+    instead of scanning without recompressing anything; copies beyond
+    ``vcf_index_cache_max_bytes`` are evicted least recently used first.
+    Callers index only for readers that seek. Unless ``required``,
+    this is skipped when ``auto_index_vcf`` is off and a failed build only
+    warns and returns the original file.
+    """
+    from securegenomics.cache import FileDigestCache
+
+    vcf_path = Path(vcf_path)
+    if is_indexed_vcf(vcf_path):
+        return vcf_path
+    if not required and not config_manager.get_auto_index_vcf():
+        return vcf_path
+
+    try:
+        digest = FileDigestCache(config_manager.file_digest_cache_file).digest(vcf_path)
+        return ensure_indexed_vcf(
+            vcf_path, config_manager.get_vcf_index_cache_dir(), digest,
+            config_manager.get_vcf_index_cache_max_bytes()
+        )
+    except Exception as e:
+        if required:
+            raise
+        console.print(f"[yellow]Warning: Could not index {vcf_path.name}, reading it unindexed: {e}[/yellow]")
+        return vcf_path
+
+
+def plan_vcf_regions(vcf_path: Path, shard_size: int) -> List[Region]:
+    """Split an indexed VCF into regions in coordinate order.
+
+    Contigs follow header order and are skipped when the index holds no
+    records for them. Each contig is cut into ``shard_size`` bp regions, or
+    kept whole when ``shard_size`` is 0 or its length is not in the header.
+    """
+    import pysam
+
+    with pysam.VariantFile(str(vcf_path)) as vcf:
+        indexed_contigs = set(vcf.index) if vcf.index is not None else None
+        regions: List[Region] = []
+
+        for name, contig in vcf.header.contigs.items():
+            if indexed_contigs is not None and name not in indexed_contigs:
+                continue
+
+            length = contig.length
+            if not shard_size or not length:
+                regions.append((name, 0, None))
+                continue
+
+            for start in range(0, length, shard_size):
+                regions.append((name, start, min(start + shard_size, length)))
+
+    return regions
+
+
+def iter_region_records(vcf: Any, contig: str, start: int, end: Optional[int]) -> Iterator[Any]:
+    """Yield the records of an open ``pysam.VariantFile`` that start in a region.
+
+    ``fetch`` also returns records that merely overlap the region (e.g. a
+    deletion spanning a shard boundary); filtering on the start position puts
+    every record in exactly one region.
+    """
+    for record in vcf.fetch(contig, start, end):
+        if record.start >= start and (end is None or record.start < end):
+            yield record
+
+
+def load_target_regions(protocol_dir: Path, spec: Dict[str, Any]) -> List[Region]:
+    """Read the target regions a protocol declares in protocol.yaml.
+
+    ``sites`` lists one ``CHROM POS`` (1-based) per line, ``regions`` is a BED
+    file (0-based, half-open); both may be given. ``padding`` widens every
+    target by that many bp on each side. Header and comment lines are skipped.
+    """
+    padding = int(spec.get("padding", 0))
+    targets: List[Region] = []
+
+    for key in ("sites", "regions"):
+        if not spec.get(key):
+            continue
+
+        with open(protocol_dir / spec[key], 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 2 or fields[0].startswith(("#", "track", "browser")):
+                    continue
+                try:
+                    if key == "sites":
+                        start, end = int(fields[1]) - 1, int(fields[1])
+                    else:
+                        start, end = int(fields[1]), int(fields[2])
+                except (ValueError, IndexError):
+                    # Column header line such as "CHROM POS"
+                    continue
+                targets.append((fields[0], max(0, start - padding), end + padding))
+
+    return targets
+
+
+def _resolve_contig(name: str, contigs: Sequence[str]) -> Optional[str]:
+    """Match a target contig to the VCF's naming, with or without a 'chr' prefix."""
+    if name in contigs:
+        return name
+    alias = name[3:] if name.startswith("chr") else f"chr{name}"
+    return alias if alias in contigs else None
+
+
+def merge_regions(regions: Iterable[Region], contigs: Sequence[str]) -> List[Region]:
+    """Sort regions in ``contigs`` order and merge overlapping or adjacent ones.
+
+    Regions on contigs the VCF does not have are dropped.
+    """
+    by_contig: Dict[str, List[Tuple[int, Optional[int]]]] = {}
+    for name, start, end in regions:
+        contig = _resolve_contig(name, contigs)
+        if contig is not None:
+            by_contig.setdefault(contig, []).append((start, end))
+
+    merged: List[Region] = []
+    for contig in contigs:
+        intervals = sorted(by_contig.get(contig, []), key=lambda interval: interval[0])
+        current: Optional[List[Any]] = None
+        for start, end in intervals:
+            if current is not None and (current[1] is None or start <= current[1]):
+                current[1] = None if end is None or current[1] is None else max(current[1], end)
+            else:
+                if current is not None:
+                    merged.append((contig, current[0], current[1]))
+                current = [start, end]
+        if current is not None:
+            merged.append((contig, current[0], current[1]))
+
+    return merged
+
+
+def extract_target_records(vcf_path: Path, targets: Iterable[Region], output_path: Path) -> int:
+    """Write the records of an indexed VCF that start in ``targets`` to a bgzipped VCF.
+
+    Only the target regions are read, through the index. Returns the number
+    of records written.
+    """
+    import pysam
+
+    count = 0
+    with pysam.VariantFile(str(vcf_path)) as vcf:
+        indexed_contigs = set(vcf.index) if vcf.index is not None else None
+        contigs = [name for name in vcf.header.contigs if indexed_contigs is None or name in indexed_contigs]
+
+        with pysam.VariantFile(str(output_path), 'wz', header=vcf.header) as output:
+            for contig, start, end in merge_regions(targets, contigs):
+                for record in iter_region_records(vcf, contig, start, end):
+                    output.write(record)
+                    count += 1
+
+    return count
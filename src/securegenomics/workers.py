@@ -0,0 +1,259 @@
+"""
+Protocol worker pool for SecureGenomics CLI.
+
+Keeps a pool of persistent worker processes that run protocol operations
+out-of-process. Workers import NumPy/TenSEAL once at startup and keep protocol
+modules loaded between calls, so each operation pays IPC cost instead of
+interpreter and import startup.
+"""
+
+import atexit
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Heavy modules imported by every worker at startup when available
+PRELOAD_MODULES = ("numpy", "tenseal")
+
+# Payloads at least this large cross the process boundary as file handles
+DEFAULT_PAYLOAD_THRESHOLD = 1024 * 1024  # 1MB
+
+
+@dataclass(frozen=True)
+class PayloadHandle:
+    """Reference to a large payload stored in a memory-mapped temp file.
+    
+    Only the handle is pickled through the pool's pipe; the receiving side
+    maps the file instead of unpickling a copy of the data.
+    """
+    path: str
+    kind: str  # bytes, ndarray
+    dtype: Optional[str] = None
+    shape: Optional[Tuple[int, ...]] = None
+
+
+def _payload_dir() -> str:
+    """Prefer tmpfs so payload files never touch disk."""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def _is_ndarray(value: Any) -> bool:
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def _payload_path(tag: str, name: str) -> str:
+    """Path of a payload file exported under ``tag`` (``name`` "*" globs them all)."""
+    return os.path.join(_payload_dir(), f"securegenomics-{tag}-{name}.payload")
+
+
+def export_payload(value: Any, threshold: int, tag: str = "shared") -> Any:
+    """Replace a large bytes/ndarray value (or tuple of them) with a PayloadHandle.
+    
+    Files are named after ``tag`` so an owner that never receives the
+    handles (a caller whose worker timed out) can still remove them.
+    """
+    if isinstance(value, tuple):
+        return tuple(export_payload(item, threshold, tag) for item in value)
+    
+    path = _payload_path(tag, uuid.uuid4().hex)
+    
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= threshold:
+        with open(path, 'wb') as f:
+            f.write(value)
+        return PayloadHandle(path=path, kind="bytes")
+    
+    if _is_ndarray(value) and value.nbytes >= threshold and value.dtype != object:
+        import numpy as np
+        
+        mapped = np.memmap(path, dtype=value.dtype, mode='w+', shape=value.shape)
+        mapped[...] = value
+        mapped.flush()
+        del mapped
+        return PayloadHandle(path=path, kind="ndarray", dtype=value.dtype.str, shape=tuple(value.shape))
+    
+    return value
+
+
+def import_payload(value: Any, remove: bool = False) -> Any:
+    """Resolve a PayloadHandle (or tuple of them) back into its value.
+    
+    NumPy payloads are returned as copy-on-write memory maps, so they are not
+    duplicated in the receiving process. Bytes payloads are read back as
+    ``bytes``, the type protocol functions get when run in-process. With
+    ``remove`` the backing file is deleted once mapped or read.
+    """
+    if isinstance(value, tuple):
+        return tuple(import_payload(item, remove) for item in value)
+    
+    if not isinstance(value, PayloadHandle):
+        return value
+    
+    if value.kind == "ndarray":
+        import numpy as np
+        
+        if 0 in value.shape:
+            result = np.empty(value.shape, dtype=value.dtype)
+        else:
+            result = np.memmap(value.path, dtype=value.dtype, mode='c', shape=value.shape)
+    else:
+        with open(value.path, 'rb') as f:
+            result = f.read()
+    
+    if remove:
+        release_payload(value)
+    
+    return result
+
+
+def release_payload(value: Any) -> None:
+    """Delete the files behind a PayloadHandle (or tuple of them)."""
+    if isinstance(value, tuple):
+        for item in value:
+            release_payload(item)
+    elif isinstance(value, PayloadHandle):
+        try:
+            os.unlink(value.path)
+        except OSError:
+            pass
+
+
+def release_tagged_payloads(tag: str) -> None:
+    """Delete every payload file exported under ``tag``."""
+    for path in glob.glob(_payload_path(tag, "*")):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _initialize_worker(pid_queue: Any = None) -> None:
+    """Warm a freshly started worker by importing heavy dependencies.
+    
+    The worker reports its PID on ``pid_queue`` so the pool can kill it.
+    """
+    import importlib
+
+    if pid_queue is not None:
+        pid_queue.put(os.getpid())
+    for module_name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+
+def _run_protocol_function(module_path: str, function_name: str, commit_hash: Optional[str],
+                           kwargs: Dict[str, Any], payload_threshold: int, result_tag: str) -> Any:
+    """Run a protocol function inside a worker process."""
+    from securegenomics.protocol import import_function_from_file
+
+    fn = import_function_from_file(module_path, function_name, commit_hash)
+    kwargs = {key: import_payload(value) for key, value in kwargs.items()}
+    return export_payload(fn(**kwargs), payload_threshold, result_tag)
+
+
+class ProtocolWorkerPool:
+    """Pool of persistent worker processes for protocol operations."""
+
+    def __init__(self, size: int, payload_threshold: int = DEFAULT_PAYLOAD_THRESHOLD) -> None:
+        self.size = max(1, size)
+        self.payload_threshold = payload_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid_queue: Any = None
+        self._worker_pids: Set[int] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawn rather than fork: the CLI runs progress-bar threads
+            context = multiprocessing.get_context("spawn")
+            self._pid_queue = context.SimpleQueue()
+            self._worker_pids = set()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=context,
+                initializer=_initialize_worker,
+                initargs=(self._pid_queue,),
+            )
+        return self._executor
+
+    def _worker_processes(self) -> List[Any]:
+        """Live worker processes of the current executor, by the PIDs they reported."""
+        while not self._pid_queue.empty():
+            self._worker_pids.add(self._pid_queue.get())
+        return [process for process in multiprocessing.active_children() if process.pid in self._worker_pids]
+
+    def run(self, module_path: str, function_name: str, commit_hash: Optional[str] = None,
+            timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run ``function_name`` from ``module_path`` in a worker and wait for the result.
+        
+        Large bytes/NumPy arguments and results travel as PayloadHandles.
+        A call that times out kills the pool's workers, so the next call gets
+        fresh ones instead of queueing behind the stuck task.
+        """
+        call_tag = uuid.uuid4().hex
+        kwargs = {key: export_payload(value, self.payload_threshold, call_tag) for key, value in kwargs.items()}
+        result_tag = f"{call_tag}-result"
+        try:
+            future = self._get_executor().submit(
+                _run_protocol_function, module_path, function_name, commit_hash, kwargs,
+                self.payload_threshold, result_tag
+            )
+            return import_payload(future.result(timeout=timeout), remove=True)
+        except FutureTimeoutError:
+            self.shutdown(terminate=True)
+            raise Exception(f"Protocol operation {function_name} timed out after {timeout}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OOM killer); start fresh next time
+            self.shutdown()
+            raise Exception("Protocol worker process terminated unexpectedly")
+        finally:
+            # Arguments, plus results a killed or failed worker wrote but never handed back
+            release_tagged_payloads(call_tag)
+
+    def shutdown(self, terminate: bool = False) -> None:
+        """Stop all worker processes; ``terminate`` kills tasks still running."""
+        if self._executor is not None:
+            # Workers still initializing have not reported a PID, but run no task yet either
+            processes = self._worker_processes() if terminate else []
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+            self._executor = None
+            self._pid_queue.close()
+            self._pid_queue = None
+
+
+# Global instance for easy access
+_worker_pool: Optional[ProtocolWorkerPool] = None
+
+
+def get_worker_pool(size: int, payload_threshold: int = DEFAULT_PAYLOAD_THRESHOLD) -> ProtocolWorkerPool:
+    """Get the global protocol worker pool, creating it on first use."""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ProtocolWorkerPool(size, payload_threshold)
+    return _worker_pool
+
+
+def shutdown_worker_pool() -> None:
+    """Stop the global protocol worker pool if it was started."""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
+
+
+atexit.register(shutdown_worker_pool)
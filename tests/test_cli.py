@@ -12,7 +12,9 @@ from unittest.mock import Mock, patch
 
 from securegenomics.config import ConfigManager
 from securegenomics.auth import AuthManager
-from securegenomics.protocol import ProtocolManager, ProtocolInfo
+from securegenomics.protocol import (
+    ProtocolManager, ProtocolInfo, import_function_from_file, invalidate_module_cache, read_local_commit_hash
+)
 from securegenomics.local import LocalAnalyzer
 from securegenomics.cli import main
 
@@ -172,6 +174,151 @@ class TestProtocolManager:
             assert protocols[0].description == "Alzheimer's disease risk analysis"
 
 
+    def test_verify_reuses_cached_verification(self, tmp_path):
+        """Test that a repeated verify costs no subprocess or GitHub call."""
+        with patch('pathlib.Path.home', return_value=tmp_path):
+            protocol_manager = ProtocolManager()
+            protocol_dir = protocol_manager.config_manager.get_protocol_cache_dir("test-protocol")
+            (protocol_dir / ".git" / "refs" / "heads").mkdir(parents=True)
+            (protocol_dir / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+            (protocol_dir / ".git" / "refs" / "heads" / "main").write_text("abc123def456\n")
+            
+            github_client = Mock()
+            github_client.get_remote_head.return_value = "abc123def456"
+            
+            with patch('securegenomics.protocol.get_github_client', return_value=github_client), \
+                 patch.object(protocol_manager, '_verify_protocol_structure', return_value=(True, [])), \
+                 patch('subprocess.run') as mock_run:
+                assert protocol_manager.verify("test-protocol") is True
+                assert protocol_manager.verify("test-protocol") is True
+                
+                assert github_client.get_remote_head.call_count == 1
+                mock_run.assert_not_called()
+                
+                # An explicit re-verification goes back to GitHub
+                assert protocol_manager.verify("test-protocol", use_cache=False) is True
+                assert github_client.get_remote_head.call_count == 2
+                
+                # A remote HEAD seen elsewhere (fetch, list --refresh) expires the entry
+                protocol_manager.verification_cache.check_remote({"test-protocol": "fedcba987654"})
+                assert protocol_manager.verification_cache.get("test-protocol", "abc123def456") is None
+
+
+    def test_import_function_from_file_reuses_loaded_module(self, tmp_path):
+        """Test that protocol modules are executed once until the file changes."""
+        module_path = tmp_path / "encode.py"
+        module_path.write_text("def encode_vcf(vcf_path):\n    return 1\n")
+        
+        first = import_function_from_file(str(module_path), "encode_vcf", "abc123")
+        assert import_function_from_file(str(module_path), "encode_vcf", "abc123") is first
+        
+        # A different commit (e.g. after refresh) reloads the module
+        assert import_function_from_file(str(module_path), "encode_vcf", "def456") is not first
+        
+        module_path.write_text("def encode_vcf(vcf_path):\n    return 22\n")
+        assert import_function_from_file(str(module_path), "encode_vcf", "def456")("x") == 22
+        
+        invalidate_module_cache(tmp_path)
+
+
+    def test_list_protocols_served_from_local_index(self, tmp_path):
+        """Test that listing and lookups use the local index instead of GitHub."""
+        with patch('pathlib.Path.home', return_value=tmp_path):
+            protocol_manager = ProtocolManager()
+            protocol_manager.protocol_index.save([
+                ProtocolInfo(
+                    name="alzheimers-risk",
+                    description="Alzheimer's disease risk analysis",
+                    github_url="https://github.com/securegenomics/protocol-alzheimers-risk.git",
+                    commit_hash="abc123def456"
+                )
+            ])
+            
+            with patch('securegenomics.protocol.get_github_client') as mock_client:
+                protocols = protocol_manager.list_protocols()
+                info = LocalAnalyzer().get_protocol_info("alzheimers-risk")
+                mock_client.assert_not_called()
+            
+            assert [p.name for p in protocols] == ["alzheimers-risk"]
+            assert info["description"] == "Alzheimer's disease risk analysis"
+
+    def test_rest_discovery_fetches_metadata_in_parallel_in_catalog_order(self, tmp_path):
+        """Test that the REST fallback keeps repo order and skips a repo that fails."""
+        import threading
+        import time
+
+        names = ["protocol-a", "protocol-b", "protocol-c", "protocol-d"]
+        github_client = Mock()
+        github_client.config.max_workers = 4
+        github_client.get_protocol_catalog.return_value = None
+        github_client.list_protocol_repos.return_value = [{"name": name} for name in names]
+
+        running = set()
+        overlapped = threading.Event()
+
+        def get_metadata(repo):
+            running.add(repo["name"])
+            if len(running) > 1:
+                overlapped.set()
+            try:
+                # Earlier repos finish last, so completion order differs from catalog order
+                time.sleep(0.05 * (len(names) - names.index(repo["name"])))
+                if repo["name"] == "protocol-c":
+                    raise Exception("protocol.yaml not found")
+                return ProtocolInfo(name=repo["name"][len("protocol-"):], description="", github_url="", commit_hash="abc")
+            finally:
+                running.discard(repo["name"])
+
+        with patch('pathlib.Path.home', return_value=tmp_path):
+            protocol_manager = ProtocolManager()
+            with patch('securegenomics.protocol.get_github_client', return_value=github_client), \
+                 patch.object(protocol_manager, '_get_protocol_metadata', side_effect=get_metadata):
+                protocols = protocol_manager._discover_protocols()
+
+        assert [p.name for p in protocols] == ["a", "b", "d"]
+        assert overlapped.is_set()
+
+
+    def test_fetch_unpacks_tarball_into_shared_store(self, tmp_path):
+        """Test that fetch stores each commit once and links the protocol to it."""
+        import io
+        import tarfile
+        
+        def write_tarball(repo_name, ref, dest_path):
+            with tarfile.open(dest_path, "w:gz") as tar:
+                content = b"name: alzheimers-risk\nmodes: [local]\n"
+                info = tarfile.TarInfo(f"securegenomics-{repo_name}-{ref[:7]}/protocol.yaml")
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+            return Mock(success=True)
+        
+        github_client = Mock()
+        github_client.get_repo_info.return_value = Mock(success=True, data={
+            "name": "protocol-alzheimers-risk",
+            "clone_url": "https://github.com/securegenomics/protocol-alzheimers-risk.git",
+            "default_branch": "main",
+        })
+        github_client.get_remote_head.return_value = "abc123def456"
+        github_client.get_protocol_metadata.return_value = {"description": "Alzheimer's disease risk analysis"}
+        github_client.download_tarball.side_effect = write_tarball
+        
+        with patch('pathlib.Path.home', return_value=tmp_path), \
+             patch('securegenomics.protocol.get_github_client', return_value=github_client):
+            protocol_manager = ProtocolManager()
+            with patch.object(protocol_manager, '_verify_protocol_structure', return_value=(True, [])):
+                info = protocol_manager.fetch("alzheimers-risk")
+                protocol_manager.refresh_protocol("alzheimers-risk")
+            
+            protocol_dir = protocol_manager.config_manager.get_protocol_cache_dir("alzheimers-risk")
+            store_dir = protocol_manager.config_manager.get_protocol_store_dir("abc123def456")
+            
+            assert info.commit_hash == "abc123def456"
+            assert github_client.download_tarball.call_count == 1
+            assert protocol_dir.is_symlink() and protocol_dir.resolve() == store_dir.resolve()
+            assert (protocol_dir / "protocol.yaml").exists()
+            assert read_local_commit_hash(protocol_dir) == "abc123def456"
+
+
 class TestLocalAnalyzer:
     """Test local analysis functionality."""
     
@@ -208,6 +355,681 @@ class TestLocalAnalyzer:
         assert analyzer._is_valid_vcf(valid_vcf)
 
 
+class TestValidation:
+    """Test VCF validation."""
+    
+    def test_validated_records_reject_unsorted_and_bad_genotypes(self):
+        """Test record-level checks applied while records stream to the encoder."""
+        from types import SimpleNamespace
+        from securegenomics.validation import iter_validated_records
+        
+        class FakeVcf:
+            def __init__(self, records):
+                self.header = SimpleNamespace(samples=["S1"])
+                self.records = records
+            
+            def __iter__(self):
+                return iter(self.records)
+        
+        def record(chrom, pos, gt):
+            return SimpleNamespace(chrom=chrom, pos=pos, alleles=("A", "G"), format={"GT": None},
+                                   samples={"S1": {"GT": gt}})
+        
+        good = [record("chr1", 10, (0, 1)), record("chr1", 20, (None, None)), record("chr2", 5, (1, 1))]
+        assert len(list(iter_validated_records(FakeVcf(good), full_checks=True))) == 3
+        
+        unsorted = [record("chr1", 20, (0, 0)), record("chr1", 10, (0, 0))]
+        with pytest.raises(ValueError, match="not sorted"):
+            list(iter_validated_records(FakeVcf(unsorted)))
+        
+        # Genotypes are only checked when full checks are requested
+        bad_genotype = [record("chr1", 10, (0, 2))]
+        assert len(list(iter_validated_records(FakeVcf(bad_genotype)))) == 1
+        with pytest.raises(ValueError, match="allele 2"):
+            list(iter_validated_records(FakeVcf(bad_genotype), full_checks=True))
+
+
+class TestVcfRegions:
+    """Test VCF region planning."""
+    
+    def test_protocol_targets_merge_in_contig_order(self, tmp_path):
+        """Test that declared sites and BED regions merge into sorted, disjoint regions."""
+        import gzip
+        from securegenomics.vcf import is_bgzf, load_target_regions, merge_regions
+        
+        (tmp_path / "sites.tsv").write_text("CHROM\tPOS\n19\t44908684\n19\t44908822\n1\t500\n")
+        (tmp_path / "panel.bed").write_text("track name=panel\nchr19\t44908600\t44908700\nchrX\t10\t20\n")
+        
+        targets = load_target_regions(tmp_path, {"sites": "sites.tsv", "regions": "panel.bed"})
+        assert len(targets) == 5
+        
+        merged = merge_regions(targets, ["chr1", "chr19", "chr22"])
+        assert merged == [("chr1", 499, 500), ("chr19", 44908600, 44908700), ("chr19", 44908821, 44908822)]
+        
+        with gzip.open(tmp_path / "plain.vcf.gz", "wt") as f:
+            f.write("##fileformat=VCFv4.2\n")
+        assert not is_bgzf(tmp_path / "plain.vcf.gz")
+
+
+class TestContentCache:
+    """Test content-addressed caching."""
+    
+    def test_file_digest_reused_until_file_changes(self, tmp_path):
+        """Test that digests are memoized by size and mtime."""
+        import hashlib
+        from securegenomics.cache import FileDigestCache
+        
+        vcf_path = tmp_path / "sample.vcf"
+        vcf_path.write_text("##fileformat=VCFv4.2\n")
+        cache = FileDigestCache(tmp_path / "digests.json")
+        
+        expected = hashlib.sha256(vcf_path.read_bytes()).hexdigest()
+        assert cache.digest(vcf_path) == expected
+        
+        with patch("securegenomics.cache.hash_file") as mock_hash:
+            assert cache.digest(vcf_path) == expected
+            mock_hash.assert_not_called()
+        
+        vcf_path.write_text("##fileformat=VCFv4.3\n#CHROM\n")
+        assert cache.digest(vcf_path) == hashlib.sha256(vcf_path.read_bytes()).hexdigest()
+    
+    def test_encode_cache_reuses_and_evicts_least_recently_used(self, tmp_path):
+        """Test encode cache hits, misses on a new commit and LRU eviction."""
+        import os
+        from securegenomics.cache import EncodeCache
+        
+        cache = EncodeCache(tmp_path / "encode_cache", max_bytes=10)
+        key = EncodeCache.make_key("vcfdigest", "alzheimers-risk", "abc123", {"format": 1})
+        assert key != EncodeCache.make_key("vcfdigest", "alzheimers-risk", "def456", {"format": 1})
+        
+        (tmp_path / "first.encoded").write_bytes(b"[1, 0, 2]")
+        assert not cache.get(key, tmp_path / "out.encoded")
+        cache.put(key, tmp_path / "first.encoded")
+        assert cache.get(key, tmp_path / "out.encoded")
+        assert (tmp_path / "out.encoded").read_bytes() == b"[1, 0, 2]"
+        
+        # Make the first entry the least recently used one
+        os.utime(tmp_path / "encode_cache" / f"{key}.encoded", (0, 0))
+        (tmp_path / "second.encoded").write_bytes(b"[0, 1]")
+        cache.put("second", tmp_path / "second.encoded")
+        assert not cache.get(key, tmp_path / "out.encoded")
+        assert cache.get("second", tmp_path / "out.encoded")
+
+    def test_indexed_vcf_copies_evicted_with_their_index(self, tmp_path):
+        """Test that indexed VCF copies share LRU eviction and keep the copy in use."""
+        import os
+        from securegenomics.cache import evict_least_recently_used
+
+        for name, age in (("old", 0), ("recent", 1000), ("current", 2000)):
+            (tmp_path / f"{name}.vcf.gz").write_bytes(b"x" * 8)
+            (tmp_path / f"{name}.vcf.gz.csi").write_bytes(b"i" * 2)
+            os.utime(tmp_path / f"{name}.vcf.gz", (age, age))
+        (tmp_path / ".staging.vcf.gz").write_bytes(b"x" * 8)
+
+        evict_least_recently_used(tmp_path, "*.vcf.gz", 20, keep=tmp_path / "current.vcf.gz")
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            ".staging.vcf.gz", "current.vcf.gz", "current.vcf.gz.csi", "recent.vcf.gz", "recent.vcf.gz.csi"
+        ]
+
+        evict_least_recently_used(tmp_path, "*.vcf.gz", 0, keep=tmp_path / "current.vcf.gz")
+        assert not (tmp_path / "recent.vcf.gz").exists()
+        assert (tmp_path / "current.vcf.gz.csi").exists()
+
+    def test_context_cache_loads_once_and_evicts_least_recently_used(self):
+        """Test that deserialized contexts are reused until evicted."""
+        from securegenomics.cache import ContextCache
+
+        cache = ContextCache(max_entries=2)
+        loader = Mock(side_effect=lambda: object())
+
+        first = cache.get_or_load(("digest-a", "load_context"), loader)
+        assert cache.get_or_load(("digest-a", "load_context"), loader) is first
+        assert loader.call_count == 1
+
+        cache.get_or_load(("digest-b", "load_context"), loader)
+        cache.get_or_load(("digest-c", "load_context"), loader)
+        assert cache.get_or_load(("digest-a", "load_context"), loader) is not first
+        assert loader.call_count == 4
+
+        cache.resize(1)
+        assert cache.get_or_load(("digest-a", "load_context"), loader) is not first
+        assert loader.call_count == 4
+        cache.get_or_load(("digest-c", "load_context"), loader)
+        assert loader.call_count == 5
+
+
+class TestGitHubApiClient:
+    """Test the GitHub API adapter."""
+    
+    def test_conditional_requests_served_from_cache(self, tmp_path):
+        """Test that a 304 reuses the cached body and does not use up the local quota."""
+        from securegenomics.github import GitHubApiClient, GitHubConfig
+        
+        client = GitHubApiClient(GitHubConfig(cache_dir=tmp_path))
+        
+        first = Mock(status_code=200, headers={"ETag": '"v1"', "X-RateLimit-Remaining": "59"})
+        first.json.return_value = [{"name": "protocol-alzheimers-risk"}]
+        not_modified = Mock(status_code=304, headers={"X-RateLimit-Remaining": "59"})
+        
+        with patch.object(client.session, 'request', side_effect=[first, not_modified]) as mock_request:
+            assert client.get_org_repos().data == [{"name": "protocol-alzheimers-risk"}]
+            
+            cached = client.get_org_repos()
+            assert cached.success and cached.status_code == 304
+            assert cached.data == [{"name": "protocol-alzheimers-risk"}]
+            assert mock_request.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+        
+        assert client.rate_limiter.requests_made == 1
+        
+        # Only GitHub's reported quota survives a new client (i.e. a new CLI run)
+        assert GitHubApiClient(GitHubConfig(cache_dir=tmp_path)).rate_limiter.requests_made == 0
+    
+    def test_exhausted_quota_fails_fast_instead_of_sleeping(self, tmp_path):
+        """Test that a long wait for the rate limit reset is reported, not slept through."""
+        import time
+        from securegenomics.github import GitHubApiClient, GitHubConfig
+        
+        client = GitHubApiClient(GitHubConfig(cache_dir=tmp_path))
+        exhausted = Mock(status_code=403, headers={
+            "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 3600)
+        })
+        exhausted.json.return_value = {"message": "API rate limit exceeded"}
+        
+        with patch.object(client.session, 'request', return_value=exhausted):
+            assert client.get_org_repos().is_rate_limited
+        
+        rerun = GitHubApiClient(GitHubConfig(cache_dir=tmp_path))
+        with patch.object(rerun.session, 'request') as mock_request, patch('time.sleep') as mock_sleep:
+            response = rerun.get_org_repos()
+            assert not response.success and "rate limit" in response.error.lower()
+            mock_request.assert_not_called()
+            mock_sleep.assert_not_called()
+
+
+    def test_protocol_catalog_from_single_graphql_query(self, tmp_path):
+        """Test that the catalog carries HEAD SHAs and protocol.yaml, skipping other repos."""
+        from securegenomics.github import GitHubApiClient, GitHubConfig
+        
+        client = GitHubApiClient(GitHubConfig(token="fake_token", cache_dir=tmp_path))
+        
+        graphql_response = Mock(status_code=200, headers={})
+        graphql_response.json.return_value = {"data": {"organization": {"repositories": {
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [
+                {
+                    "name": "protocol-alzheimers-risk",
+                    "description": "Alzheimer's disease risk analysis",
+                    "url": "https://github.com/securegenomics/protocol-alzheimers-risk",
+                    "isArchived": False,
+                    "defaultBranchRef": {"name": "main", "target": {"oid": "abc123def456"}},
+                    "protocolYaml": {"text": "name: alzheimers-risk\nmodes: [local]\n"},
+                },
+                {"name": "securegenomics", "description": None, "url": "https://github.com/securegenomics/securegenomics",
+                 "isArchived": False, "defaultBranchRef": None, "protocolYaml": None},
+            ],
+        }}}}
+        
+        with patch.object(client.session, 'request', return_value=graphql_response) as mock_request:
+            catalog = client.get_protocol_catalog()
+            assert client.get_remote_head("protocol-alzheimers-risk") == "abc123def456"
+            assert mock_request.call_count == 1
+        
+        assert [entry["name"] for entry in catalog] == ["protocol-alzheimers-risk"]
+        assert catalog[0]["clone_url"].endswith("protocol-alzheimers-risk.git")
+        assert catalog[0]["metadata"]["modes"] == ["local"]
+    
+    def test_protocol_catalog_requires_token(self, tmp_path):
+        """Test that the catalog falls back to REST without a token."""
+        from securegenomics.github import GitHubApiClient, GitHubConfig
+        
+        client = GitHubApiClient(GitHubConfig(cache_dir=tmp_path))
+        assert client.get_protocol_catalog() is None
+
+
+class TestAssets:
+    """Test protocol precompilation."""
+    
+    def test_precompile_protocol_builds_bytecode_and_mmap_assets(self, tmp_path):
+        """Test that modules are compiled and declared assets load through mmap."""
+        import numpy as np
+        from securegenomics.assets import load_asset, precompile_protocol
+        
+        (tmp_path / "encode.py").write_text("def encode_vcf(vcf_path):\n    return []\n")
+        (tmp_path / "weights.tsv").write_text("snp\tweight\nrs429358\t0.5\nrs7412\t-0.25\n")
+        (tmp_path / "protocol.yaml").write_text(
+            "name: test\nassets:\n  - name: snp_weights\n    source: weights.tsv\n"
+            "    skip_header: 1\n    columns: [1]\n"
+        )
+        
+        precompile_protocol(tmp_path)
+        
+        assert list((tmp_path / "__pycache__").glob("encode.*.pyc"))
+        weights = load_asset(tmp_path / "encode.py", "snp_weights")
+        assert isinstance(weights, np.memmap)
+        assert weights.tolist() == [0.5, -0.25]
+
+
+class TestEncoding:
+    """Test encoded data output."""
+    
+    def test_streamed_chunks_match_single_write(self, tmp_path):
+        """Test that streamed chunks produce the file a one-shot save would."""
+        import numpy as np
+        from securegenomics.container import load_encoded
+        from securegenomics.encoding import write_encoded_stream
+        from securegenomics.protocol import protocol_defines_function
+        
+        module_path = tmp_path / "encode.py"
+        module_path.write_text(
+            "def encode_vcf(vcf_path):\n    return []\n\n"
+            "def encode_vcf_stream(vcf_path):\n    yield [1, 2]\n    yield np.array([3])\n"
+        )
+        assert protocol_defines_function(module_path, "encode_vcf_stream")
+        assert not protocol_defines_function(module_path, "encode_vcf_region")
+        
+        chunks = iter([[1, 2], np.array([3, 4]), [], 5])
+        assert write_encoded_stream(tmp_path / "out.encoded", chunks) == 4
+        assert load_encoded(tmp_path / "out.encoded").tolist() == [1, 2, 3, 4, 5]
+        
+        write_encoded_stream(tmp_path / "records.encoded", iter([{"variant": "rs7412"}, [{"variant": "rs429358"}]]))
+        assert load_encoded(tmp_path / "records.encoded") == [{"variant": "rs7412"}, {"variant": "rs429358"}]
+        
+        write_encoded_stream(tmp_path / "bytes.encoded", iter([b"ab", b"cd"]))
+        assert load_encoded(tmp_path / "bytes.encoded") == b"abcd"
+        assert not list(tmp_path.glob(".*.tmp"))
+    
+    def test_encoded_container_memory_maps_arrays(self, tmp_path):
+        """Test the typed .encoded container and the legacy fallback."""
+        import numpy as np
+        from securegenomics.container import load_encoded, read_encoded_header, save_encoded
+        
+        genotypes = np.array([[0, 1, 2], [2, 0, 0]], dtype=np.int8)
+        save_encoded(tmp_path / "data.encoded", genotypes, {"protocol": "alzheimers-risk", "commit": "abc123"})
+        
+        header = read_encoded_header(tmp_path / "data.encoded")
+        assert header["metadata"]["commit"] == "abc123"
+        assert header["arrays"]["data"] == {"dtype": "|i1", "shape": [2, 3], "offset": 4096}
+        
+        loaded = load_encoded(tmp_path / "data.encoded")
+        assert isinstance(loaded, np.memmap)
+        assert np.array_equal(loaded, genotypes)
+        
+        save_encoded(tmp_path / "dict.encoded", {"snps": 2})
+        assert load_encoded(tmp_path / "dict.encoded") == {"snps": 2}
+        
+        # Mixed-type lists keep their element types through the JSON path
+        for mixed in ([1, 0.5], [True, 2]):
+            save_encoded(tmp_path / "mixed.encoded", mixed)
+            assert read_encoded_header(tmp_path / "mixed.encoded")["kind"] == "json"
+            assert load_encoded(tmp_path / "mixed.encoded") == mixed
+            assert [type(item) for item in load_encoded(tmp_path / "mixed.encoded")] == [type(item) for item in mixed]
+        save_encoded(tmp_path / "ints.encoded", [[1, 0], [2, 1]])
+        assert read_encoded_header(tmp_path / "ints.encoded")["kind"] == "ndarray"
+        
+        (tmp_path / "legacy.encoded").write_text("[1, 0, 2]")
+        assert read_encoded_header(tmp_path / "legacy.encoded") is None
+        assert load_encoded(tmp_path / "legacy.encoded") == [1, 0, 2]
+    
+    def test_mostly_zero_encodings_stored_sparse(self, tmp_path):
+        """Test that hom-ref dominated data is rewritten as CSR and expands back."""
+        import numpy as np
+        from securegenomics.container import SparseEncoded, load_encoded, save_encoded, sparsify_encoded
+        
+        genotypes = np.zeros((3, 1000), dtype=np.int8)
+        genotypes[0, 10] = 1
+        genotypes[2, 999] = 2
+        save_encoded(tmp_path / "cohort.encoded", genotypes, {"protocol": "alzheimers-risk"})
+        dense_size = (tmp_path / "cohort.encoded").stat().st_size
+        
+        assert not sparsify_encoded(tmp_path / "cohort.encoded", threshold=0.0001)
+        assert sparsify_encoded(tmp_path / "cohort.encoded", threshold=0.1)
+        assert (tmp_path / "cohort.encoded").stat().st_size < dense_size
+        
+        loaded = load_encoded(tmp_path / "cohort.encoded")
+        assert isinstance(loaded, SparseEncoded)
+        assert loaded.nnz == 2
+        assert loaded.indptr.tolist() == [0, 1, 1, 2]
+        assert np.array_equal(loaded.to_dense(), genotypes)
+        
+        vector = SparseEncoded.from_dense(np.array([0, 0, 3, 0]))
+        assert vector.indices.tolist() == [2] and vector.to_dense().tolist() == [0, 0, 3, 0]
+    
+    def test_parallel_region_encode_matches_serial(self, tmp_path):
+        """Test that regions encoded across processes merge in coordinate order."""
+        from securegenomics.container import load_encoded
+        from securegenomics.encoding import write_encoded_regions
+        from securegenomics.vcf import is_indexed_vcf
+        
+        vcf_path = tmp_path / "sample.vcf.gz"
+        vcf_path.write_bytes(b"")
+        assert not is_indexed_vcf(vcf_path)
+        (tmp_path / "sample.vcf.gz.csi").write_bytes(b"")
+        assert is_indexed_vcf(vcf_path)
+        
+        module_path = tmp_path / "encode.py"
+        module_path.write_text(
+            "import time\n\n"
+            "def encode_vcf_region(vcf_path, contig, start, end):\n"
+            "    time.sleep(0.2 if start == 0 else 0)\n"
+            "    yield [contig, start]\n"
+            "    yield end\n"
+        )
+        regions = [("chr1", 0, 100), ("chr1", 100, 200), ("chr2", 0, None)]
+        
+        write_encoded_regions(tmp_path / "serial.encoded", module_path, "encode_vcf_region", None, vcf_path, regions, 1)
+        write_encoded_regions(tmp_path / "parallel.encoded", module_path, "encode_vcf_region", None, vcf_path, regions, 3)
+        
+        serial = (tmp_path / "serial.encoded").read_bytes()
+        assert serial == (tmp_path / "parallel.encoded").read_bytes()
+        assert load_encoded(tmp_path / "serial.encoded") == ["chr1", 0, 100, "chr1", 100, 200, "chr2", 0, None]
+
+
+class TestCohort:
+    """Test cohort (multi-sample) encode and encrypt."""
+    
+    def test_sample_blocks_encrypted_in_parallel_match_serial(self, tmp_path):
+        """Test that the genotype matrix is decoded once and blocks come back in sample order."""
+        from types import SimpleNamespace
+        from securegenomics.cache import hash_file
+        from securegenomics.cohort import (
+            MISSING_GENOTYPE, encrypt_cohort_blocks, plan_sample_blocks, read_genotype_matrix
+        )
+        from securegenomics.encryption import ContextSource
+        
+        def record(pos, gts):
+            samples = {f"S{i}": {"GT": gt} for i, gt in enumerate(gts)}
+            return SimpleNamespace(chrom="chr1", pos=pos, ref="A", alts=("G",), format={"GT": None}, samples=samples)
+        
+        samples = ["S0", "S1", "S2"]
+        records = [record(10, [(0, 0), (0, 1), (1, 1)]), record(20, [(None, None), (1, 0), (0, 0)])]
+        matrix = read_genotype_matrix(records, samples)
+        
+        assert matrix.genotypes.shape == (3, 2)
+        assert matrix.genotypes.tolist() == [[0, MISSING_GENOTYPE], [1, 1], [2, 0]]
+        assert matrix.sites == [("chr1", 10, "A", "G"), ("chr1", 20, "A", "G")]
+        
+        # Grown column by column or preallocated at the known site count, the matrix is the same
+        with patch("securegenomics.cohort.GENOTYPE_CHUNK_SITES", 1):
+            assert read_genotype_matrix(records, samples).genotypes.tolist() == matrix.genotypes.tolist()
+        assert read_genotype_matrix(records, samples, site_count=2).genotypes.tolist() == matrix.genotypes.tolist()
+        
+        (tmp_path / "encode.py").write_text(
+            "def encode_genotypes(genotypes, samples):\n"
+            "    return {'samples': samples, 'dosages': genotypes.tolist()}\n"
+        )
+        (tmp_path / "encrypt.py").write_text(
+            "def encrypt_data(encoded_data, public_crypto_context):\n"
+            "    return dict(encoded_data, context=public_crypto_context.decode())\n"
+        )
+        context_path = tmp_path / "public_crypto_context.bin"
+        context_path.write_bytes(b"ctx")
+        context = ContextSource(str(context_path), hash_file(context_path))
+        
+        blocks = plan_sample_blocks(len(samples), 2)
+        assert blocks == [(0, 2), (2, 3)]
+        
+        refs = ((str(tmp_path / "encode.py"), "encode_genotypes", None), (str(tmp_path / "encrypt.py"), "encrypt_data", None))
+        serial = list(encrypt_cohort_blocks(matrix, blocks, *refs, context, 1))
+        parallel = list(encrypt_cohort_blocks(matrix, blocks, *refs, context, 2))
+        
+        assert serial == parallel
+        assert json.loads(serial[1]) == {"samples": ["S2"], "dosages": [[2, 0]], "context": "ctx"}
+
+
+    def test_additive_cohort_aggregated_before_encryption(self, tmp_path):
+        """Test that block encodings sum to the whole-cohort encoding without overflow."""
+        import numpy as np
+        from securegenomics.cohort import GenotypeMatrix, aggregate_cohort_blocks, plan_sample_blocks, sum_encodings
+        from securegenomics.container import SparseEncoded
+        
+        genotypes = np.array([[2, 0, 1], [1, 1, -1], [0, 2, 2], [2, 2, 0]], dtype=np.int8)
+        matrix = GenotypeMatrix(genotypes=genotypes, samples=["A", "B", "C", "D"], sites=[])
+        (tmp_path / "encode.py").write_text(
+            "import numpy as np\n\n"
+            "def encode_genotypes(genotypes, samples):\n"
+            "    return np.where(genotypes > 0, genotypes, 0).sum(axis=0, dtype=np.int8)\n"
+        )
+        encode_ref = (str(tmp_path / "encode.py"), "encode_genotypes", None)
+        
+        total = aggregate_cohort_blocks(matrix, plan_sample_blocks(4, 3), encode_ref, 2)
+        assert total.dtype == np.int64
+        assert total.tolist() == [5, 5, 3]
+        
+        narrow = [np.full(2, 100, dtype=np.int8), SparseEncoded.from_dense(np.array([100, 0], dtype=np.int8))]
+        assert sum_encodings(narrow).tolist() == [200, 100]
+
+
+class TestEncryption:
+    """Test batched encryption and the framed ciphertext container."""
+    
+    def test_batches_encrypted_across_workers_reassemble_in_order(self, tmp_path):
+        """Test that batches come back in order and the context loads once per worker."""
+        import numpy as np
+        from securegenomics.ciphertext import FramedCiphertextWriter, is_framed_ciphertext, iter_ciphertext_records
+        from securegenomics.cache import hash_file
+        from securegenomics.encryption import ContextSource, encrypt_batches, plan_batches, summarize_workers
+        
+        (tmp_path / "encrypt.py").write_text(
+            "import os\n\n"
+            "def load_context(public_crypto_context):\n"
+            "    return {'key': public_crypto_context.decode(), 'pid': os.getpid(), 'loads': os.urandom(4).hex()}\n\n"
+            "def encrypt_batch(batch, context):\n"
+            "    return {'values': batch, 'key': context['key'], 'load': context['loads']}\n"
+        )
+        context_path = tmp_path / "public_crypto_context.bin"
+        context_path.write_bytes(b"pk")
+        context = ContextSource(str(context_path), hash_file(context_path))
+        module = str(tmp_path / "encrypt.py")
+        
+        encoded = np.arange(10, dtype=np.int64)
+        batches = plan_batches(len(encoded), 4)
+        assert batches == [(0, 4), (4, 8), (8, 10)]
+        
+        results = list(encrypt_batches(
+            encoded, batches, (module, "encrypt_data", None), context, 2,
+            load_context_ref=(module, "load_context", None), batch_ref=(module, "encrypt_batch", None)
+        ))
+        records = [json.loads(result.ciphertext) for result in results]
+        assert [record["values"] for record in records] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+        
+        # One context load per worker process, reused for all of its batches
+        loads = {}
+        for result, record in zip(results, records):
+            loads.setdefault(result.worker_pid, set()).add(record["load"])
+        assert all(len(worker_loads) == 1 for worker_loads in loads.values())
+        
+        summary = summarize_workers(results)
+        assert sum(worker["batches"] for worker in summary) == 3
+        assert sum(worker["input_bytes"] for worker in summary) == encoded.nbytes
+        
+        encrypted_path = tmp_path / "data.encrypted"
+        with FramedCiphertextWriter(encrypted_path, {"slots": 4}) as writer:
+            for result in results:
+                writer.write(result.ciphertext)
+        assert is_framed_ciphertext(encrypted_path)
+        assert list(iter_ciphertext_records(encrypted_path)) == [result.ciphertext for result in results]
+
+    def test_framed_ciphertext_index_gives_random_access(self, tmp_path):
+        """Test that any record can be read through the trailing index."""
+        from securegenomics.ciphertext import FramedCiphertextReader, FramedCiphertextWriter
+
+        records = [bytes([index]) * (index * 100 + 1) for index in range(5)]
+        encrypted_path = tmp_path / "data.encrypted"
+        with FramedCiphertextWriter(encrypted_path, {"protocol": "test"}) as writer:
+            for record in records:
+                writer.write(record)
+        assert encrypted_path.stat().st_size == writer.bytes_written
+
+        with FramedCiphertextReader(encrypted_path) as reader:
+            assert len(reader) == 5
+            assert reader.metadata == {"protocol": "test"}
+            assert reader[3] == records[3]
+            assert reader[-1] == records[4]
+            assert reader[0] == records[0]
+            with pytest.raises(IndexError):
+                reader[5]
+
+        # Files from a newer CLI are refused rather than misread
+        with patch("securegenomics.ciphertext.FORMAT_VERSION", 2):
+            with FramedCiphertextWriter(tmp_path / "newer.encrypted") as writer:
+                writer.write(records[0])
+        with pytest.raises(ValueError, match="newer"):
+            FramedCiphertextReader(tmp_path / "newer.encrypted")
+
+    @pytest.mark.parametrize("codec", ["zlib", "lzma"])
+    def test_compressed_records_round_trip(self, tmp_path, codec):
+        """Test that compressed records read back as written and report their savings."""
+        from securegenomics.ciphertext import FramedCiphertextReader, FramedCiphertextWriter
+
+        records = [b"\x00" * 4096, bytes(range(256)) * 8]
+        encrypted_path = tmp_path / "data.encrypted"
+        with FramedCiphertextWriter(encrypted_path, compression=codec, level=1) as writer:
+            for record in records:
+                writer.write(record)
+        assert writer.record_bytes == sum(len(record) for record in records)
+        assert writer.stored_record_bytes < writer.record_bytes
+
+        with FramedCiphertextReader(encrypted_path) as reader:
+            assert reader.header["compression"] == codec
+            assert list(reader) == records
+
+        with pytest.raises(ValueError):
+            FramedCiphertextWriter(tmp_path / "other.encrypted", compression="brotli")
+
+    def test_ciphertext_compression_declared_by_protocol(self):
+        """Test that the protocol, not client config, picks the ciphertext codec."""
+        from securegenomics.data import DataManager
+
+        data_manager = DataManager.__new__(DataManager)
+        data_manager.protocol_manager = Mock()
+        data_manager.protocol_manager.get_protocol_config.return_value = {}
+        assert data_manager._get_ciphertext_compression("raw-protocol") == ("none", None)
+
+        data_manager.protocol_manager.get_protocol_config.return_value = {
+            "encryption": {"compression": "zlib", "compression_level": 9}
+        }
+        assert data_manager._get_ciphertext_compression("zlib-protocol") == ("zlib", 9)
+
+        data_manager.protocol_manager.get_protocol_config.return_value = {"encryption": {"compression": "brotli"}}
+        with pytest.raises(Exception, match="unknown ciphertext compression"):
+            data_manager._get_ciphertext_compression("bad-protocol")
+
+    def test_zero_pool_entries_used_exactly_once(self, tmp_path):
+        """Test that pooled zero ciphertexts are claimed once and unused claims are discarded."""
+        import numpy as np
+        from securegenomics.cache import hash_file
+        from securegenomics.encryption import (
+            ContextSource, ZeroCiphertextPool, encrypt_batches, plan_batches, precompute_zero_ciphertexts
+        )
+        
+        (tmp_path / "encrypt.py").write_text(
+            "import os\n\n"
+            "def encrypt_data(encoded_data, public_crypto_context):\n"
+            "    return {'values': encoded_data, 'zero': None}\n\n"
+            "def encrypt_zero(context):\n"
+            "    return os.urandom(8).hex()\n\n"
+            "def encrypt_with_zero(batch, zero_ciphertext, context):\n"
+            "    return {'values': batch, 'zero': zero_ciphertext.decode()}\n"
+        )
+        module = str(tmp_path / "encrypt.py")
+        context_path = tmp_path / "public_crypto_context.bin"
+        context_path.write_bytes(b"pk")
+        context = ContextSource(str(context_path), hash_file(context_path))
+        
+        pool = ZeroCiphertextPool.for_context(tmp_path, context.digest)
+        assert precompute_zero_ciphertexts(pool, (module, "encrypt_zero", None), None, context, 3, 2) == 3
+        assert pool.size() == 3
+        assert ZeroCiphertextPool.for_context(tmp_path, "b" * 64).size() == 0
+        
+        claimed = pool.claim(2)
+        assert len(claimed) == 2 and pool.size() == 1
+        
+        batches = plan_batches(6, 2)
+        results = [json.loads(result.ciphertext) for result in encrypt_batches(
+            np.arange(6), batches, (module, "encrypt_data", None), context, 1,
+            zero_ref=(module, "encrypt_with_zero", None), zero_paths=claimed
+        )]
+        zeros = [result["zero"] for result in results]
+        assert zeros[2] is None and len(set(zeros[:2])) == 2
+        assert not any(path.exists() for path in claimed)
+        
+        # Claimed entries that go unused are deleted, never handed back
+        leftover = pool.claim(5)
+        assert len(leftover) == 1
+        ZeroCiphertextPool.discard(leftover)
+        assert pool.size() == 0 and not leftover[0].exists()
+
+
+class TestWorkers:
+    """Test protocol worker payload transfer."""
+    
+    def test_large_payloads_round_trip_through_handles(self):
+        """Test that large arguments become file handles and resolve back."""
+        from securegenomics.workers import PayloadHandle, export_payload, import_payload
+        
+        payload = (b"x" * 64, "small")
+        exported = export_payload(payload, threshold=32)
+        
+        assert isinstance(exported[0], PayloadHandle)
+        assert exported[1] == "small"
+        imported = import_payload(exported, remove=True)
+        assert imported == payload
+        assert isinstance(imported[0], bytes)
+        assert not Path(exported[0].path).exists()
+
+    def test_pool_reuses_workers_and_recovers_from_timeouts_and_crashes(self, tmp_path):
+        """Test that a stuck or dead worker does not wedge the next call."""
+        import glob
+        from securegenomics.workers import ProtocolWorkerPool, _payload_dir
+
+        module_path = str(tmp_path / "ops.py")
+        (tmp_path / "ops.py").write_text(
+            "import os\nimport time\n\n"
+            "def echo(data):\n    return bytes(data) + b'!'\n\n"
+            "def pid():\n    return os.getpid()\n\n"
+            "def stall():\n    time.sleep(60)\n\n"
+            "def crash():\n    os._exit(1)\n"
+        )
+        payload_files = f"{_payload_dir()}/securegenomics-*.payload"
+        existing = set(glob.glob(payload_files))
+        pool = ProtocolWorkerPool(1, payload_threshold=16)
+        try:
+            assert bytes(pool.run(module_path, "echo", data=b"x" * 64)) == b"x" * 64 + b"!"
+            first_pid = pool.run(module_path, "pid")
+            assert pool.run(module_path, "pid") == first_pid
+
+            with pytest.raises(Exception, match="timed out"):
+                pool.run(module_path, "stall", timeout=1)
+            second_pid = pool.run(module_path, "pid", timeout=30)
+            assert second_pid != first_pid
+
+            with pytest.raises(Exception, match="terminated unexpectedly"):
+                pool.run(module_path, "crash")
+            assert pool.run(module_path, "pid", timeout=30) not in (first_pid, second_pid)
+        finally:
+            pool.shutdown(terminate=True)
+        assert set(glob.glob(payload_files)) <= existing
+
+    def test_context_operations_stay_in_process(self, tmp_path):
+        """Test that pool mode runs stream and preloaded-context operations in-process."""
+        (tmp_path / "encrypt.py").write_text(
+            "import os\n\n"
+            "def encrypt_data(encoded_data, public_crypto_context):\n    return os.getpid()\n"
+        )
+        protocol_manager = ProtocolManager()
+        with patch.object(protocol_manager, 'resolve_operation', return_value=(tmp_path / "encrypt.py", "encrypt_data")), \
+             patch.object(protocol_manager.config_manager, 'get_execution_mode', return_value="pool"), \
+             patch.object(protocol_manager.config_manager, 'log_audit_event'), \
+             patch.object(protocol_manager, 'uses_loaded_context', return_value=True), \
+             patch.object(protocol_manager, '_execute_in_sandbox') as mock_sandbox:
+            import os
+            assert protocol_manager.execute("test-protocol", "encrypt_data_stream", encoded_data=[],
+                                            public_crypto_context=None) == os.getpid()
+            assert protocol_manager.execute("test-protocol", "encrypt_data", encoded_data=[],
+                                            public_crypto_context=None) == os.getpid()
+            mock_sandbox.assert_not_called()
+
+
 class TestCLIIntegration:
     """Integration tests for CLI components."""
     